@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with SERVER_MODE=asgi (gunicorn.conf.py then uses uvicorn workers);
+static files are served by WhiteNoise as in WSGI mode (core/staticfiles.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
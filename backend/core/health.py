@@ -0,0 +1,124 @@
+"""
+Liveness and readiness probes.
+
+/health/live does no I/O: it only shows that the process answers requests.
+Both views are async: under ASGI they run on the event loop, and
+readiness waits for its probes without blocking it.
+
+/health/ready probes the database, the cache and the file storage. Each
+probe runs in a small thread pool with a timeout and its result is cached
+per process for a few seconds, so frequent load balancer polling from
+many nodes costs at most one probe per dependency per interval. A probe
+that is still running (stuck dependency) is reported as timed out instead
+of being started again.
+
+Settings:
+    HEALTH_CHECK_TIMEOUT        seconds to wait for each probe (default 2)
+    HEALTH_CHECK_CACHE_SECONDS  how long results are reused (default 5)
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.http import JsonResponse
+
+PROBE_KEY = 'health-probe'
+
+
+def probe_database():
+    for alias in connections:
+        connection = connections[alias]
+        # The pool thread keeps its connection between probes; drop it if it broke
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+
+
+def probe_cache():
+    token = str(time.monotonic())
+    cache.set(PROBE_KEY, token, 30)
+    if cache.get(PROBE_KEY) != token:
+        raise RuntimeError('cache did not return the probe value')
+
+
+def probe_storage():
+    default_storage.exists(PROBE_KEY)
+
+
+PROBES = {
+    'database': probe_database,
+    'cache': probe_cache,
+    'storage': probe_storage,
+}
+
+_executor = ThreadPoolExecutor(max_workers=len(PROBES), thread_name_prefix='health-probe')
+_lock = threading.Lock()
+_running = {}
+_results = {'checked_at': None, 'checks': {}}
+
+
+def _timed(probe):
+    start = time.perf_counter()
+    probe()
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def run_probes(timeout):
+    """{name: {'ok': bool, 'latency_ms': float, 'error': str}} for every probe"""
+    started = {}
+    for name, probe in PROBES.items():
+        future = _running.get(name)
+        if future is None or future.done():
+            future = _running[name] = _executor.submit(_timed, probe)
+        started[name] = future
+
+    deadline = time.monotonic() + timeout
+    checks = {}
+    for name, future in started.items():
+        try:
+            checks[name] = {'ok': True, 'latency_ms': future.result(timeout=max(deadline - time.monotonic(), 0))}
+        except TimeoutError:
+            checks[name] = {'ok': False, 'error': 'timeout'}
+        except Exception as e:
+            # Only the exception type: messages can carry hosts or credentials
+            checks[name] = {'ok': False, 'error': type(e).__name__}
+    return checks
+
+
+def readiness():
+    """(checks, age in seconds) reusing recent results"""
+    ttl = getattr(settings, 'HEALTH_CHECK_CACHE_SECONDS', 5)
+    with _lock:
+        now = time.monotonic()
+        if _results['checked_at'] is None or now - _results['checked_at'] >= ttl:
+            _results['checks'] = run_probes(getattr(settings, 'HEALTH_CHECK_TIMEOUT', 2))
+            _results['checked_at'] = now = time.monotonic()
+        return _results['checks'], round(now - _results['checked_at'], 1)
+
+
+def reset():
+    """Forget cached results (tests)"""
+    with _lock:
+        _results['checked_at'] = None
+        _results['checks'] = {}
+
+
+async def live(request):
+    """Liveness: no I/O, 200 while the process can answer"""
+    return JsonResponse({'status': 'alive'})
+
+
+async def ready(request):
+    """Readiness: 200 when every dependency answers, 503 otherwise"""
+    checks, age = await sync_to_async(readiness, thread_sensitive=False)()
+    ok = all(check['ok'] for check in checks.values())
+    return JsonResponse(
+        {'status': 'ready' if ok else 'unavailable', 'checks': checks, 'age_seconds': age},
+        status=200 if ok else 503,
+    )
@@ -0,0 +1,188 @@
+"""
+Per-request SQL and latency instrumentation.
+
+RequestInstrumentationMiddleware records, per request, through an
+execute_wrapper installed on every database connection (works with DEBUG
+off):
+
+- number of queries and total SQL time
+- duplicate queries: the same SQL statement run more than once, the usual
+  signature of an N+1
+- render time (DRF/template response serialization) and response size
+
+The current request's recorder lives in a context variable, so queries
+are also attributed under ASGI, where async views run their ORM calls in
+worker threads (sync_to_async copies the context).
+
+They are sent as a Server-Timing header (visible in the browser dev
+tools), logged as one JSON line on the 'core.requests' logger (WARNING
+when the request looks like an N+1), and observed into the histograms in
+core.metrics, along with the worker's connection pool stats.
+
+Settings:
+    REQUEST_INSTRUMENTATION    enable the middleware (default True)
+    SERVER_TIMING_HEADER       add the Server-Timing header (default True)
+    DUPLICATE_QUERY_THRESHOLD  duplicates that make the log a WARNING (default 5)
+    SLOW_REQUEST_QUERY_COUNT   query count that makes the log a WARNING (default 50)
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger('core.requests')
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every statement"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def most_repeated(self):
+        sql, n = self.statements.most_common(1)[0] if self.statements else ('', 0)
+        return (sql, n) if n > 1 else (None, 0)
+
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    """Add the recording wrapper to a connection (once)"""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install)
+
+
+class RequestInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        self.duplicate_threshold = getattr(settings, 'DUPLICATE_QUERY_THRESHOLD', 5)
+        self.query_count_threshold = getattr(settings, 'SLOW_REQUEST_QUERY_COUNT', 50)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Connections opened before this module was imported missed connection_created
+        for connection in connections.all():
+            install(connection)
+        recorder = QueryRecorder()
+        request._render_time = 0.0
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        request._render_time = 0.0
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the render that runs right after the view (DRF Response / TemplateResponse)"""
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, recorder, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match.url_name or 'unnamed') if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+
+        metrics.REQUESTS.labels(view, request.method, response.status_code).inc()
+        metrics.REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        metrics.REQUEST_DB_TIME.labels(view).observe(recorder.duration)
+        metrics.REQUEST_QUERIES.labels(view).observe(recorder.count)
+        metrics.REQUEST_RENDER_TIME.labels(view).observe(request._render_time)
+        if recorder.duplicates:
+            metrics.REQUEST_DUPLICATE_QUERIES.labels(view).inc(recorder.duplicates)
+        if size is not None:
+            metrics.RESPONSE_SIZE.labels(view).observe(size)
+        # Each worker's pool is only visible from inside it
+        metrics.record_pool_stats()
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+                f'dupq;desc="{recorder.duplicates} duplicate queries"',
+                f'render;dur={request._render_time * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ])
+
+        repeated_sql, repeated = recorder.most_repeated()
+        suspicious = (recorder.duplicates >= self.duplicate_threshold
+                      or recorder.count >= self.query_count_threshold)
+        logger.log(
+            logging.WARNING if suspicious else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 1),
+                'duplicate_queries': recorder.duplicates,
+                'most_repeated_sql': repeated_sql[:300] if repeated_sql else None,
+                'most_repeated_count': repeated,
+                'render_ms': round(request._render_time * 1000, 1),
+                'response_bytes': size,
+            }),
+        )
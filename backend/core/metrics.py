@@ -0,0 +1,199 @@
+"""
+Prometheus metrics shared by the project, exposed at /metrics.
+
+Request metrics are recorded by core.instrumentation.RequestInstrumentationMiddleware
+and labelled by the resolved view name (e.g. 'product-list'), never by
+the raw path, so label cardinality stays bounded. Business metrics
+(checkouts, stock-outs, cache lookups, background queues) are recorded
+by the sales app.
+
+Database connections are reported two ways:
+- db_pool_*: this deployment's psycopg connection pools (DB_POOL_MAX_SIZE,
+  see settings), read from each worker's pool after every request and at
+  scrape time, and summed over the live workers;
+- db_server_*: server-wide pg_stat_activity counts, queried at scrape
+  time. They include every client of the database server (other apps,
+  other deployments), not just this pool.
+
+Under gunicorn's pre-fork workers set PROMETHEUS_MULTIPROC_DIR (see
+gunicorn.conf.py): every worker then writes its samples to files in that
+directory and the scrape, whichever worker serves it, aggregates them all.
+"""
+import hmac
+import logging
+import os
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUESTS = Counter(
+    'http_requests_total', 'Requests by view, method and status code',
+    ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time spent handling the request',
+    ['view', 'method'], buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request',
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_queries', 'SQL queries per request',
+    ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DUPLICATE_QUERIES = Counter(
+    'http_request_duplicate_queries_total', 'Repeated executions of the same SQL within a request (N+1)',
+    ['view'],
+)
+REQUEST_RENDER_TIME = Histogram(
+    'http_request_render_seconds', 'Time spent rendering (serializing) the response',
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size',
+    ['view'], buckets=SIZE_BUCKETS,
+)
+
+CHECKOUTS = Counter(
+    'checkout_total', 'Checkout attempts by result (success, out_of_stock, invalid)',
+    ['result'],
+)
+STOCK_OUTS = Counter(
+    'stock_out_events_total', 'Variants whose stock dropped to zero, by movement reason',
+    ['reason'],
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Application cache lookups by cache and result (hit, miss)',
+    ['cache', 'result'],
+)
+NOTIFICATIONS = Counter(
+    'notifications_total', 'Order status notifications by result (sent, failed)',
+    ['result'],
+)
+QUEUE_DEPTH = Gauge(
+    'background_queue_depth', 'Jobs waiting or running in background worker pools',
+    ['queue'], multiprocess_mode='livesum',
+)
+POOL_SIZE = Gauge(
+    'db_pool_connections', 'Connections held by the connection pools (open)',
+    ['database'], multiprocess_mode='livesum',
+)
+POOL_AVAILABLE = Gauge(
+    'db_pool_available_connections', 'Idle connections ready in the connection pools',
+    ['database'], multiprocess_mode='livesum',
+)
+POOL_WAITING = Gauge(
+    'db_pool_waiting_requests', 'Threads waiting for a connection from the pools',
+    ['database'], multiprocess_mode='livesum',
+)
+POOL_MAX_SIZE = Gauge(
+    'db_pool_max_connections', 'Connection pool size limit',
+    ['database'], multiprocess_mode='livesum',
+)
+
+
+def record_stock_outs(count, reason):
+    """Count variants that ran out of stock once the current transaction commits"""
+    if count:
+        transaction.on_commit(lambda: STOCK_OUTS.labels(reason).inc(count))
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_pool_stats():
+    """Copy this process's connection pool stats (databases with OPTIONS['pool']) into the gauges"""
+    for alias in connections:
+        # None without pooling; the pool object is created, not opened, on first access
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        POOL_SIZE.labels(alias).set(stats.get('pool_size', 0))
+        POOL_AVAILABLE.labels(alias).set(stats.get('pool_available', 0))
+        POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+        POOL_MAX_SIZE.labels(alias).set(stats.get('pool_max', 0))
+
+
+class DatabaseConnectionsCollector:
+    """
+    Server-side connection usage (pg_stat_activity) for every PostgreSQL
+    database, queried on each scrape: all of the server's clients, not this
+    process's pool (see record_pool_stats). Other backends report nothing.
+    """
+
+    def _families(self):
+        return (
+            GaugeMetricFamily('db_server_connections', 'Open server connections by state (all clients)',
+                              labels=['database', 'state']),
+            GaugeMetricFamily('db_server_max_connections', 'Server connection limit', labels=['database']),
+        )
+
+    def describe(self):
+        # Registering must not touch the database
+        return self._families()
+
+    def collect(self):
+        used, limit = self._families()
+        for alias in connections:
+            connection = connections[alias]
+            if connection.vendor != 'postgresql':
+                continue
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COALESCE(state, 'unknown'), COUNT(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() GROUP BY 1"
+                    )
+                    for state, count in cursor.fetchall():
+                        used.add_metric([alias, state], count)
+                    cursor.execute('SHOW max_connections')
+                    limit.add_metric([alias], int(cursor.fetchone()[0]))
+            except DatabaseError:
+                logger.warning('Could not read connection usage for database %r', alias, exc_info=True)
+        yield used
+        yield limit
+
+
+DATABASE_COLLECTOR = DatabaseConnectionsCollector()
+if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    REGISTRY.register(DATABASE_COLLECTOR)
+
+
+def scrape_registry():
+    """The default registry, or one aggregating every worker's files in multiprocess mode"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(DATABASE_COLLECTOR)
+    return registry
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set it requires
+    'Authorization: Bearer <token>'; without one it is only served in DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        # Constant-time; bytes, since str arguments must be ASCII
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    record_pool_stats()
+    return HttpResponse(generate_latest(scrape_registry()), content_type=CONTENT_TYPE_LATEST)
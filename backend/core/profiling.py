@@ -0,0 +1,193 @@
+"""
+Opt-in sampling profiler for hot API paths.
+
+ProfilingMiddleware runs cProfile around the view (including response
+rendering) for the views matched by PROFILING_VIEWS:
+- 1 in PROFILING_SAMPLE_RATE requests is sampled (0 disables sampling);
+- staff users can ask for a profile of one request with 'X-Profile: 1'.
+  The user is authenticated (as DRF would) before the profiler starts,
+  so the header costs nothing for anyone else.
+
+Under ASGI the middleware passes requests through untouched: cProfile
+follows one thread, while an async request hops between the event loop
+and worker threads.
+
+Each profile is summarized into time per phase (view code, serializers,
+ORM/database, rendering) and the top functions by cumulative time. Only
+the PROFILING_BUFFER_SIZE slowest ones are kept, in memory and per
+process, and are listed by the admin-only /debug/profiles endpoint
+(DELETE clears them).
+
+Settings:
+    PROFILING_SAMPLE_RATE   profile 1 in N matching requests (default 0 = off)
+    PROFILING_HEADER        allow staff to trigger with X-Profile (default True)
+    PROFILING_VIEWS         view name prefixes to profile
+    PROFILING_BUFFER_SIZE   slowest profiles kept (default 20)
+    PROFILING_TOP_FUNCTIONS functions kept per profile (default 25)
+"""
+import cProfile
+import heapq
+import itertools
+import pstats
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+DEFAULT_VIEWS = ('product-', 'order-', 'cart-reservation-')
+
+# (phase, substrings of the profiled function's file or name); first match wins
+PHASES = (
+    ('orm', ('/django/db/', 'sqlite3', 'psycopg')),
+    ('serializer', ('serializers.py', '/rest_framework/fields.py', '/rest_framework/relations.py')),
+    ('render', ('/rest_framework/renderers.py', '/json/')),
+)
+
+
+class ProfileBuffer:
+    """The N slowest profiles seen by this process"""
+
+    def __init__(self, size):
+        self.size = size
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            entry['id'] = next(self._ids)
+            item = (entry['duration_ms'], entry['id'], entry)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            elif item > self._heap[0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self):
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+buffer = ProfileBuffer(getattr(settings, 'PROFILING_BUFFER_SIZE', 20))
+
+
+def _phase(filename, function):
+    where = f'{filename}:{function}'
+    for phase, markers in PHASES:
+        if any(marker in where for marker in markers):
+            return phase
+    return 'view'
+
+
+def summarize(profile, top):
+    """(ms per phase, top functions by cumulative time) of a finished profile"""
+    stats = pstats.Stats(profile)
+    phases = dict.fromkeys(['view', 'serializer', 'orm', 'render'], 0.0)
+    functions = []
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        phases[_phase(filename, function)] += tottime
+        functions.append({
+            'function': f'{filename}:{line}({function})' if filename != '~' else function,
+            'calls': ncalls,
+            'own_ms': round(tottime * 1000, 2),
+            'cumulative_ms': round(cumtime * 1000, 2),
+        })
+    functions.sort(key=lambda f: f['cumulative_ms'], reverse=True)
+    return {phase: round(seconds * 1000, 2) for phase, seconds in phases.items()}, functions[:top]
+
+
+def is_staff(request):
+    """Whether the request's user is staff, authenticated like the DRF views do"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        authenticators = [authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        try:
+            user = Request(request, authenticators=authenticators).user
+        except APIException:
+            return False
+    return user.is_staff
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.header = getattr(settings, 'PROFILING_HEADER', True)
+        if not self.sample_rate and not self.header:
+            raise MiddlewareNotUsed
+        self.views = tuple(getattr(settings, 'PROFILING_VIEWS', DEFAULT_VIEWS))
+        self.top = getattr(settings, 'PROFILING_TOP_FUNCTIONS', 25)
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.get_response(request)
+        response = self.get_response(request)
+        profiler = getattr(request, '_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        duration = time.perf_counter() - request._profile_started
+        trigger = request._profile_trigger
+        phases, functions = summarize(profiler, self.top)
+        buffer.add({
+            'view': request.resolver_match.view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'trigger': trigger,
+            'duration_ms': round(duration * 1000, 1),
+            'captured_at': timezone.now(),
+            'phases_ms': phases,
+            'functions': functions,
+        })
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.async_mode or not request.resolver_match.view_name.startswith(self.views):
+            return None
+        if self.header and request.headers.get('X-Profile') == '1' and is_staff(request):
+            trigger = 'header'
+        elif self.sample_rate and random.random() * self.sample_rate < 1:
+            trigger = 'sample'
+        else:
+            return None
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return None
+        request._profiler = profiler
+        request._profile_trigger = trigger
+        request._profile_started = time.perf_counter()
+        return None
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def profiles_view(request):
+    """Perfis mais lentos capturados por este processo (DELETE limpa o buffer)."""
+    if request.method == 'DELETE':
+        buffer.clear()
+        return Response(status=204)
+    return Response({'size': buffer.size, 'profiles': buffer.slowest()})
@@ -0,0 +1,171 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Enabled when DATABASE_REPLICA_URL is set (the 'replica' alias). The
+router sends reads to the replica only while ReplicaMiddleware is
+handling a safe (GET/HEAD/OPTIONS) request to one of the REPLICA_VIEWS (catalog
+listings, category products, reviews, store analytics). Everything else
+uses the primary: other views, writes and the auth/session tables.
+
+A request that writes reads the primary from then on, and the user is
+pinned to the primary for REPLICA_PIN_SECONDS (in the cache, so it holds
+across workers). That way a store owner who just edited a product sees
+the change, while the replica may still be catching up.
+
+Results that get cached (store_cache) are computed inside primary(): a
+replica still catching up with the write that invalidated the cache would
+otherwise be cached under the new version.
+
+The decision is made when the first query runs, after DRF has
+authenticated the user. The request's state lives in a context
+variable, so async views (whose ORM calls run in worker threads) are
+routed the same way.
+
+Settings:
+    REPLICA_DATABASE     replica alias (default 'replica')
+    REPLICA_VIEWS        view names whose safe requests may use it
+    REPLICA_APPS         apps whose models may be read from it (default sales)
+    REPLICA_PIN_SECONDS  primary-only window after a user's write (default 10)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+DEFAULT_VIEWS = (
+    'product-list', 'product-detail', 'category-list', 'category-detail', 'category-products',
+    'product-reviews-list', 'product-reviews-summary', 'store-analytics',
+    'catalog-product-list', 'catalog-product-detail', 'catalog-category-products',
+)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'db-pin:{}'
+
+
+def pin_user(user_id):
+    """Read from the primary for this user's next requests"""
+    cache.set(PIN_KEY.format(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user_id):
+    return bool(cache.get(PIN_KEY.format(user_id)))
+
+
+class RequestState:
+    """Routing decision for one request"""
+
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self.primary = False
+        self._replica = None
+
+    def user_id(self):
+        user = getattr(self.request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def use_replica(self):
+        if self.wrote or self.primary:
+            return False
+        if self._replica is None:
+            match = self.request.resolver_match
+            views = getattr(settings, 'REPLICA_VIEWS', DEFAULT_VIEWS)
+            user_id = self.user_id()
+            self._replica = (
+                self.request.method in SAFE_METHODS
+                and match is not None and match.view_name in views
+                and (user_id is None or not is_pinned(user_id))
+            )
+        return self._replica
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def primary():
+    """Reads of the current request inside the block use the primary"""
+    state = _state.get()
+    if state is None or state.primary:
+        yield
+        return
+    state.primary = True
+    try:
+        yield
+    finally:
+        state.primary = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or model._meta.app_label not in getattr(settings, 'REPLICA_APPS', ('sales',)):
+            return None
+        if not state.use_replica():
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from where the instance was loaded
+            return instance._state.db
+        return getattr(settings, 'REPLICA_DATABASE', 'replica')
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = RequestState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if self.wrote(state, response):
+            self.pin(state)
+        return response
+
+    async def __acall__(self, request):
+        state = RequestState(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if self.wrote(state, response):
+            # Resolving the user may query the session/user tables
+            await sync_to_async(self.pin)(state)
+        return response
+
+    def wrote(self, state, response):
+        # Successful unsafe requests count too: a write may have bypassed the ORM
+        return state.wrote or (state.request.method not in SAFE_METHODS and response.status_code < 400)
+
+    def pin(self, state):
+        user_id = state.user_id()
+        if user_id is not None:
+            pin_user(user_id)
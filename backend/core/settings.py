@@ -55,8 +55,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so its query count/timings cover the whole request
+    'core.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, async-capable so ASGI requests stay on the event loop
+    'core.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +67,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Innermost so the profile covers only the view and rendering
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -84,19 +89,85 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
+
+# 'wsgi' (sync gunicorn workers) or 'asgi' (uvicorn workers, see gunicorn.conf.py)
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+
+# Exposes /debug/upstream-delay (simulated slow upstream for scripts/concurrency_benchmark.py)
+BENCHMARK_ENDPOINTS = config('BENCHMARK_ENDPOINTS', default=False, cast=bool)
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection pooling (PostgreSQL, psycopg 3): with DB_POOL_MAX_SIZE > 0 the
+# threads of a worker process share at most that many connections, opened on
+# demand and closed after DB_POOL_MAX_IDLE seconds unused, instead of each
+# thread keeping its own persistent connection (CONN_MAX_AGE). The total is
+# still workers x DB_POOL_MAX_SIZE; put PgBouncer in front past that.
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=0, cast=int)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=1, cast=int)
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+
+
+def database(url):
+    db = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    if DB_POOL_MAX_SIZE and db['ENGINE'] == 'django.db.backends.postgresql':
+        # Pooled connections are returned after each request, not kept per thread
+        db.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+        db.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+            'max_size': DB_POOL_MAX_SIZE,
+            'max_idle': DB_POOL_MAX_IDLE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    return db
+
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=config('DATABASE_URL', default=f'postgresql://{config("DB_USER", default="postgres")}:{config("DB_PASSWORD", default="postgres123")}@{config("DB_HOST", default="localhost")}:{config("DB_PORT", default="5432")}/{config("DB_NAME", default="sales_db")}'),
-        conn_max_age=600,
-        conn_health_checks=True,
+    'default': database(
+        config('DATABASE_URL', default=f'postgresql://{config("DB_USER", default="postgres")}:{config("DB_PASSWORD", default="postgres123")}@{config("DB_HOST", default="localhost")}:{config("DB_PORT", default="5432")}/{config("DB_NAME", default="sales_db")}'),
     )
 }
 
+# Read replica (core.replicas): GET requests to the REPLICA_VIEWS read from
+# it, except for a user who wrote in the last REPLICA_PIN_SECONDS (they read
+# their own writes from the primary while the replica catches up)
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = database(DATABASE_REPLICA_URL)
+    # Tests only create the primary and read it through this alias too
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+    MIDDLEWARE.insert(MIDDLEWARE.index('core.profiling.ProfilingMiddleware'), 'core.replicas.ReplicaMiddleware')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+# Shared Redis cache when REDIS_URL is set; otherwise each process has its own
+# memory cache (store cache versions and replica pins are then per process)
+
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Store owners' product/order lists and analytics (sales.store_cache):
+# seconds an entry is kept, 0 disables the cache
+STORE_CACHE_TIMEOUT = config('STORE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Public catalog listings (/api/catalog/) served from an in-process snapshot
+# (sales.catalog_snapshot), fully rebuilt at least every MAX_AGE seconds
+CATALOG_SNAPSHOT = config('CATALOG_SNAPSHOT', default=False, cast=bool)
+CATALOG_SNAPSHOT_MAX_AGE = config('CATALOG_SNAPSHOT_MAX_AGE', default=600, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,8 +206,16 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# WhiteNoise settings for serving static files in production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Storage backends (Django 5 ignores DEFAULT_FILE_STORAGE/STATICFILES_STORAGE)
+# 'default' switches to S3 below when USE_S3 is on; static files are served by WhiteNoise.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Media files (User uploaded content)
 MEDIA_URL = '/media/'
@@ -158,9 +237,62 @@ if USE_S3:
     }
 
     # S3 Media Settings
-    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+    STORAGES['default'] = {'BACKEND': 'storages.backends.s3boto3.S3Boto3Storage'}
     MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
 
+# Direct-to-storage uploads (see sales/uploads.py)
+IMAGE_UPLOAD_MAX_BYTES = config('IMAGE_UPLOAD_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+IMAGE_UPLOAD_TICKET_TTL = 15 * 60
+
+# Product image renditions (see sales/images.py)
+# 'thread' generates them in a background pool, 'sync' right after commit,
+# 'off' leaves them to `manage.py process_image_renditions`. Run that command
+# periodically in every mode: it catches jobs lost when a worker restarts.
+IMAGE_RENDITIONS_MODE = config('IMAGE_RENDITIONS_MODE', default='thread')
+IMAGE_RENDITIONS_WORKERS = config('IMAGE_RENDITIONS_WORKERS', default=2, cast=int)
+IMAGE_RENDITION_WIDTHS = (160, 320, 640, 1024)
+
+# Cart stock reservations (see sales/inventory.py); expired ones are
+# removed by `manage.py release_expired_reservations`
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=15 * 60, cast=int)
+
+# Per-request SQL/latency instrumentation (see core/instrumentation.py)
+REQUEST_INSTRUMENTATION = config('REQUEST_INSTRUMENTATION', default=True, cast=bool)
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=True, cast=bool)
+DUPLICATE_QUERY_THRESHOLD = config('DUPLICATE_QUERY_THRESHOLD', default=5, cast=int)
+SLOW_REQUEST_QUERY_COUNT = config('SLOW_REQUEST_QUERY_COUNT', default=50, cast=int)
+
+# Prometheus scrape endpoint (/metrics): 'Authorization: Bearer <token>'.
+# Multiprocess mode is enabled by the PROMETHEUS_MULTIPROC_DIR environment
+# variable (set by gunicorn.conf.py), not by a setting.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# /health/ready: per-probe timeout and how long results are reused (seconds)
+HEALTH_CHECK_TIMEOUT = config('HEALTH_CHECK_TIMEOUT', default=2, cast=float)
+HEALTH_CHECK_CACHE_SECONDS = config('HEALTH_CHECK_CACHE_SECONDS', default=5, cast=float)
+
+# Sampling profiler (core.profiling): 1 in N requests, 0 = only on demand
+# by staff users with 'X-Profile: 1'; results at /debug/profiles
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0, cast=int)
+PROFILING_HEADER = config('PROFILING_HEADER', default=True, cast=bool)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=20, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request; WARNING for likely N+1s
+        'core.requests': {
+            'handlers': ['console'],
+            'level': config('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
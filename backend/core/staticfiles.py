@@ -0,0 +1,38 @@
+"""
+Static files through WhiteNoise in both server modes.
+
+WhiteNoiseMiddleware is sync-only: under ASGI Django would run it, and the
+rest of the middleware chain with it, in a worker thread on every request.
+StaticFilesMiddleware is the same middleware, async-capable: it looks the
+path up in WhiteNoise's file index, serves static files (manifest-hashed
+names, pre-compressed gzip/brotli variants, long cache headers for
+immutable files) in a thread, and awaits everything else on the event
+loop.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -14,12 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import asyncio
+
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
-from django.db import connection # Importado para o health_check
+from core import health
+from core.metrics import metrics_view
+from core.profiling import profiles_view
 
 def api_root(request):
     """Root endpoint with API information"""
@@ -30,7 +34,11 @@ def api_root(request):
         'endpoints': {
             'api': '/api/',
             'admin': '/admin/',
-            'health': '/health/',
+            'health': {
+                'live': '/health/live',
+                'ready': '/health/ready',
+            },
+            'metrics': '/metrics',
             'docs': {
                 'products': '/api/products/',
                 'orders': '/api/orders/',
@@ -48,31 +56,31 @@ def api_root(request):
         }
     })
 
-def health_check(request):
-    """Health check endpoint for monitoring"""
+async def upstream_delay(request):
+    """Simula uma chamada lenta a um serviço externo (?ms=, padrão 100) sem ocupar a thread"""
     try:
-        # Test database connection
-        connection.ensure_connection()
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'error: {str(e)}'
-
-    response_data = {
-        'status': 'healthy',
-        'database': db_status,
-        'debug': settings.DEBUG,
-        'allowed_hosts': settings.ALLOWED_HOSTS,
-        'method': request.method
-    }
-    return JsonResponse(response_data)
+        delay_ms = min(max(int(request.GET.get('ms', 100)), 0), 10000)
+    except ValueError:
+        return JsonResponse({'error': 'ms inválido'}, status=400)
+    await asyncio.sleep(delay_ms / 1000)
+    return JsonResponse({'delay_ms': delay_ms})
 
 urlpatterns = [
     path('', api_root, name='api-root'),
-    path('health/', health_check, name='health-check'),
+    path('health/live', health.live, name='health-live'),
+    path('health/ready', health.ready, name='health-ready'),
+    # Antigo endpoint de monitoramento: mesmo resultado do readiness
+    path('health/', health.ready, name='health-check'),
+    path('metrics', metrics_view, name='metrics'),
+    path('debug/profiles', profiles_view, name='debug-profiles'),
     path('admin/', admin.site.urls),
     path('api/', include('sales.urls')),
 ]
 
+# Usado por scripts/concurrency_benchmark.py; desligado por padrão
+if settings.BENCHMARK_ENDPOINTS:
+    urlpatterns.append(path('debug/upstream-delay', upstream_delay, name='debug-upstream-delay'))
+
 # **Mapeamento de Mídia (Recomendado)**
 # Serve arquivos de mídia APENAS em ambiente de DESENVOLVIMENTO (DEBUG=True).
 # Em produção, o servidor web ou o S3 deve lidar com isso.
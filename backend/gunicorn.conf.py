@@ -0,0 +1,37 @@
+"""
+Gunicorn settings (picked up automatically from the working directory).
+
+SERVER_MODE=asgi serves core.asgi with uvicorn workers (async views don't
+hold a worker while waiting); the default serves core.wsgi with sync
+workers.
+
+Prometheus metrics run in multiprocess mode: each pre-forked worker
+writes its samples under PROMETHEUS_MULTIPROC_DIR and /metrics aggregates
+them. The directory is emptied when the master starts and a worker's live
+gauges are dropped when it exits.
+"""
+import os
+import shutil
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-multiproc')
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'core.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'core.wsgi:application'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,8 +1,11 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.utils import timezone
 from .models import (
     Store, Product, ProductVariant, Order, OrderItem, OrderStatusUpdate,
     Category, Review, Coupon, Wishlist,
-    Attribute, AttributeValue
+    Attribute, AttributeValue, PurchasedProduct, StockReservation, StockMovement, StockSnapshot,
+    StoreDailySales, ProductDailySales, OrderTransitionError, ArchivedOrder
 )
 
 # --- NOVOS REGISTROS ---
@@ -95,8 +98,19 @@ class ProductVariantAdmin(admin.ModelAdmin):
 
 # --- REGISTROS (Sem alterações) ---
 
+class OrderItemInlineForm(forms.ModelForm):
+    def clean(self):
+        """New lines take stock when saved (OrderItem.save); check it here first"""
+        cleaned = super().clean()
+        variant, quantity = cleaned.get('variant'), cleaned.get('quantity')
+        if self.instance._state.adding and variant and quantity and quantity > variant.stock:
+            raise forms.ValidationError(f"Estoque insuficiente ({variant.stock}) para {variant.sku}.")
+        return cleaned
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
+    form = OrderItemInlineForm
     extra = 0
     fields = ('variant', 'quantity', 'unit_price')
     readonly_fields = ('unit_price', 'get_subtotal')
@@ -120,31 +134,40 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer_name', 'status', 'payment_method', 'payment_status', 'total_amount', 'created_at')
     list_filter = ('status', 'payment_method', 'payment_status', 'created_at')
     search_fields = ('id', 'customer_name', 'customer_email', 'customer_phone')
-    readonly_fields = ('total_amount', 'paid_at', 'created_at', 'updated_at')
+    # status changes go through the actions below (validated transitions)
+    readonly_fields = ('status', 'total_amount', 'paid_at', 'created_at', 'updated_at')
     inlines = [OrderItemInline, OrderStatusUpdateInline]
     actions = ['action_mark_out_for_delivery', 'action_mark_delivered', 'action_mark_cancelled', 'action_mark_cod_paid']
     list_select_related = ('store',)
 
-    def action_mark_out_for_delivery(self, request, queryset):
+    def _set_status(self, request, queryset, new_status):
+        changed, skipped = 0, []
         for order in queryset:
-            order.set_status('out_for_delivery', note='Atualizado via Admin', automatic=False)
+            try:
+                if order.set_status(new_status, note='Atualizado via Admin', automatic=False) != new_status:
+                    changed += 1
+            except OrderTransitionError as e:
+                skipped.append(f"#{order.pk}: {e}")
+        self.message_user(request, f"{changed} pedido(s) atualizado(s).")
+        if skipped:
+            self.message_user(request, "Ignorados: " + "; ".join(skipped), level=messages.WARNING)
+
+    def action_mark_out_for_delivery(self, request, queryset):
+        self._set_status(request, queryset, 'out_for_delivery')
     action_mark_out_for_delivery.short_description = 'Marcar como "Saiu para entrega"'
 
     def action_mark_delivered(self, request, queryset):
-        for order in queryset:
-            order.set_status('delivered', note='Atualizado via Admin', automatic=False)
+        self._set_status(request, queryset, 'delivered')
     action_mark_delivered.short_description = 'Marcar como "Entregue"'
 
     def action_mark_cancelled(self, request, queryset):
-        for order in queryset:
-            order.set_status('cancelled', note='Atualizado via Admin', automatic=False)
+        self._set_status(request, queryset, 'cancelled')
     action_mark_cancelled.short_description = 'Marcar como "Cancelado"'
 
     def action_mark_cod_paid(self, request, queryset):
         count = 0
         for order in queryset.filter(payment_method='cod', payment_status='pending'):
-            order.mark_cod_paid()
-            count += 1
+            count += order.mark_cod_paid()
         self.message_user(request, f"{count} pedidos COD marcados como pagos.")
     action_mark_cod_paid.short_description = 'Marcar COD como pago'
 
@@ -158,11 +181,28 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
-    list_display = ('product', 'user', 'rating', 'is_approved', 'created_at')
-    list_filter = ('is_approved',)
+    list_display = ('product', 'user', 'rating', 'is_approved', 'moderated_at', 'created_at')
+    list_filter = ('is_approved', ('moderated_at', admin.EmptyFieldListFilter))
     search_fields = ('product__name', 'user__username')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'moderated_at')
     autocomplete_fields = ('product', 'user') 
+    list_select_related = ('product', 'user')
+    actions = ['action_approve', 'action_reject']
+
+    def save_model(self, request, obj, form, change):
+        if 'is_approved' in form.changed_data:
+            obj.moderated_at = timezone.now()
+        super().save_model(request, obj, form, change)
+
+    def action_approve(self, request, queryset):
+        count = queryset.moderate(approve=True)
+        self.message_user(request, f"{count} avaliações aprovadas.")
+    action_approve.short_description = 'Aprovar avaliações selecionadas'
+
+    def action_reject(self, request, queryset):
+        count = queryset.moderate(approve=False)
+        self.message_user(request, f"{count} avaliações rejeitadas.")
+    action_reject.short_description = 'Rejeitar avaliações selecionadas'
 
 
 @admin.register(Coupon)
@@ -176,4 +216,82 @@ class CouponAdmin(admin.ModelAdmin):
 class WishlistAdmin(admin.ModelAdmin):
     list_display = ('user', 'product', 'created_at')
     search_fields = ('user__username', 'product__name')
-    autocomplete_fields = ('user', 'product')
\ No newline at end of file
+    autocomplete_fields = ('user', 'product')
+
+
+@admin.register(PurchasedProduct)
+class PurchasedProductAdmin(admin.ModelAdmin):
+    list_display = ('email', 'product', 'last_order', 'last_purchased_at')
+    search_fields = ('email', 'product__name')
+    readonly_fields = ('last_purchased_at',)
+    list_select_related = ('product',)
+    raw_id_fields = ('product', 'last_order')
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('cart_token', 'variant', 'quantity', 'expires_at', 'updated_at')
+    search_fields = ('cart_token', 'variant__sku')
+    list_filter = ('expires_at',)
+    list_select_related = ('variant',)
+    raw_id_fields = ('variant',)
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """Ledger is append-only: movements can be browsed but not edited"""
+    list_display = ('variant', 'delta', 'reason', 'order', 'note', 'created_at')
+    list_filter = ('reason', 'created_at')
+    search_fields = ('variant__sku', 'note')
+    list_select_related = ('variant',)
+    raw_id_fields = ('variant', 'order')
+    show_full_result_count = False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('variant', 'stock', 'movement_id', 'taken_at')
+    search_fields = ('variant__sku',)
+    list_select_related = ('variant',)
+    raw_id_fields = ('variant',)
+    show_full_result_count = False
+
+
+@admin.register(StoreDailySales)
+class StoreDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('store', 'date', 'orders', 'revenue', 'paid_orders', 'paid_revenue', 'cancelled_orders')
+    list_filter = ('store',)
+    date_hierarchy = 'date'
+    list_select_related = ('store',)
+
+
+@admin.register(ProductDailySales)
+class ProductDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('product', 'store', 'date', 'quantity', 'revenue')
+    list_filter = ('store',)
+    search_fields = ('product__name',)
+    date_hierarchy = 'date'
+    list_select_related = ('product', 'store')
+    raw_id_fields = ('product',)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Read-only view of orders moved out by archive_orders"""
+    list_display = ('id', 'customer_name', 'status', 'payment_status', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('status', 'payment_status')
+    search_fields = ('id', 'customer_name', 'customer_email')
+    list_select_related = ('store',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,268 @@
+"""
+Daily sales rollups for the store dashboard.
+
+StoreDailySales and ProductDailySales hold per-day totals (by order
+creation date, in the current time zone). They are kept up to date
+incrementally by the Order/OrderItem signals: each order and item
+remembers what it contributed when loaded (analytics_contribution() /
+analytics_line()) and only the difference is applied, as one
+INSERT ... ON CONFLICT DO UPDATE SET col = col + delta per table.
+rebuild() recomputes them from the raw orders, including archived ones
+(rebuild_sales_rollups).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+from . import store_cache
+from .models import ArchivedOrder, Order, OrderItem, ProductDailySales, Store, StoreDailySales
+
+CANCELLED = 'cancelled'
+PAID = 'paid'
+STORE_FIELDS = ['orders', 'revenue', 'paid_orders', 'paid_revenue', 'cancelled_orders']
+PRODUCT_FIELDS = ['quantity', 'revenue']
+REBUILD_BATCH_SIZE = 1000
+MAX_RANGE_DAYS = 366
+TOP_PRODUCTS = 10
+
+
+def _increment(model, key_fields, value_fields, rows):
+    """Add {key tuple: {field: delta}} to the rollup rows, creating missing ones"""
+    rows = {
+        key: deltas for key, deltas in rows.items()
+        if any(deltas.get(field) for field in value_fields)
+    }
+    if not rows:
+        return
+    fields = [model._meta.get_field(name) for name in key_fields + value_fields]
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    conflict = ', '.join(columns[:len(key_fields)])
+    updates = ', '.join(f'{column} = {table}.{column} + EXCLUDED.{column}' for column in columns[len(key_fields):])
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+
+    params = []
+    for key, deltas in sorted(rows.items()):
+        values = list(key) + [deltas.get(name, 0) for name in value_fields]
+        params.extend(field.get_db_prep_value(value, connection) for field, value in zip(fields, values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders} "
+            f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}",
+            params,
+        )
+
+
+def _store_deltas(contribution, sign):
+    _, _, status, payment_status, total = contribution
+    total = Decimal(total or 0)
+    if status == CANCELLED:
+        return {'cancelled_orders': sign}
+    paid = payment_status == PAID
+    return {
+        'orders': sign,
+        'revenue': sign * total,
+        'paid_orders': sign if paid else 0,
+        'paid_revenue': sign * total if paid else 0,
+    }
+
+
+def _product_key(contribution):
+    """(store, day) the order's items count towards; None when they don't count"""
+    if contribution is None or contribution[2] == CANCELLED:
+        return None
+    return contribution[0], contribution[1]
+
+
+def _add_line(rows, key, line, sign):
+    product_id, quantity, revenue = line
+    deltas = rows[key + (product_id,)]
+    deltas['quantity'] = deltas.get('quantity', 0) + sign * quantity
+    deltas['revenue'] = deltas.get('revenue', 0) + sign * revenue
+
+
+def sync_order(order, created=False, deleted=False):
+    """Apply the change in the order's contribution since it was loaded"""
+    old = order._loaded_analytics
+    new = None if deleted else order.analytics_contribution()
+    if old == new:
+        return
+
+    with transaction.atomic():
+        store_rows = defaultdict(dict)
+        for contribution, sign in ((old, -1), (new, 1)):
+            if contribution is not None:
+                deltas = store_rows[contribution[:2]]
+                for field, delta in _store_deltas(contribution, sign).items():
+                    deltas[field] = deltas.get(field, 0) + delta
+        _increment(StoreDailySales, ['store', 'date'], STORE_FIELDS, store_rows)
+
+        # Items move with the order when it is cancelled/restored or changes store/day;
+        # on delete they have already been removed one by one by sync_item()
+        old_key, new_key = _product_key(old), _product_key(new)
+        if old_key != new_key and not (created or deleted):
+            product_rows = defaultdict(dict)
+            for item in order.items.only('product_id', 'quantity', 'unit_price'):
+                line = item.analytics_line()
+                if old_key:
+                    _add_line(product_rows, old_key, line, -1)
+                if new_key:
+                    _add_line(product_rows, new_key, line, 1)
+            _increment(ProductDailySales, ['store', 'date', 'product'], PRODUCT_FIELDS, product_rows)
+
+    order._loaded_analytics = new
+
+
+def sync_item(item, deleted=False):
+    """Apply the change in the item's line since it was loaded"""
+    old = item._loaded_line
+    new = None if deleted else item.analytics_line()
+    if old == new:
+        return
+    key = _product_key(item.order._loaded_analytics)
+    if key is not None:
+        product_rows = defaultdict(dict)
+        if old:
+            _add_line(product_rows, key, old, -1)
+        if new:
+            _add_line(product_rows, key, new, 1)
+        _increment(ProductDailySales, ['store', 'date', 'product'], PRODUCT_FIELDS, product_rows)
+    item._loaded_line = new
+
+
+def _in_range(queryset, store_field, store_ids, start, end):
+    if store_ids is not None:
+        queryset = queryset.filter(**{f'{store_field}__in': store_ids})
+    if start is not None:
+        queryset = queryset.filter(day__gte=start)
+    if end is not None:
+        queryset = queryset.filter(day__lte=end)
+    return queryset
+
+
+def rebuild(store_ids=None, start=None, end=None):
+    """
+    Recompute the rollups from the raw orders (hot and archived) for the
+    given stores and date range (all when omitted). Returns
+    (store rows, product rows).
+    """
+    counted, paid = ~Q(status=CANCELLED), Q(payment_status=PAID) & ~Q(status=CANCELLED)
+    store_totals = defaultdict(lambda: dict.fromkeys(STORE_FIELDS, 0))
+    for model in (Order, ArchivedOrder):
+        orders = _in_range(
+            model.objects.filter(store__isnull=False).annotate(day=TruncDate('created_at')),
+            'store_id', store_ids, start, end,
+        )
+        for row in orders.order_by().values('store_id', 'day').annotate(
+            total_orders=Count('id', filter=counted),
+            total_revenue=Sum('total_amount', filter=counted),
+            total_paid_orders=Count('id', filter=paid),
+            total_paid_revenue=Sum('total_amount', filter=paid),
+            total_cancelled=Count('id', filter=Q(status=CANCELLED)),
+        ).iterator(chunk_size=REBUILD_BATCH_SIZE):
+            totals = store_totals[row['store_id'], row['day']]
+            totals['orders'] += row['total_orders']
+            totals['revenue'] += row['total_revenue'] or 0
+            totals['paid_orders'] += row['total_paid_orders']
+            totals['paid_revenue'] += row['total_paid_revenue'] or 0
+            totals['cancelled_orders'] += row['total_cancelled']
+
+    product_totals = defaultdict(lambda: dict.fromkeys(PRODUCT_FIELDS, 0))
+    items = _in_range(
+        OrderItem.objects.filter(order__store__isnull=False).exclude(order__status=CANCELLED)
+        .annotate(day=TruncDate('order__created_at')),
+        'order__store_id', store_ids, start, end,
+    )
+    for row in items.order_by().values('order__store_id', 'day', 'product_id').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(F('quantity') * F('unit_price'),
+                          output_field=DecimalField(max_digits=14, decimal_places=2)),
+    ).iterator(chunk_size=REBUILD_BATCH_SIZE):
+        totals = product_totals[row['order__store_id'], row['day'], row['product_id']]
+        totals['quantity'] += row['total_quantity']
+        totals['revenue'] += row['total_revenue'] or 0
+    # Archived items are JSON, so they are summed here
+    archived = _in_range(
+        ArchivedOrder.objects.filter(store__isnull=False).exclude(status=CANCELLED)
+        .annotate(day=TruncDate('created_at')),
+        'store_id', store_ids, start, end,
+    )
+    for row in archived.values('store_id', 'day', 'items').iterator(chunk_size=REBUILD_BATCH_SIZE):
+        for item in row['items']:
+            totals = product_totals[row['store_id'], row['day'], item['product']]
+            totals['quantity'] += item['quantity']
+            totals['revenue'] += item['quantity'] * Decimal(item['unit_price'])
+
+    rollups = [StoreDailySales.objects.all(), ProductDailySales.objects.all()]
+    if store_ids is not None:
+        rollups = [qs.filter(store_id__in=store_ids) for qs in rollups]
+    if start is not None:
+        rollups = [qs.filter(date__gte=start) for qs in rollups]
+    if end is not None:
+        rollups = [qs.filter(date__lte=end) for qs in rollups]
+
+    with transaction.atomic():
+        for qs in rollups:
+            qs.delete()
+        StoreDailySales.objects.bulk_create(
+            [StoreDailySales(store_id=store_id, date=day, **totals)
+             for (store_id, day), totals in store_totals.items()],
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+        ProductDailySales.objects.bulk_create(
+            [ProductDailySales(store_id=store_id, date=day, product_id=product_id, **totals)
+             for (store_id, day, product_id), totals in product_totals.items()],
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+        store_cache.invalidate(*(store_ids if store_ids is not None else Store.objects.values_list('pk', flat=True)))
+    return len(store_totals), len(product_totals)
+
+
+def _average(revenue, orders):
+    return (revenue / orders).quantize(Decimal('0.01')) if orders else Decimal('0.00')
+
+
+def summary(store, start, end, top=TOP_PRODUCTS):
+    """Dashboard data for [start, end] read only from the rollup tables"""
+    rows = {
+        row['date']: row for row in
+        StoreDailySales.objects.filter(store=store, date__gte=start, date__lte=end)
+        .values('date', *STORE_FIELDS)
+    }
+    days = []
+    totals = {field: 0 for field in STORE_FIELDS}
+    day = start
+    while day <= end:
+        row = rows.get(day, {})
+        values = {field: row.get(field) or 0 for field in STORE_FIELDS}
+        for field in STORE_FIELDS:
+            totals[field] += values[field]
+        days.append({
+            'date': day, **values,
+            'average_order_value': _average(Decimal(values['revenue']), values['orders']),
+        })
+        day += timedelta(days=1)
+    totals['average_order_value'] = _average(Decimal(totals['revenue']), totals['orders'])
+
+    top_products = list(
+        ProductDailySales.objects.filter(store=store, date__gte=start, date__lte=end)
+        .values('product_id', 'product__name')
+        .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+        .filter(total_quantity__gt=0)
+        .order_by('-total_revenue', '-total_quantity')[:top]
+    )
+    return {
+        'from': start,
+        'to': end,
+        'totals': totals,
+        'days': days,
+        'top_products': [
+            {'product': row['product_id'], 'name': row['product__name'],
+             'quantity': row['total_quantity'], 'revenue': row['total_revenue']}
+            for row in top_products
+        ],
+    }
@@ -0,0 +1,110 @@
+"""
+Archiving of old orders.
+
+Delivered and cancelled orders (final states) older than a cutoff are
+copied into ArchivedOrder, with their items and status history as JSON,
+and removed from Order / OrderItem / OrderStatusUpdate in batched
+transactions, so the hot tables and their indexes only hold recent and
+open orders. Retrieve and export read through to the archive.
+
+The hot rows are removed with plain DELETE statements on purpose: the
+model signals would otherwise treat them as deleted orders (sales
+rollups, order totals), while archived orders still count as history.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import store_cache
+from .models import ArchivedOrder, Order, OrderItem, OrderStatusUpdate, PurchasedProduct, StockMovement
+
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+DEFAULT_BATCH_SIZE = 500
+
+ORDER_FIELDS = [
+    'id', 'store_id', 'customer_name', 'customer_email', 'customer_phone', 'shipping_address',
+    'status', 'total_amount', 'payment_method', 'payment_status', 'paid_at', 'created_at', 'updated_at',
+]
+
+
+def cutoff_for(months, now=None):
+    """Orders created before this moment are old enough to archive"""
+    return (now or timezone.now()) - timedelta(days=30 * months)
+
+
+def archivable(cutoff):
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def _delete_rows(model, column, ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {connection.ops.quote_name(column)} IN ({placeholders})", ids)
+
+
+def archive_batch(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Archive up to batch_size orders in one transaction; returns how many were moved"""
+    with transaction.atomic():
+        ids = list(
+            archivable(cutoff).select_for_update(skip_locked=True, of=('self',))
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        items, updates = {}, {}
+        for item in OrderItem.objects.filter(order_id__in=ids).order_by('id').values(
+            'id', 'order_id', 'product_id', 'product__name', 'variant_id', 'variant__name', 'quantity', 'unit_price'
+        ):
+            items.setdefault(item['order_id'], []).append({
+                'id': item['id'],
+                'product': item['product_id'],
+                'product_name': item['product__name'],
+                'variant': item['variant_id'],
+                'variant_name': item['variant__name'],
+                'quantity': item['quantity'],
+                'unit_price': item['unit_price'],
+                'subtotal': item['quantity'] * item['unit_price'],
+            })
+        for update in OrderStatusUpdate.objects.filter(order_id__in=ids).order_by('-created_at', '-id').values(
+            'id', 'order_id', 'status', 'note', 'is_automatic', 'created_at'
+        ):
+            updates.setdefault(update.pop('order_id'), []).append(update)
+
+        now = timezone.now()
+        orders = list(Order.objects.filter(pk__in=ids).values(*ORDER_FIELDS))
+        ArchivedOrder.objects.bulk_create(
+            [
+                ArchivedOrder(
+                    **order, archived_at=now,
+                    items=items.get(order['id'], []),
+                    item_count=len(items.get(order['id'], [])),
+                    status_updates=updates.get(order['id'], []),
+                )
+                for order in orders
+            ],
+            ignore_conflicts=True,
+        )
+
+        # References that would otherwise block or cascade (SET_NULL in the models)
+        PurchasedProduct.objects.filter(last_order_id__in=ids).update(last_order=None)
+        StockMovement.objects.filter(order_id__in=ids).update(order=None)
+        _delete_rows(OrderStatusUpdate, 'order_id', ids)
+        _delete_rows(OrderItem, 'order_id', ids)
+        _delete_rows(Order, 'id', ids)
+        store_cache.invalidate(*{order['store_id'] for order in orders})
+    return len(ids)
+
+
+def archive_orders(cutoff, batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """Archive every archivable order created before cutoff, batch by batch"""
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
@@ -0,0 +1,148 @@
+"""
+Async read endpoints for the public catalog (/api/catalog/...).
+
+They return the same data as the anonymous product/category reads of the
+DRF viewsets, but are plain async views using the async ORM, so under
+ASGI (SERVER_MODE=asgi) a request waiting on the database does not hold
+a worker thread. Everything the serializers read is loaded up front
+(select_related/prefetch_related/annotations), so serializing never
+touches the database from the event loop.
+
+With CATALOG_SNAPSHOT on, the listings are served from the in-process
+catalog_snapshot instead, without queries.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import catalog_snapshot
+from .models import Category, Product
+from .serializers import ProductLiteSerializer, ProductSerializer
+
+PAGE_SIZE = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _price_bounds(request):
+    """(min_price, max_price) from the query string; ValueError when invalid"""
+    bounds = []
+    for param in ('min_price', 'max_price'):
+        value = request.GET.get(param)
+        try:
+            bound = Decimal(value) if value else None
+        except InvalidOperation:
+            bound = Decimal('NaN')
+        if bound is not None and not bound.is_finite():
+            raise ValueError(f'{param} inválido')
+        bounds.append(bound)
+    return bounds
+
+
+def _price_filters(products, min_price, max_price):
+    """Price bounds on the variant prices, as in CategoryViewSet.products"""
+    if min_price is not None:
+        products = products.filter(variants__price__gte=min_price)
+    if max_price is not None:
+        products = products.filter(variants__price__lte=max_price)
+    return products.distinct()
+
+
+def _page_number(request):
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        return None
+    return page if page >= 1 else None
+
+
+def _page_response(request, page, count, results):
+    """PageNumberPagination-shaped response"""
+    def link(number):
+        query = request.GET.copy()
+        query['page'] = number
+        return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+    return JsonResponse({
+        'count': count,
+        'next': link(page + 1) if page * PAGE_SIZE < count else None,
+        'previous': link(page - 1) if page > 1 else None,
+        'results': results,
+    })
+
+
+async def _page(request, products):
+    """One page of a queryset (?page=N)"""
+    page = _page_number(request)
+    count = await products.acount() if page else 0
+    start = (page - 1) * PAGE_SIZE if page else 0
+    if page is None or (start and start >= count):
+        return _error('Página inválida.', status=404)
+    results = [product async for product in products[start:start + PAGE_SIZE]]
+    return _page_response(request, page, count, ProductLiteSerializer(
+        results, many=True, context={'request': request}
+    ).data)
+
+
+def _snapshot_page(request, records):
+    """One page of catalog_snapshot records (?page=N)"""
+    page = _page_number(request)
+    start = (page - 1) * PAGE_SIZE if page else 0
+    if page is None or (start and start >= len(records)):
+        return _error('Página inválida.', status=404)
+    return _page_response(request, page, len(records), [
+        record.as_lite(request) for record in records[start:start + PAGE_SIZE]
+    ])
+
+
+def _listing():
+    return Product.objects.filter(is_active=True).with_min_price().order_by('-created_at', '-pk')
+
+
+@require_GET
+async def product_list(request):
+    """Produtos ativos (resumo: nome, imagem, menor preço), paginados."""
+    try:
+        min_price, max_price = _price_bounds(request)
+    except ValueError as e:
+        return _error(str(e))
+    if catalog_snapshot.enabled():
+        snapshot = await catalog_snapshot.acurrent()
+        return _snapshot_page(request, snapshot.filter(min_price=min_price, max_price=max_price))
+    return await _page(request, _price_filters(_listing(), min_price, max_price))
+
+
+@require_GET
+async def category_products(request, slug):
+    """Produtos ativos de uma categoria ativa, paginados."""
+    try:
+        min_price, max_price = _price_bounds(request)
+    except ValueError as e:
+        return _error(str(e))
+    if catalog_snapshot.enabled():
+        snapshot = await catalog_snapshot.acurrent()
+        if not snapshot.has_category(slug):
+            return _error('Categoria não encontrada.', status=404)
+        return _snapshot_page(request, snapshot.filter(slug, min_price, max_price))
+    if not await Category.objects.filter(slug=slug, is_active=True).aexists():
+        return _error('Categoria não encontrada.', status=404)
+    products = _listing().filter(categories__slug=slug)
+    return await _page(request, _price_filters(products, min_price, max_price))
+
+
+@require_GET
+async def product_detail(request, pk):
+    """Detalhe de um produto ativo, no mesmo formato de /api/products/{id}/."""
+    product = await (
+        Product.objects.filter(is_active=True)
+        .select_related('store', 'rating_summary')
+        .prefetch_related('categories', 'variants', 'variant_attributes__values__attribute')
+        .filter(pk=pk).afirst()
+    )
+    if product is None:
+        return _error('Produto não encontrado.', status=404)
+    return JsonResponse(ProductSerializer(product, context={'request': request}).data)
@@ -0,0 +1,181 @@
+"""
+Benchmarks for the API hot paths, run through the test client against a
+synthetic dataset (sales.synthetic).
+
+Each scenario is a function (context, iteration) -> response that makes
+one or more requests. run() times `iterations` calls after `warmup`
+untimed ones and reports, per scenario:
+- latency percentiles
+- SQL queries per call
+- errors
+- peak Python memory allocated during one extra traced call
+
+Scenarios share the dataset and may write to it (checkout, wishlist), so
+the benchmark command runs them inside a transaction that it rolls back.
+"""
+import logging
+import math
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from .models import Category, Coupon, Product, ProductVariant, Store
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class BenchmarkContext:
+    """Clients and ids of the dataset the scenarios run against"""
+
+    def __init__(self, prefix):
+        self.store = Store.objects.select_related('owner').filter(owner__username__startswith=f'{prefix}-owner-') \
+            .order_by('pk').first()
+        if self.store is None:
+            raise LookupError(f'Nenhum dataset sintético com o prefixo "{prefix}"')
+        self.customer = User.objects.filter(username__startswith=f'{prefix}-customer-').order_by('pk').first()
+        self.product_ids = list(
+            Product.objects.filter(store=self.store).order_by('pk').values_list('pk', flat=True)[:100]
+        )
+        self.variant_ids = list(
+            ProductVariant.objects.filter(product_id__in=self.product_ids, stock__gt=10)
+            .order_by('pk').values_list('pk', flat=True)[:100]
+        )
+        self.category_slugs = list(
+            Category.objects.filter(slug__startswith=f'{prefix}-cat-').order_by('pk').values_list('slug', flat=True)
+        )
+        self.coupon_code = Coupon.objects.filter(code__startswith=f'{prefix}-'.upper()).values_list(
+            'code', flat=True).first()
+
+        self.anonymous = APIClient()
+        self.owner = APIClient()
+        self.owner.force_authenticate(self.store.owner)
+        self.shopper = APIClient()
+        self.shopper.force_authenticate(self.customer)
+
+    def pick(self, values, i):
+        return values[i % len(values)]
+
+
+def product_list(ctx, i):
+    return ctx.anonymous.get('/api/products/')
+
+
+def product_retrieve(ctx, i):
+    return ctx.anonymous.get(f'/api/products/{ctx.pick(ctx.product_ids, i)}/')
+
+
+def category_products(ctx, i):
+    return ctx.anonymous.get(f'/api/categories/{ctx.pick(ctx.category_slugs, i)}/products/')
+
+
+def order_list(ctx, i):
+    return ctx.owner.get('/api/orders/')
+
+
+def checkout(ctx, i):
+    """Reserve the cart, check it, create the order and release the reservation"""
+    token = f'bench-{i}'
+    items = [{'variant': ctx.pick(ctx.variant_ids, i + n), 'quantity': 1} for n in range(2)]
+    for path, data in (('sync', {'items': items}), ('check', {'items': items})):
+        response = ctx.anonymous.post(f'/api/cart/reservations/{path}/', {'cart_token': token, **data}, format='json')
+        if response.status_code >= 400:
+            return response
+    response = ctx.owner.post('/api/orders/', {
+        'customer_name': ctx.customer.username, 'customer_email': ctx.customer.email,
+        'shipping_address': 'Rua do Benchmark, 1', 'payment_method': 'cod',
+    }, format='json')
+    ctx.anonymous.post('/api/cart/reservations/release/', {'cart_token': token}, format='json')
+    return response
+
+
+def coupon_validation(ctx, i):
+    return ctx.anonymous.post('/api/coupons/validate_coupon/', {'code': ctx.coupon_code, 'total': '150.00'},
+                              format='json')
+
+
+def wishlist_toggle(ctx, i):
+    return ctx.shopper.post('/api/wishlist/toggle/', {'product': ctx.pick(ctx.product_ids, i // 2)}, format='json')
+
+
+SCENARIOS = {
+    'product_list': product_list,
+    'product_retrieve': product_retrieve,
+    'category_products': category_products,
+    'order_list': order_list,
+    'checkout': checkout,
+    'coupon_validation': coupon_validation,
+    'wishlist_toggle': wishlist_toggle,
+}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+@contextmanager
+def _benchmark_environment():
+    """Test client host allowed, per-request log lines muted, store cache off"""
+    request_logger = logging.getLogger('core.requests')
+    disabled = request_logger.disabled
+    request_logger.disabled = True
+    try:
+        # Repeated identical requests would all be store cache hits
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], STORE_CACHE_TIMEOUT=0):
+            yield
+    finally:
+        request_logger.disabled = disabled
+
+
+def run_scenario(ctx, scenario, iterations, warmup):
+    for i in range(warmup):
+        scenario(ctx, i)
+
+    latencies, queries, errors = [], [], 0
+    for i in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario(ctx, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        errors += response.status_code >= 400
+
+    tracemalloc.start()
+    try:
+        scenario(ctx, warmup + iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'latency_ms': {
+            'min': round(latencies[0], 2),
+            'mean': round(sum(latencies) / len(latencies), 2),
+            **{f'p{p}': round(percentile(latencies, p), 2) for p in PERCENTILES},
+            'max': round(latencies[-1], 2),
+        },
+        'queries': {'min': min(queries), 'max': max(queries), 'mean': round(sum(queries) / len(queries), 1)},
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(prefix, scenarios=None, iterations=50, warmup=5):
+    """{scenario name: results} for the chosen scenarios (all by default)"""
+    names = scenarios or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f'Cenários desconhecidos: {", ".join(sorted(unknown))}')
+    with _benchmark_environment():
+        ctx = BenchmarkContext(prefix)
+        return {name: run_scenario(ctx, SCENARIOS[name], iterations, warmup) for name in names}
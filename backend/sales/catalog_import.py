@@ -0,0 +1,429 @@
+"""
+Streaming CSV/JSONL catalog import.
+
+Each row describes one variant and the product it belongs to:
+
+    product_sku, product_name, description, is_active, categories,
+    variant_sku, variant_name, price, stock, attributes
+
+A row with empty variant_sku, variant_name and attributes describes a
+product without variants; its price (optional) and stock are the
+product's own. A row with an empty product_sku (products exported without
+one) matches the store's product of that name that has no SKU, or creates
+it.
+
+'categories' is a '|' separated list of category names and 'attributes'
+a '|' separated list of 'Attribute:Value' pairs (JSONL rows may use lists
+/ objects instead). Products and variants are upserted by SKU with
+bulk_create(update_conflicts=True), one transaction per chunk, so files
+of any size are processed in constant memory.
+"""
+import codecs
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core import metrics
+
+from . import catalog_snapshot, store_cache
+from .models import Attribute, AttributeValue, Category, Product, ProductVariant, StockMovement
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+TRUE_VALUES = {'1', 'true', 'yes', 'sim', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'nao', 'não', 'n'}
+
+
+def _read_error(error):
+    if isinstance(error, UnicodeDecodeError):
+        return 'Arquivo deve estar codificado em UTF-8; leitura interrompida'
+    return f'CSV malformado ({error}); leitura interrompida'
+
+
+def read_rows(binary_file, file_format):
+    """
+    Yield (line_number, dict) from a binary file object without loading it
+    whole. A file that can't be read any further (not UTF-8, malformed CSV)
+    ends with an '__error__' row instead of raising.
+    """
+    text = codecs.getreader('utf-8-sig')(binary_file)
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except (UnicodeDecodeError, csv.Error) as e:
+            yield reader.line_num + 1, {'__error__': _read_error(e)}
+    elif file_format == 'jsonl':
+        line_number = 0
+        try:
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, {'__error__': f'JSON inválido: {e}'}
+                    continue
+                yield line_number, row if isinstance(row, dict) else {'__error__': 'Cada linha deve ser um objeto JSON'}
+        except UnicodeDecodeError as e:
+            yield line_number + 1, {'__error__': _read_error(e)}
+    else:
+        raise ValueError(f'Formato não suportado: {file_format}')
+
+
+def detect_format(filename, default='csv'):
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def _split(value, separator='|'):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [part.strip() for part in str(value).split(separator) if part.strip()]
+
+
+def _parse_attributes(value):
+    if isinstance(value, dict):
+        pairs = value.items()
+    else:
+        pairs = []
+        for item in _split(value):
+            if ':' not in item:
+                raise ValueError(f"atributo '{item}' deve estar no formato Nome:Valor")
+            name, val = item.split(':', 1)
+            pairs.append((name, val))
+    return [(str(name).strip(), str(val).strip()) for name, val in pairs if str(name).strip() and str(val).strip()]
+
+
+def _parse_bool(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"valor booleano inválido: '{value}'")
+
+
+def validate_row(row):
+    """Return (clean_row, errors) for one raw row"""
+    if '__error__' in row:
+        return None, [row['__error__']]
+
+    errors = []
+    clean = {
+        'product_only': not any(str(row.get(field) or '').strip()
+                                for field in ('variant_sku', 'variant_name', 'attributes')),
+    }
+    for field in ('product_sku', 'product_name', 'variant_sku'):
+        value = str(row.get(field) or '').strip()
+        optional = field == 'product_sku' or (field == 'variant_sku' and clean['product_only'])
+        if not value and not optional:
+            errors.append(f'{field} é obrigatório')
+        clean[field] = value
+    if len(clean['product_sku']) > 100 or len(clean['variant_sku']) > 100:
+        errors.append('SKU deve ter até 100 caracteres')
+    if len(clean['product_name']) > 200:
+        errors.append('product_name deve ter até 200 caracteres')
+
+    price = row.get('price')
+    if clean['product_only'] and (price is None or str(price).strip() == ''):
+        # Products without variants may have no price
+        clean['price'] = None
+    else:
+        try:
+            clean['price'] = Decimal(str(price).strip())
+            if not clean['price'].is_finite() or clean['price'] < Decimal('0.01'):
+                errors.append('price deve ser maior ou igual a 0.01')
+        except (InvalidOperation, TypeError):
+            errors.append('price inválido')
+
+    try:
+        stock = row.get('stock')
+        clean['stock'] = int(stock) if stock not in (None, '') else 0
+        if clean['stock'] < 0:
+            errors.append('stock não pode ser negativo')
+    except (TypeError, ValueError):
+        errors.append('stock inválido')
+
+    try:
+        clean['is_active'] = _parse_bool(row.get('is_active'))
+        clean['attributes'] = _parse_attributes(row.get('attributes'))
+    except ValueError as e:
+        errors.append(str(e))
+
+    clean['description'] = str(row.get('description') or '')
+    clean['variant_name'] = str(row.get('variant_name') or '')[:255]
+    clean['categories'] = _split(row.get('categories'))
+    for name in clean['categories']:
+        if not slugify(name) or len(name) > 200:
+            errors.append(f"categoria inválida: '{name}'")
+    return (None if errors else clean), errors
+
+
+def product_key(row):
+    """The SKU, or the name for products without one"""
+    return row['product_sku'] or ('name', row['product_name'])
+
+
+class CatalogImporter:
+    """Validates rows in chunks and upserts them into the store's catalog"""
+
+    def __init__(self, store, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.rows = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        self._categories = {}
+        self._attributes = {}
+        self._attribute_values = {}
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'dry_run': self.dry_run,
+        }
+
+    def add_error(self, line, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line, 'errors': messages})
+
+    def run(self, rows):
+        chunk = []
+        for line, row in rows:
+            self.rows += 1
+            clean, errors = validate_row(row)
+            if errors:
+                self.add_error(line, errors)
+                continue
+            chunk.append((line, clean))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.report()
+
+    def import_chunk(self, chunk):
+        with transaction.atomic():
+            chunk = self._reject_foreign_skus(chunk)
+            if chunk:
+                self._upsert(chunk)
+                self.imported += len(chunk)
+                store_cache.invalidate(self.store.pk)
+                # Variants may move between products: rebuild
+                catalog_snapshot.changed(None)
+            if self.dry_run:
+                transaction.set_rollback(True)
+        if self.dry_run:
+            # Rolled back rows must not be reused from the caches
+            self._categories.clear()
+            self._attributes.clear()
+            self._attribute_values.clear()
+
+    def _reject_foreign_skus(self, chunk):
+        """SKUs are global; rows touching another store's product or variant are rejected"""
+        product_skus = {row['product_sku'] for _, row in chunk if row['product_sku']}
+        variant_skus = {row['variant_sku'] for _, row in chunk if not row['product_only']}
+        foreign_products = set(
+            Product.objects.filter(sku__in=product_skus).exclude(store=self.store).values_list('sku', flat=True)
+        )
+        foreign_variants = set(
+            ProductVariant.objects.filter(sku__in=variant_skus).exclude(product__store=self.store)
+            .values_list('sku', flat=True)
+        )
+
+        accepted = []
+        seen_variants = {}
+        for line, row in chunk:
+            if row['product_sku'] in foreign_products:
+                self.add_error(line, [f"product_sku '{row['product_sku']}' pertence a outra loja"])
+            elif row['variant_sku'] in foreign_variants:
+                self.add_error(line, [f"variant_sku '{row['variant_sku']}' pertence a outra loja"])
+            else:
+                # Last row wins when a chunk repeats a variant SKU (or a product-only row)
+                key = ('product', product_key(row)) if row['product_only'] else row['variant_sku']
+                if key in seen_variants:
+                    accepted[seen_variants[key]] = (line, row)
+                else:
+                    seen_variants[key] = len(accepted)
+                    accepted.append((line, row))
+        return accepted
+
+    def _upsert(self, chunk):
+        now = timezone.now()
+        rows = [row for _, row in chunk]
+
+        # Products (last row wins for product-level fields); rows of products
+        # without variants also set the product's own price and stock
+        products = {product_key(row): row for row in rows}
+        for product_only in (False, True):
+            batch = [
+                Product(
+                    store=self.store, sku=sku, name=row['product_name'],
+                    description=row['description'], is_active=row['is_active'],
+                    price=row['price'] if product_only else None, stock=row['stock'] if product_only else 0,
+                    created_at=now, updated_at=now,
+                )
+                for sku, row in products.items() if row['product_only'] == product_only and row['product_sku']
+            ]
+            if batch:
+                Product.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=['name', 'description', 'is_active', 'updated_at']
+                    + (['price', 'stock'] if product_only else []),
+                )
+        product_ids = dict(Product.objects.filter(
+            sku__in=[row['product_sku'] for row in products.values() if row['product_sku']]
+        ).values_list('sku', 'id'))
+        product_ids.update(self._upsert_without_sku(
+            [row for row in products.values() if not row['product_sku']], now
+        ))
+
+        # Variants (current stock is read first so the change goes to the ledger)
+        variant_rows = [row for row in rows if not row['product_only']]
+        previous_stock = dict(
+            ProductVariant.objects.select_for_update().filter(sku__in=[row['variant_sku'] for row in variant_rows])
+            .values_list('sku', 'stock')
+        )
+        variants = [
+            ProductVariant(
+                product_id=product_ids[product_key(row)], sku=row['variant_sku'], name=row['variant_name'],
+                price=row['price'], stock=row['stock'], is_active=True, created_at=now, updated_at=now,
+            )
+            for row in variant_rows
+        ]
+        ProductVariant.objects.bulk_create(
+            variants,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=['product', 'name', 'price', 'stock', 'is_active', 'updated_at'],
+        )
+        variant_ids = dict(
+            ProductVariant.objects.filter(sku__in=[v.sku for v in variants]).values_list('sku', 'id')
+        )
+        StockMovement.record_many(
+            {variant_ids[v.sku]: v.stock - previous_stock.get(v.sku, 0) for v in variants},
+            StockMovement.IMPORT,
+        )
+        metrics.record_stock_outs(
+            sum(1 for v in variants if v.stock == 0 and previous_stock.get(v.sku, 0) > 0),
+            StockMovement.IMPORT,
+        )
+
+        self._link_categories(rows, product_ids)
+        self._link_attributes(variant_rows, product_ids, variant_ids)
+
+    def _upsert_without_sku(self, rows, now):
+        """{('name', name): id} for products without SKU, matched by name in the store"""
+        existing = {}
+        for pk, name in Product.objects.filter(
+            Q(sku__isnull=True) | Q(sku=''), store=self.store, name__in=[row['product_name'] for row in rows]
+        ).order_by('id').values_list('id', 'name'):
+            existing.setdefault(name, pk)
+
+        updated, created = [], []
+        for row in rows:
+            product = Product(
+                pk=existing.get(row['product_name']), store=self.store, name=row['product_name'],
+                description=row['description'], is_active=row['is_active'],
+                price=row['price'] if row['product_only'] else None,
+                stock=row['stock'] if row['product_only'] else 0, created_at=now, updated_at=now,
+            )
+            (updated if product.pk else created).append((row, product))
+        for product_only in (False, True):
+            Product.objects.bulk_update(
+                [product for row, product in updated if row['product_only'] == product_only],
+                ['description', 'is_active', 'updated_at'] + (['price', 'stock'] if product_only else []),
+            )
+        Product.objects.bulk_create([product for _, product in created])
+        return {product_key(row): product.pk for row, product in updated + created}
+
+    def _link_categories(self, rows, product_ids):
+        """Categories are matched by name, then by slug ('Calçados' links to an existing 'calcados')"""
+        names = {name for row in rows for name in row['categories']}
+        missing = names - self._categories.keys()
+        if missing:
+            slugs = {name: slugify(name)[:200] for name in missing}
+            Category.objects.bulk_create(
+                [Category(name=name, slug=slug) for name, slug in slugs.items()],
+                ignore_conflicts=True,
+            )
+            by_name = dict(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+            by_slug = dict(Category.objects.filter(slug__in=slugs.values()).values_list('slug', 'id'))
+            for name, slug in slugs.items():
+                self._categories[name] = by_name.get(name) or by_slug[slug]
+
+        links = {
+            (product_ids[product_key(row)], self._categories[name])
+            for row in rows for name in row['categories']
+        }
+        Through = Product.categories.through
+        Through.objects.bulk_create(
+            [Through(product_id=product_id, category_id=category_id) for product_id, category_id in links],
+            ignore_conflicts=True,
+        )
+
+    def _link_attributes(self, rows, product_ids, variant_ids):
+        attribute_names = {name for row in rows for name, _ in row['attributes']}
+        missing = attribute_names - self._attributes.keys()
+        if missing:
+            Attribute.objects.bulk_create([Attribute(name=name) for name in missing], ignore_conflicts=True)
+            self._attributes.update(Attribute.objects.filter(name__in=missing).values_list('name', 'id'))
+
+        pairs = {(name, value) for row in rows for name, value in row['attributes']}
+        missing = pairs - self._attribute_values.keys()
+        if missing:
+            AttributeValue.objects.bulk_create(
+                [AttributeValue(attribute_id=self._attributes[name], value=value) for name, value in missing],
+                ignore_conflicts=True,
+            )
+            attribute_names = {attribute_id: name for name, attribute_id in self._attributes.items()}
+            for value_id, attribute_id, value in AttributeValue.objects.filter(
+                attribute_id__in={self._attributes[name] for name, _ in missing},
+                value__in={value for _, value in missing},
+            ).values_list('id', 'attribute_id', 'value'):
+                self._attribute_values[(attribute_names[attribute_id], value)] = value_id
+
+        # Variant values are replaced by the imported ones
+        VariantValues = ProductVariant.values.through
+        VariantValues.objects.filter(productvariant_id__in=variant_ids.values()).delete()
+        VariantValues.objects.bulk_create([
+            VariantValues(productvariant_id=variant_ids[row['variant_sku']],
+                          attributevalue_id=self._attribute_values[pair])
+            for row in rows for pair in dict.fromkeys(row['attributes'])
+        ], ignore_conflicts=True)
+
+        ProductAttributes = Product.variant_attributes.through
+        ProductAttributes.objects.bulk_create([
+            ProductAttributes(product_id=product_id, attribute_id=attribute_id)
+            for product_id, attribute_id in {
+                (product_ids[product_key(row)], self._attributes[name])
+                for row in rows for name, _ in row['attributes']
+            }
+        ], ignore_conflicts=True)
@@ -0,0 +1,270 @@
+"""
+In-process, read-only snapshot of the active catalog for the storefront.
+
+The public catalog listings (/api/catalog/products/ and
+/api/catalog/categories/<slug>/products/) read the same few thousand
+active products over and over. With CATALOG_SNAPSHOT on, each process
+keeps them in memory and those views filter, count and paginate without
+touching the ORM:
+
+- one ProductRecord (__slots__, prices as integer cents) per active
+  product, in listing order (newest first);
+- per active category, an array of positions into that list.
+
+A full build is four bulk queries: products, grouped variant prices,
+active categories and category memberships.
+
+Changes are published through a change-version counter in the cache:
+every write to a product, variant, category or category membership calls
+changed(), which increments the counter and stores the changed product
+ids under the new version. A process whose snapshot is behind reads the
+logged ids, reloads only those products, and re-reads the (small)
+categories and memberships. It does a full rebuild when the log has gaps
+(expired or evicted), for bulk changes logged as None, after too many
+versions, or when the last full rebuild is older than
+CATALOG_SNAPSHOT_MAX_AGE, which catches changes that never reach the log
+(queryset .update(), raw SQL, bulk_create).
+
+Like store_cache, changes are published right away and again on commit,
+and several workers need a shared cache (REDIS_URL) to see each other's
+changes.
+
+Settings:
+    CATALOG_SNAPSHOT          serve the catalog listings from the snapshot (default False)
+    CATALOG_SNAPSHOT_MAX_AGE  seconds before a full rebuild (default 600)
+"""
+import random
+import threading
+import time
+from array import array
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from . import images
+from .models import Category, Product, ProductVariant
+
+VERSION_KEY = 'catalog-snapshot:version'
+CHANGES_KEY = 'catalog-snapshot:changes:{}'
+# Versions a process may catch up with from the log before rebuilding
+MAX_LOGGED_VERSIONS = 500
+LOG_TIMEOUT = 3600
+LOAD_BATCH_SIZE = 1000
+
+
+def enabled():
+    return getattr(settings, 'CATALOG_SNAPSHOT', False)
+
+
+def _cents(value):
+    return None if value is None else int(value * 100)
+
+
+def _decimal(cents):
+    return None if cents is None else Decimal(cents).scaleb(-2)
+
+
+class ProductRecord:
+    """What the storefront listings need from one product"""
+    __slots__ = ('id', 'name', 'image', 'srcset', 'price', 'low', 'high', 'created')
+
+    def __init__(self, id, name, image, srcset, price, low, high, created):
+        self.id = id
+        self.name = name
+        self.image = image        # relative URL or None
+        self.srcset = srcset      # images.build_srcset() with relative URLs
+        self.price = price        # display price in cents (ProductLiteSerializer.price)
+        self.low = low            # lowest/highest price of any variant (price filters);
+        self.high = high          # None without variants
+        self.created = created    # (created_at timestamp, id): listing order
+
+    def as_lite(self, request):
+        """Same data as ProductLiteSerializer"""
+        absolute = request.build_absolute_uri
+        return {
+            'id': self.id,
+            'name': self.name,
+            'image': absolute(self.image) if self.image else None,
+            'image_srcset': {
+                key: {width: absolute(url) for width, url in urls.items()}
+                for key, urls in self.srcset.items()
+            },
+            'price': _decimal(self.price),
+        }
+
+
+class Snapshot:
+    __slots__ = ('version', 'full_built_at', 'products', 'by_id', 'categories')
+
+    def __init__(self, version, records, full_built_at):
+        self.version = version
+        # When the records were last loaded in full: incremental builds keep
+        # it, so changes the log can't see are caught within MAX_AGE
+        self.full_built_at = full_built_at
+        self.by_id = records
+        self.products = sorted(records.values(), key=lambda record: record.created, reverse=True)
+        self.categories = {}
+
+    def expired(self):
+        return time.monotonic() - self.full_built_at >= getattr(settings, 'CATALOG_SNAPSHOT_MAX_AGE', 600)
+
+    def stale(self, version):
+        return version != self.version or self.expired()
+
+    def has_category(self, slug):
+        return slug in self.categories
+
+    def filter(self, category=None, min_price=None, max_price=None):
+        """
+        Records in listing order, as CategoryViewSet.products/async_views
+        filter them: a price bound matches when any variant satisfies it.
+        """
+        candidates = self.products
+        if category is not None:
+            candidates = [self.products[position] for position in self.categories.get(category, ())]
+        if min_price is not None:
+            min_cents = min_price * 100
+            candidates = [r for r in candidates if r.high is not None and r.high >= min_cents]
+        if max_price is not None:
+            max_cents = max_price * 100
+            candidates = [r for r in candidates if r.low is not None and r.low <= max_cents]
+        return candidates
+
+
+def _load(ids=None):
+    """{id: ProductRecord} for the active products (all, or these ids)"""
+    products = Product.objects.filter(is_active=True).values_list(
+        'id', 'name', 'image', 'image_renditions', 'price', 'created_at'
+    )
+    prices = ProductVariant.objects.values('product_id').annotate(
+        low=Min('price'), high=Max('price'), active_low=Min('price', filter=Q(is_active=True)),
+    ).values_list('product_id', 'low', 'high', 'active_low').order_by()
+    if ids is None:
+        batches = [(products, prices)]
+    else:
+        ids = list(ids)
+        batches = [
+            (products.filter(pk__in=ids[start:start + LOAD_BATCH_SIZE]),
+             prices.filter(product_id__in=ids[start:start + LOAD_BATCH_SIZE]))
+            for start in range(0, len(ids), LOAD_BATCH_SIZE)
+        ]
+
+    records = {}
+    for products_batch, prices_batch in batches:
+        variant_prices = {row[0]: row[1:] for row in prices_batch}
+        for pk, name, image, renditions, price, created_at in products_batch:
+            # Unsaved instance: only for the image URL helpers
+            product = Product(pk=pk, image=image or None, image_renditions=renditions or {})
+            low, high, active_low = variant_prices.get(pk, (None, None, None))
+            records[pk] = ProductRecord(
+                id=pk, name=name,
+                image=product.image.url if product.image else None,
+                srcset=images.build_srcset(product),
+                price=_cents(active_low if pk in variant_prices else price),
+                low=_cents(low), high=_cents(high),
+                created=(created_at.timestamp(), pk),
+            )
+    return records
+
+
+def _index_categories(snapshot):
+    positions = {record.id: position for position, record in enumerate(snapshot.products)}
+    slugs = dict(Category.objects.filter(is_active=True).values_list('pk', 'slug'))
+    members = {pk: [] for pk in slugs}
+    memberships = Product.categories.through.objects.filter(
+        category_id__in=slugs
+    ).values_list('category_id', 'product_id')
+    for category_id, product_id in memberships:
+        if product_id in positions:
+            members[category_id].append(positions[product_id])
+    snapshot.categories = {slugs[pk]: array('l', sorted(found)) for pk, found in members.items()}
+
+
+def _changed_ids(snapshot, version):
+    """Product ids changed since the snapshot, or None when it must be rebuilt"""
+    if (snapshot is None or not isinstance(snapshot.version, int) or not isinstance(version, int)
+            or not 0 <= version - snapshot.version <= MAX_LOGGED_VERSIONS or snapshot.expired()):
+        return None
+    keys = [CHANGES_KEY.format(v) for v in range(snapshot.version + 1, version + 1)]
+    logged = cache.get_many(keys)
+    if len(logged) < len(keys) or any(ids is None for ids in logged.values()):
+        return None
+    return set().union(*logged.values())
+
+
+def build(previous=None):
+    """New snapshot: incremental from `previous` when the change log allows"""
+    # Read before loading: changes logged meanwhile are applied next time
+    version = cache.get(VERSION_KEY)
+    ids = _changed_ids(previous, version)
+    if ids is None:
+        full_built_at = time.monotonic()
+        records = _load()
+    else:
+        full_built_at = previous.full_built_at
+        records = dict(previous.by_id)
+        for pk in ids:
+            records.pop(pk, None)
+        records.update(_load(ids))
+    snapshot = Snapshot(version, records, full_built_at)
+    _index_categories(snapshot)
+    return snapshot
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def current():
+    """The process snapshot, refreshed first if the catalog changed"""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and not snapshot.stale(cache.get(VERSION_KEY)):
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.stale(cache.get(VERSION_KEY)):
+            _snapshot = build(_snapshot)
+        return _snapshot
+
+
+async def acurrent():
+    """current() for async views: only a refresh leaves the event loop"""
+    snapshot = _snapshot
+    if snapshot is not None and not snapshot.stale(await cache.aget(VERSION_KEY)):
+        return snapshot
+    return await sync_to_async(current)()
+
+
+def reset():
+    """Drop the process snapshot (tests)"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def _publish(ids):
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        # Random start: a counter evicted from the cache doesn't restart at
+        # a version some process already has
+        cache.add(VERSION_KEY, random.randrange(1 << 40), None)
+        version = cache.incr(VERSION_KEY)
+    cache.set(CHANGES_KEY.format(version), ids, LOG_TIMEOUT)
+
+
+def changed(product_ids=None):
+    """
+    Publish a catalog change: these product ids ([] for category-only
+    changes, None for bulk changes that need a full rebuild), now and
+    again on commit.
+    """
+    if not enabled():
+        return
+    ids = None if product_ids is None else sorted(set(product_ids))
+    _publish(ids)
+    transaction.on_commit(lambda: _publish(ids))
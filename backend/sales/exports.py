@@ -0,0 +1,141 @@
+"""
+Streaming CSV/JSONL exports of a store's catalog and orders.
+
+Rows are read with values() + iterator(chunk_size=...) (a server-side
+cursor on PostgreSQL) and written to a StreamingHttpResponse as they are
+produced, so memory stays constant regardless of the number of rows.
+The product export uses the same columns as the catalog import, so an
+export can be imported back (products without variants included).
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderItem, Product, ProductVariant
+
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+PRODUCT_COLUMNS = [
+    'product_sku', 'product_name', 'description', 'is_active', 'categories',
+    'variant_sku', 'variant_name', 'price', 'stock', 'attributes',
+]
+
+ORDER_COLUMNS = [
+    'id', 'created_at', 'status', 'payment_method', 'payment_status', 'paid_at',
+    'customer_name', 'customer_email', 'customer_phone', 'shipping_address',
+    'total_amount', 'item_count',
+]
+
+
+class Echo:
+    """File-like object whose write() just returns the value (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _encode(rows, columns, file_format):
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([row[column] for column in columns])
+    else:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def streaming_response(rows, columns, file_format, name):
+    response = StreamingHttpResponse(_encode(rows, columns, file_format), content_type=CONTENT_TYPES[file_format])
+    filename = f'{name}-{timezone.now():%Y%m%d-%H%M%S}.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def product_rows(store=None, chunk_size=CHUNK_SIZE):
+    """
+    One row per variant, and one product-only row (empty variant columns,
+    the product's own price/stock) per product without variants;
+    categories/attributes loaded in bulk per chunk.
+    """
+    products = Product.objects.order_by('id', 'variants__id')
+    if store is not None:
+        products = products.filter(store=store)
+    # variants__ is a LEFT OUTER JOIN: products without variants give one row of NULLs
+    products = products.values(
+        'id', 'sku', 'name', 'description', 'is_active', 'price', 'stock',
+        'variants__id', 'variants__sku', 'variants__name', 'variants__price', 'variants__stock',
+    ).iterator(chunk_size=chunk_size)
+
+    CategoryLink = Product.categories.through
+    ValueLink = ProductVariant.values.through
+
+    for chunk in _chunks(products, chunk_size):
+        product_ids = {row['id'] for row in chunk}
+        categories = {}
+        for product_id, name in CategoryLink.objects.filter(product_id__in=product_ids).order_by(
+            'category__name'
+        ).values_list('product_id', 'category__name'):
+            categories.setdefault(product_id, []).append(name)
+
+        attributes = {}
+        for variant_id, attribute, value in ValueLink.objects.filter(
+            productvariant_id__in=[row['variants__id'] for row in chunk if row['variants__id'] is not None]
+        ).order_by('attributevalue__attribute__name').values_list(
+            'productvariant_id', 'attributevalue__attribute__name', 'attributevalue__value'
+        ):
+            attributes.setdefault(variant_id, []).append(f'{attribute}:{value}')
+
+        for row in chunk:
+            has_variant = row['variants__id'] is not None
+            yield {
+                'product_sku': row['sku'] or '',
+                'product_name': row['name'],
+                'description': row['description'],
+                'is_active': row['is_active'],
+                'categories': '|'.join(categories.get(row['id'], [])),
+                'variant_sku': row['variants__sku'] if has_variant else '',
+                'variant_name': row['variants__name'] if has_variant else '',
+                'price': row['variants__price'] if has_variant else row['price'],
+                'stock': row['variants__stock'] if has_variant else row['stock'],
+                'attributes': '|'.join(attributes.get(row['variants__id'], [])),
+            }
+
+
+def order_rows(store=None, chunk_size=CHUNK_SIZE):
+    """One row per order with its item count; archived orders come first"""
+    archived = ArchivedOrder.objects.order_by('id')
+    if store is not None:
+        archived = archived.filter(store=store)
+    yield from archived.values(*ORDER_COLUMNS).iterator(chunk_size=chunk_size)
+
+    orders = Order.objects.order_by('id')
+    if store is not None:
+        orders = orders.filter(store=store)
+    item_count = (
+        OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+        .values('order').annotate(total=Count('id')).values('total')
+    )
+    rows = orders.annotate(item_count=Subquery(item_count)).values(*ORDER_COLUMNS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        row['item_count'] = row['item_count'] or 0
+        yield row
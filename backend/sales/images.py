@@ -0,0 +1,178 @@
+"""
+Image rendition pipeline for product and variant photos.
+
+On upload, resized WebP and JPEG copies are written next to the original
+through the field's storage (local MEDIA_ROOT or S3), and their paths are
+kept in the model's 'image_renditions' JSON field:
+
+    {"source": "products/foo.jpg",
+     "widths": {"320": {"webp": "products/renditions/foo_320.webp",
+                        "jpeg": "products/renditions/foo_320.jpg"}, ...}}
+
+Settings:
+    IMAGE_RENDITION_WIDTHS   widths to generate (default 160, 320, 640, 1024)
+    IMAGE_RENDITIONS_MODE    'thread' (background pool, default), 'sync', or
+                             'off' (left to the process_image_renditions command)
+    IMAGE_RENDITIONS_WORKERS size of the background pool (default 2)
+
+The background pool lives in memory: jobs still queued when a process
+restarts are lost. `manage.py process_image_renditions` picks up every image
+whose renditions are empty or stale, so run it periodically (cron, or as a
+worker with --loop) in every mode.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from core import metrics
+
+from . import catalog_snapshot, store_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (160, 320, 640, 1024)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def rendition_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_RENDITION_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def needs_renditions(instance):
+    """True when the image changed since the renditions were generated"""
+    name = instance.image.name if instance.image else ''
+    return (instance.image_renditions or {}).get('source', '') != name
+
+
+def generate_renditions(field_file):
+    """Write every width/format of the image to its storage and return the renditions map"""
+    storage = field_file.storage
+    directory, filename = posixpath.split(field_file.name)
+    stem = posixpath.splitext(filename)[0]
+
+    with storage.open(field_file.name, 'rb') as fh:
+        original = ImageOps.exif_transpose(Image.open(fh))
+        original.load()
+
+    widths = {}
+    for width in rendition_widths():
+        # Never upscale; the smallest rendition is always kept as a thumbnail
+        if width >= original.width and widths:
+            break
+        resized = original.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+
+        paths = {}
+        for key, (pil_format, extension, options) in FORMATS.items():
+            image = resized
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            path = posixpath.join(directory, 'renditions', f'{stem}_{width}.{extension}')
+            paths[key] = storage.save(path, ContentFile(buffer.getvalue()))
+        widths[str(width)] = paths
+
+    return {'source': field_file.name, 'widths': widths}
+
+
+def delete_renditions(storage, renditions):
+    """Best-effort removal of rendition files that are no longer referenced"""
+    for paths in (renditions or {}).get('widths', {}).values():
+        for path in paths.values():
+            try:
+                storage.delete(path)
+            except Exception:
+                logger.warning('Could not delete image rendition %s', path, exc_info=True)
+
+
+def process_instance(model, pk, force=False):
+    """Generate renditions for one Product/ProductVariant if its image changed"""
+    instance = model.objects.filter(pk=pk).only('image', 'image_renditions').first()
+    if instance is None or not (force or needs_renditions(instance)):
+        return False
+
+    old = instance.image_renditions
+    renditions = generate_renditions(instance.image) if instance.image else {}
+    # Only overwrite if the image was not replaced while we were working
+    current = model.objects.filter(pk=pk)
+    if instance.image:
+        current = current.filter(image=instance.image.name)
+    else:
+        current = current.filter(Q(image='') | Q(image__isnull=True))
+    updated = current.update(image_renditions=renditions)
+    if updated:
+        delete_renditions(instance.image.storage, old)
+        store_cache.invalidate_products(
+            [pk] if model._meta.model_name == 'product' else model.objects.filter(pk=pk).values('product_id')
+        )
+        if model._meta.model_name == 'product':
+            catalog_snapshot.changed([pk])
+    else:
+        delete_renditions(instance.image.storage, renditions)
+    return bool(updated)
+
+
+def _process_in_background(model, pk):
+    close_old_connections()
+    try:
+        process_instance(model, pk)
+    except Exception:
+        logger.exception('Failed to generate renditions for %s #%s', model.__name__, pk)
+    finally:
+        metrics.QUEUE_DEPTH.labels('image_renditions').dec()
+        close_old_connections()
+
+
+def _submit(model, pk):
+    metrics.QUEUE_DEPTH.labels('image_renditions').inc()
+    _executor.submit(_process_in_background, model, pk)
+
+
+def schedule(instance):
+    """Queue rendition generation for after the current transaction commits"""
+    mode = getattr(settings, 'IMAGE_RENDITIONS_MODE', 'thread')
+    if mode == 'off' or not needs_renditions(instance):
+        return
+
+    model, pk = type(instance), instance.pk
+    if mode == 'sync':
+        transaction.on_commit(lambda: process_instance(model, pk))
+        return
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_RENDITIONS_WORKERS', 2),
+            thread_name_prefix='image-renditions',
+        )
+    transaction.on_commit(lambda: _submit(model, pk))
+
+
+def build_srcset(instance, request=None):
+    """
+    Map of format -> {width: url} for serializers, e.g.
+    {"webp": {"160": "https://.../foo_160.webp", ...}, "jpeg": {...}}.
+    Empty until the renditions have been generated for the current image.
+    """
+    if not instance.image or needs_renditions(instance):
+        return {}
+    storage = instance.image.storage
+    srcset = {key: {} for key in FORMATS}
+    for width, paths in instance.image_renditions.get('widths', {}).items():
+        for key, path in paths.items():
+            url = storage.url(path)
+            srcset[key][width] = request.build_absolute_uri(url) if request else url
+    return srcset
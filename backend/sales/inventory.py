@@ -0,0 +1,308 @@
+"""
+Inventory operations: bulk stock/price updates, cart reservations and the
+stock movement ledger (StockMovement + periodic StockSnapshot).
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from core import metrics
+
+from . import catalog_snapshot, store_cache
+from .models import ProductVariant, StockMovement, StockReservation, StockSnapshot
+
+BULK_UPDATE_MAX_ITEMS = 10000
+BULK_UPDATE_BATCH_SIZE = 1000
+
+
+RESERVATION_MAX_LINES = 100
+SWEEP_BATCH_SIZE = 1000
+
+SNAPSHOT_BATCH_SIZE = 1000
+# Movements younger than this are left for the next snapshot, so a
+# transaction that commits late (with a lower id) is never skipped
+SNAPSHOT_SETTLE_TIME = timedelta(minutes=5)
+
+
+class BulkUpdateError(Exception):
+    """The payload as a whole is invalid"""
+
+
+class ReservationError(Exception):
+    """Invalid cart reservation request"""
+
+
+def _parse_item(item):
+    """Return (sku, changes, error) for one {sku, stock | stock_delta, price} item"""
+    if not isinstance(item, dict):
+        return None, None, 'cada item deve ser um objeto'
+    sku = str(item.get('sku') or '').strip()
+    if not sku:
+        return None, None, 'sku é obrigatório'
+    if 'stock' in item and 'stock_delta' in item:
+        return sku, None, 'use stock ou stock_delta, não ambos'
+
+    changes = {}
+    try:
+        if item.get('stock') is not None:
+            changes['stock'] = int(item['stock'])
+            if changes['stock'] < 0:
+                return sku, None, 'stock não pode ser negativo'
+        if item.get('stock_delta') is not None:
+            changes['stock_delta'] = int(item['stock_delta'])
+    except (TypeError, ValueError):
+        return sku, None, 'stock inválido'
+    if item.get('price') is not None:
+        try:
+            changes['price'] = Decimal(str(item['price']))
+        except InvalidOperation:
+            return sku, None, 'price inválido'
+        if not changes['price'].is_finite() or changes['price'] < Decimal('0.01'):
+            return sku, None, 'price deve ser maior ou igual a 0.01'
+    if not changes:
+        return sku, None, 'informe stock, stock_delta ou price'
+    return sku, changes, None
+
+
+def bulk_update_variants(store, items):
+    """
+    Apply stock/price changes keyed by SKU to the store's variants in one
+    transaction. 'stock' sets an absolute value, 'stock_delta' adds to the
+    current one (rows are locked first, so concurrent deltas don't race).
+
+    Returns {'updated': n, 'unmatched': [...], 'errors': [...]}.
+    """
+    if not isinstance(items, list):
+        raise BulkUpdateError('items deve ser uma lista')
+    if len(items) > BULK_UPDATE_MAX_ITEMS:
+        raise BulkUpdateError(f'Máximo de {BULK_UPDATE_MAX_ITEMS} itens por chamada')
+
+    errors = []
+    changes_by_sku = {}
+    for index, item in enumerate(items):
+        sku, changes, error = _parse_item(item)
+        if error:
+            errors.append({'index': index, 'sku': sku, 'error': error})
+        elif sku in changes_by_sku:
+            errors.append({'index': index, 'sku': sku, 'error': 'sku repetido no payload'})
+        else:
+            changes_by_sku[sku] = changes
+
+    now = timezone.now()
+    skus = list(changes_by_sku)
+    changed = []
+    deltas = {}
+    with transaction.atomic():
+        found = set()
+        for start in range(0, len(skus), BULK_UPDATE_BATCH_SIZE):
+            variants = (
+                ProductVariant.objects.select_for_update(of=('self',))
+                .filter(product__store=store, sku__in=skus[start:start + BULK_UPDATE_BATCH_SIZE])
+                .only('id', 'product_id', 'sku', 'stock', 'price')
+                .order_by('id')
+            )
+            for variant in variants:
+                found.add(variant.sku)
+                changes = changes_by_sku[variant.sku]
+                stock = changes.get('stock', variant.stock)
+                stock += changes.get('stock_delta', 0)
+                if stock < 0:
+                    errors.append({'sku': variant.sku, 'error': f'estoque resultante negativo ({stock})'})
+                    continue
+                deltas[variant.id] = stock - variant.stock
+                variant.stock = stock
+                variant.price = changes.get('price', variant.price)
+                variant.updated_at = now
+                changed.append(variant)
+
+        ProductVariant.objects.bulk_update(
+            changed, ['stock', 'price', 'updated_at'], batch_size=BULK_UPDATE_BATCH_SIZE
+        )
+        StockMovement.record_many(
+            deltas, StockMovement.ADJUSTMENT, note='bulk_update', batch_size=BULK_UPDATE_BATCH_SIZE
+        )
+        metrics.record_stock_outs(
+            sum(1 for variant in changed if variant.stock == 0 and deltas[variant.id] < 0),
+            StockMovement.ADJUSTMENT,
+        )
+        if changed:
+            store_cache.invalidate(store.pk)
+            catalog_snapshot.changed({variant.product_id for variant in changed})
+
+    return {
+        'updated': len(changed),
+        'unmatched': sorted(set(skus) - found),
+        'errors': errors,
+    }
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60))
+
+
+def new_cart_token():
+    return uuid.uuid4().hex
+
+
+def parse_cart_lines(lines):
+    """Normalize [{variant, quantity}] into {variant_id: quantity}"""
+    if not isinstance(lines, list):
+        raise ReservationError('items deve ser uma lista')
+    if len(lines) > RESERVATION_MAX_LINES:
+        raise ReservationError(f'Máximo de {RESERVATION_MAX_LINES} itens por carrinho')
+    quantities = {}
+    for line in lines:
+        try:
+            variant_id = int(line['variant'])
+            quantity = int(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ReservationError('cada item precisa de variant e quantity numéricos')
+        if quantity < 0:
+            raise ReservationError('quantity não pode ser negativa')
+        quantities[variant_id] = quantities.get(variant_id, 0) + quantity
+    return quantities
+
+
+def _reserved_by_others(cart_token, variant_ids, now):
+    rows = (
+        StockReservation.objects.filter(variant_id__in=variant_ids, expires_at__gt=now)
+        .exclude(cart_token=cart_token)
+        .values('variant_id').annotate(total=Sum('quantity'))
+    )
+    return {row['variant_id']: row['total'] for row in rows}
+
+
+def _availability(quantities, variants, reserved):
+    result = []
+    for variant_id, requested in quantities.items():
+        variant = variants.get(variant_id)
+        available = max(variant.stock - reserved.get(variant_id, 0), 0) if variant else 0
+        result.append({
+            'variant': variant_id,
+            'requested': requested,
+            'reserved': min(requested, available),
+            'available': available,
+        })
+    return result
+
+
+def sync_cart_reservations(cart_token, lines):
+    """
+    Make the cart's reservations match 'lines' exactly: quantities are held
+    (up to what is available) and the expiry is refreshed; variants no
+    longer in the cart are released. Variant rows are locked so two carts
+    cannot reserve the same last unit.
+    """
+    quantities = parse_cart_lines(lines)
+    now = timezone.now()
+    expires_at = now + reservation_ttl()
+
+    with transaction.atomic():
+        variants = {
+            v.pk: v for v in ProductVariant.objects.select_for_update()
+            .filter(pk__in=quantities, is_active=True).only('id', 'stock').order_by('id')
+        }
+        reserved = _reserved_by_others(cart_token, list(variants), now)
+        lines = _availability(quantities, variants, reserved)
+
+        held = {line['variant']: line['reserved'] for line in lines if line['reserved'] > 0}
+        StockReservation.objects.filter(cart_token=cart_token).exclude(variant_id__in=held).delete()
+        StockReservation.objects.bulk_create(
+            [
+                StockReservation(cart_token=cart_token, variant_id=variant_id, quantity=quantity,
+                                 expires_at=expires_at, created_at=now, updated_at=now)
+                for variant_id, quantity in held.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['cart_token', 'variant'],
+            update_fields=['quantity', 'expires_at', 'updated_at'],
+        )
+
+    return {
+        'cart_token': cart_token,
+        'expires_at': expires_at if held else None,
+        'items': lines,
+        'complete': all(line['reserved'] == line['requested'] for line in lines),
+    }
+
+
+def check_cart(cart_token, lines):
+    """
+    Read-only availability check for checkout: the cart's own reservations
+    count as available to it. Lets checkout fail before payment.
+    """
+    quantities = parse_cart_lines(lines)
+    now = timezone.now()
+    variants = ProductVariant.objects.filter(pk__in=quantities, is_active=True).only('id', 'stock').in_bulk()
+    reserved = _reserved_by_others(cart_token, list(variants), now)
+    lines = _availability(quantities, variants, reserved)
+    shortages = [line for line in lines if line['reserved'] < line['requested']]
+    return {'ok': not shortages, 'shortages': shortages}
+
+
+def release_cart(cart_token):
+    deleted, _ = StockReservation.objects.filter(cart_token=cart_token).delete()
+    return deleted
+
+
+def release_expired_reservations(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Delete expired reservations in batches; returns how many were removed"""
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now).order_by('expires_at')
+    total = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        deleted, _ = StockReservation.objects.filter(pk__in=ids).delete()
+        total += deleted
+
+
+def take_stock_snapshots(batch_size=SNAPSHOT_BATCH_SIZE, now=None):
+    """
+    Snapshot the ledger balance of every variant with movements since its
+    last snapshot, so balance queries only read a short tail of the ledger.
+    Returns the number of snapshots written.
+    """
+    taken_at = (now or timezone.now()) - SNAPSHOT_SETTLE_TIME
+    variants = (
+        ProductVariant.objects.with_ledger_stock(movements_until=taken_at)
+        .filter(Q(snapshot_taken_at__isnull=True) | Q(snapshot_taken_at__lt=taken_at))
+        .order_by('pk')
+    )
+    created = 0
+    last_id = 0
+    while True:
+        rows = list(variants.filter(pk__gt=last_id).values('pk', 'ledger_stock', 'last_movement')[:batch_size])
+        if not rows:
+            return created
+        last_id = rows[-1]['pk']
+        snapshots = [
+            StockSnapshot(variant_id=row['pk'], movement_id=row['last_movement'],
+                          stock=row['ledger_stock'], taken_at=taken_at)
+            for row in rows if row['last_movement'] is not None
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        created += len(snapshots)
+
+
+def stock_at(variant_ids, at=None):
+    """{variant_id: stock} from the ledger, now or at a point in time"""
+    return dict(
+        ProductVariant.objects.filter(pk__in=variant_ids).with_ledger_stock(at=at)
+        .values_list('pk', 'ledger_stock')
+    )
+
+
+def stock_drift(queryset=None):
+    """Variants whose stock column disagrees with the ledger balance"""
+    queryset = ProductVariant.objects.all() if queryset is None else queryset
+    return (
+        queryset.with_ledger_stock().exclude(ledger_stock=F('stock'))
+        .order_by('pk').values('pk', 'sku', 'stock', 'ledger_stock')
+    )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from sales import archive
+
+
+class Command(BaseCommand):
+    help = ('Move pedidos entregues/cancelados mais antigos que N meses para a tabela de arquivo '
+            '(ArchivedOrder), em lotes. Rode periodicamente (cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12, help='Idade mínima do pedido em meses')
+        parser.add_argument('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE,
+                            help='Pedidos movidos por transação')
+        parser.add_argument('--max-batches', type=int, help='Para depois de N lotes (limita a duração)')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta os pedidos elegíveis')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError('--months deve ser pelo menos 1')
+        cutoff = archive.cutoff_for(options['months'])
+
+        if options['dry_run']:
+            count = archive.archivable(cutoff).count()
+            self.stdout.write(f'{count} pedido(s) criados antes de {cutoff:%Y-%m-%d} seriam arquivados')
+            return
+
+        moved = archive.archive_orders(cutoff, batch_size=options['batch_size'],
+                                       max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {moved} pedido(s) arquivado(s)'))
@@ -0,0 +1,98 @@
+import json
+import platform
+import resource
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from sales import benchmark, synthetic
+
+
+class Rollback(Exception):
+    """Undo the seeded dataset and whatever the scenarios wrote"""
+
+
+class Command(BaseCommand):
+    help = ('Gera um dataset sintético e mede os caminhos quentes da API (latência, queries, memória). '
+            'Tudo é desfeito ao final, a menos que --keep seja usado. Use --output para comparar commits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=list(benchmark.SCENARIOS),
+                            help='Cenário a executar (repita para vários; padrão: todos)')
+        parser.add_argument('--iterations', type=int, default=50, help='Chamadas medidas por cenário')
+        parser.add_argument('--warmup', type=int, default=5, help='Chamadas não medidas antes de medir')
+        parser.add_argument('--output', help='Arquivo JSON com os resultados')
+        parser.add_argument('--prefix', default='bench', help='Prefixo dos dados sintéticos')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Usa um dataset existente com o mesmo prefixo em vez de gerar um')
+        parser.add_argument('--keep', action='store_true', help='Mantém os dados gerados e escritos')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador')
+        parser.add_argument('--stores', type=int, default=2)
+        parser.add_argument('--products', type=int, default=200, help='Produtos por loja')
+        parser.add_argument('--variants', type=int, default=3, help='Variantes por produto')
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--orders', type=int, default=500, help='Pedidos por loja')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations deve ser pelo menos 1')
+
+        result = {}
+        try:
+            with transaction.atomic():
+                result = self.run(options)
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        self.report(result['scenarios'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f'✓ Resultados salvos em {options["output"]}'))
+
+    def run(self, options):
+        dataset = None
+        if not options['no_seed']:
+            self.stdout.write('Gerando dataset sintético...')
+            dataset = synthetic.seed(
+                prefix=options['prefix'], seed=options['seed'], stores=options['stores'],
+                products_per_store=options['products'], variants_per_product=options['variants'],
+                categories=options['categories'], orders_per_store=options['orders'],
+            )
+        scenarios = benchmark.run(options['prefix'], options['scenario'], options['iterations'], options['warmup'])
+        return {
+            'meta': {
+                'commit': self.git_commit(),
+                'run_at': timezone.now(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'dataset': dataset,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+            'scenarios': scenarios,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, scenarios):
+        self.stdout.write(f'{"cenário":<20} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8} {"mem KB":>9} {"erros":>6}')
+        for name, r in scenarios.items():
+            latency = r['latency_ms']
+            self.stdout.write(
+                f'{name:<20} {latency["p50"]:>8} {latency["p95"]:>8} {latency["p99"]:>8} '
+                f'{r["queries"]["mean"]:>8} {r["peak_memory_kb"]:>9} {r["errors"]:>6}'
+            )
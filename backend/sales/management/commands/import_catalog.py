@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from sales import catalog_import
+from sales.models import Store
+
+
+class Command(BaseCommand):
+    help = 'Importa produtos e variantes de um arquivo CSV ou JSONL para uma loja (upsert por SKU)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .jsonl')
+        parser.add_argument('--store', required=True, help='ID da loja ou username do dono')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Formato (padrão: pela extensão)')
+        parser.add_argument('--chunk-size', type=int, default=catalog_import.DEFAULT_CHUNK_SIZE,
+                            help='Linhas validadas e gravadas por transação')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas valida, sem gravar')
+
+    def handle(self, *args, **options):
+        store_ref = options['store']
+        try:
+            if store_ref.isdigit():
+                store = Store.objects.get(pk=int(store_ref))
+            else:
+                store = Store.objects.get(owner__username=store_ref)
+        except Store.DoesNotExist:
+            raise CommandError(f'Loja não encontrada: {store_ref}')
+
+        file_format = options['format'] or catalog_import.detect_format(options['path'])
+        importer = catalog_import.CatalogImporter(
+            store, chunk_size=options['chunk_size'], dry_run=options['dry_run']
+        )
+        with open(options['path'], 'rb') as fh:
+            report = importer.run(catalog_import.read_rows(fh, file_format))
+
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+        prefix = '[DRY RUN] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}✓ {report['imported']} de {report['rows']} linha(s) importada(s), "
+            f"{report['error_count']} com erro"
+        ))
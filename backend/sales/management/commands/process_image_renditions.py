@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.db.models.fields.json import KT
+from sales import images
+from sales.models import Product, ProductVariant
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as versões redimensionadas (WebP/JPEG) das imagens de produtos e variantes pendentes. '
+        'Processa toda imagem sem versões ou com versões de outro arquivo, inclusive as que ficaram na '
+        'fila em memória de um processo reiniciado; rode periodicamente (cron ou --loop).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenera as versões mesmo quando já estão atualizadas')
+        parser.add_argument('--loop', action='store_true',
+                            help='Continua rodando como worker, verificando novas imagens periodicamente')
+        parser.add_argument('--interval', type=int, default=30,
+                            help='Segundos entre verificações no modo --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = sum(
+                self.process_model(model, options['force'])
+                for model in (Product, ProductVariant)
+            )
+            self.stdout.write(self.style.SUCCESS(f'✓ {processed} imagem(ns) processada(s)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def process_model(self, model, force):
+        processed = 0
+        rows = model.objects.exclude(image='').exclude(image__isnull=True).only('image', 'image_renditions')
+        if not force:
+            # Same test as images.needs_renditions, in SQL: empty renditions have no source
+            rows = (rows.alias(source=KT('image_renditions__source'))
+                    .filter(Q(source__isnull=True) | ~Q(source=F('image'))))
+        for instance in rows.order_by('pk').iterator(chunk_size=500):
+            try:
+                if images.process_instance(model, instance.pk, force=force):
+                    processed += 1
+            except Exception as e:
+                self.stderr.write(f'Falha ao processar {model.__name__} #{instance.pk}: {e}')
+        return processed
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sales.models import Order, PurchasedProduct
+
+
+class Command(BaseCommand):
+    help = 'Preenche o ledger de compras (PurchasedProduct) a partir dos pedidos pagos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Quantidade de pedidos processados por transação')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        orders = Order.objects.filter(payment_status='paid').order_by('pk')
+
+        last_pk = 0
+        processed = 0
+        while True:
+            batch = list(orders.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                for order in batch:
+                    PurchasedProduct.record_order(order)
+            processed += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'{processed} pedidos processados...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Ledger reconstruído a partir de {processed} pedido(s) pago(s)'
+        ))
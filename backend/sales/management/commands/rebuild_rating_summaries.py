@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sales.models import Product, ProductRatingSummary
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos de avaliações (ProductRatingSummary) a partir das reviews aprovadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Quantidade de produtos recalculados por transação')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+
+        last_pk = 0
+        rebuilt = 0
+        while True:
+            batch = list(product_ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                rebuilt += ProductRatingSummary.rebuild(batch)
+            last_pk = batch[-1]
+            self.stdout.write(f'{rebuilt} produtos recalculados...')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {rebuilt} resumo(s) de avaliação reconstruído(s)'))
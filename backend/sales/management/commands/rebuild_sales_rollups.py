@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from sales import analytics
+from sales.models import Store
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os rollups diários de vendas (StoreDailySales/ProductDailySales) a partir dos pedidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, action='append', help='ID da loja (pode repetir; padrão: todas)')
+        parser.add_argument('--from', dest='start', help='Primeiro dia (AAAA-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Último dia (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_date(options['start']) if options['start'] else None
+            end = parse_date(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if (options['start'] and start is None) or (options['end'] and end is None):
+            raise CommandError('Datas devem estar no formato AAAA-MM-DD')
+
+        store_ids = options['store'] or Store.objects.order_by('pk').values_list('pk', flat=True)
+        # One transaction per store keeps each rebuild bounded
+        store_rows = product_rows = 0
+        for store_id in store_ids:
+            stores, products = analytics.rebuild([store_id], start=start, end=end)
+            store_rows += stores
+            product_rows += products
+            self.stdout.write(f'Loja #{store_id}: {stores} dia(s), {products} linha(s) de produto')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {store_rows} rollup(s) de loja e {product_rows} de produto reconstruído(s)'
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from sales import inventory
+
+
+class Command(BaseCommand):
+    help = 'Remove reservas de estoque expiradas (em lotes). Rode periodicamente (cron) ou com --loop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=inventory.SWEEP_BATCH_SIZE,
+                            help='Reservas removidas por DELETE')
+        parser.add_argument('--loop', action='store_true', help='Continua rodando, varrendo periodicamente')
+        parser.add_argument('--interval', type=int, default=60, help='Segundos entre varreduras no modo --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            released = inventory.release_expired_reservations(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {released} reserva(s) expirada(s) removida(s)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
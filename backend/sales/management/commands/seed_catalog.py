@@ -0,0 +1,59 @@
+import math
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from sales import synthetic
+
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = ('Gera um dataset sintético grande e determinístico (usuários, lojas, produtos, variantes, '
+            'pedidos, avaliações) para reproduzir problemas de escala. Usa COPY no PostgreSQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help='Prefixo de usernames, SKUs, categorias e cupons')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador (mesma semente, mesmos dados)')
+        parser.add_argument('--customers', type=int, default=10000, help='Clientes (usuários sem loja)')
+        parser.add_argument('--stores', type=int, default=100)
+        parser.add_argument('--products', type=int, default=500, help='Produtos por loja')
+        parser.add_argument('--variants', type=int, default=3, help='Variantes por produto')
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--reviews', type=int, default=3, help='Avaliações por produto')
+        parser.add_argument('--orders', type=int, default=100000, help='Total de pedidos (divididos entre as lojas)')
+        parser.add_argument('--items', type=int, default=3, help='Itens por pedido')
+        parser.add_argument('--coupons', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=synthetic.DEFAULT_BATCH_SIZE,
+                            help='Linhas por COPY/INSERT')
+
+    def handle(self, *args, **options):
+        if options['stores'] < 1 or options['customers'] < 1:
+            raise CommandError('--stores e --customers devem ser pelo menos 1')
+        if options['reviews'] > options['customers']:
+            raise CommandError('--reviews não pode ser maior que --customers (uma avaliação por cliente)')
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Já existem dados com o prefixo "{prefix}"; use outro --prefix')
+
+        reported = {}
+
+        def progress(table, count):
+            if count - reported.get(table, 0) >= PROGRESS_EVERY:
+                reported[table] = count
+                self.stdout.write(f'{table}: {count} linhas...')
+
+        started = time.monotonic()
+        counts = synthetic.seed(
+            prefix=prefix, seed=options['seed'], stores=options['stores'], customers=options['customers'],
+            products_per_store=options['products'], variants_per_product=options['variants'],
+            categories=options['categories'], reviews_per_product=options['reviews'],
+            orders_per_store=math.ceil(options['orders'] / options['stores']),
+            items_per_order=options['items'], coupons=options['coupons'],
+            batch_size=options['batch_size'], progress=progress,
+        )
+        for table, count in counts.items():
+            self.stdout.write(f'  {table}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {sum(counts.values())} linhas geradas em {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from sales import inventory
+
+
+class Command(BaseCommand):
+    help = ('Grava snapshots do saldo do ledger de estoque por variante (rode periodicamente) '
+            'e opcionalmente lista variantes cujo estoque diverge do ledger.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=inventory.SNAPSHOT_BATCH_SIZE,
+                            help='Variantes processadas por consulta')
+        parser.add_argument('--drift', action='store_true',
+                            help='Lista variantes cujo stock difere do saldo do ledger')
+        parser.add_argument('--limit', type=int, default=100, help='Máximo de divergências listadas')
+
+    def handle(self, *args, **options):
+        created = inventory.take_stock_snapshots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {created} snapshot(s) gravado(s)'))
+
+        if options['drift']:
+            drift = list(inventory.stock_drift()[:options['limit']])
+            for row in drift:
+                self.stdout.write(
+                    f"  {row['sku']}: stock={row['stock']} ledger={row['ledger_stock']}"
+                )
+            style = self.style.WARNING if drift else self.style.SUCCESS
+            self.stdout.write(style(f'{len(drift)} variante(s) com divergência'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='is_verified_purchase',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='PurchasedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('last_purchased_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sales.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='sales.product')),
+            ],
+            options={
+                'ordering': ['-last_purchased_at'],
+                'indexes': [models.Index(fields=['email', '-last_purchased_at'], name='purchase_email_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('email', 'product'), name='unique_purchase_email_product')],
+            },
+        ),
+    ]
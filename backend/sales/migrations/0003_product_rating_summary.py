@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    """Fill the summaries from the approved reviews that already exist."""
+    Review = apps.get_model('sales', 'Review')
+    ProductRatingSummary = apps.get_model('sales', 'ProductRatingSummary')
+
+    summaries = {}
+    rows = (
+        Review.objects.filter(is_approved=True)
+        .order_by()
+        .values('product_id', 'rating')
+        .annotate(total=models.Count('id'))
+    )
+    for row in rows:
+        summary = summaries.setdefault(row['product_id'], ProductRatingSummary(product_id=row['product_id']))
+        setattr(summary, f"rating_{row['rating']}", row['total'])
+        summary.rating_sum += row['rating'] * row['total']
+    ProductRatingSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_purchase_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='sales.product')),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product rating summaries',
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
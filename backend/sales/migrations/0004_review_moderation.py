@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_product_rating_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, help_text='When a moderator approved or rejected the review', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', False), ('moderated_at__isnull', True)), fields=['id'], name='review_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:51
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cart_token', models.CharField(max_length=64)),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='sales.productvariant')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['variant', 'expires_at'], name='reservation_variant_exp_idx'), models.Index(fields=['expires_at'], name='reservation_expires_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cart_token', 'variant'), name='unique_reservation_cart_variant')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def opening_snapshots(apps, schema_editor):
+    """Record the current stock of every variant as its opening ledger balance."""
+    ProductVariant = apps.get_model('sales', 'ProductVariant')
+    StockSnapshot = apps.get_model('sales', 'StockSnapshot')
+
+    now = django.utils.timezone.now()
+    batch = []
+    for variant_id, stock in ProductVariant.objects.order_by('id').values_list('id', 'stock').iterator(chunk_size=2000):
+        batch.append(StockSnapshot(variant_id=variant_id, movement_id=0, stock=stock, taken_at=now))
+        if len(batch) >= 2000:
+            StockSnapshot.objects.bulk_create(batch)
+            batch = []
+    StockSnapshot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('order', 'Order'), ('adjustment', 'Manual adjustment'), ('import', 'Import'), ('return', 'Return')], max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.order')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='sales.productvariant')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['variant', 'id'], name='movement_variant_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_id', models.BigIntegerField()),
+                ('stock', models.IntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='sales.productvariant')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['variant', 'taken_at'], name='snapshot_variant_taken_idx')],
+                'constraints': [models.UniqueConstraint(fields=('variant', 'movement_id'), name='unique_snapshot_variant_movement')],
+            },
+        ),
+        migrations.RunPython(opening_snapshots, migrations.RunPython.noop),
+    ]
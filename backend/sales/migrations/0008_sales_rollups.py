@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='sales.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_daily_sales', to='sales.store')),
+            ],
+            options={
+                'verbose_name_plural': 'Product daily sales',
+                'ordering': ['store', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('store', 'date', 'product'), name='unique_product_daily_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_orders', models.IntegerField(default=0)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='sales.store')),
+            ],
+            options={
+                'verbose_name_plural': 'Store daily sales',
+                'ordering': ['store', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('store', 'date'), name='unique_store_daily_sales')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', '-created_at'], name='order_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'status', '-created_at'], name='order_store_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'payment_status', '-created_at'], name='order_store_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatusupdate',
+            index=models.Index(fields=['order', '-created_at'], name='status_update_order_idx'),
+        ),
+    ]
@@ -1,10 +1,18 @@
-from django.db import models
+from django.db import models, connection, transaction, IntegrityError
+from django.db.models import Exists, OuterRef, Subquery, F, Case, When, Value
+from django.db.models.signals import post_save
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from decimal import Decimal
 
+from core import metrics
+
+from . import store_cache
+
 
 # --- ATTRIBUTE MODELS (for flexible product attributes) ---
 
@@ -78,6 +86,23 @@ class Store(models.Model):
         return f"{self.name} - {self.owner.username}"
 
 
+class ProductQuerySet(models.QuerySet):
+    """QuerySet helpers for product listings"""
+
+    def with_min_price(self):
+        """
+        Annotate 'has_variants' and 'min_variant_price' so serializers can
+        resolve the display price without one query per product.
+        """
+        variants = ProductVariant.objects.filter(product=OuterRef('pk'))
+        return self.annotate(
+            has_variants=Exists(variants),
+            min_variant_price=Subquery(
+                variants.filter(is_active=True).order_by('price').values('price')[:1]
+            ),
+        )
+
+
 class Product(models.Model):
     """Model for products/items available for sale"""
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='products', null=True, blank=True)
@@ -105,15 +130,29 @@ class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Resized WebP/JPEG copies generated by sales.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return self.name
 
+    @property
+    def display_price(self):
+        """Lowest active variant price, or the product price when it has no variants"""
+        if hasattr(self, 'min_variant_price'):
+            return self.min_variant_price if self.has_variants else self.price
+        if self.variants.exists():
+            variant = self.variants.filter(is_active=True).order_by('price').first()
+            return variant.price if variant else None
+        return self.price
+
     @property
     def total_stock(self):
         """Calculate total stock from all variants"""
@@ -123,17 +162,67 @@ class Product(models.Model):
 
     @property
     def average_rating(self):
-        """Calculate average rating from approved reviews"""
-        approved_reviews = self.reviews.filter(is_approved=True)
-        if approved_reviews.exists():
-            total = sum(r.rating for r in approved_reviews)
-            return round(total / approved_reviews.count(), 1)
-        return None
+        """Average rating of approved reviews, read from the rating summary"""
+        summary = self._rating_summary_or_none()
+        return summary.average if summary else None
 
     @property
     def review_count(self):
-        """Count of approved reviews"""
-        return self.reviews.filter(is_approved=True).count()
+        """Count of approved reviews, read from the rating summary"""
+        summary = self._rating_summary_or_none()
+        return summary.count if summary else 0
+
+    def _rating_summary_or_none(self):
+        try:
+            return self.rating_summary
+        except ProductRatingSummary.DoesNotExist:
+            return None
+
+
+class ProductVariantQuerySet(models.QuerySet):
+    """QuerySet helpers for variant stock"""
+
+    def with_available_stock(self, now=None):
+        """
+        Annotate 'reserved_stock' (active cart reservations) and
+        'available_stock' (stock minus reserved) using the
+        (variant, expires_at) index on StockReservation.
+        """
+        reserved = (
+            StockReservation.objects.filter(variant=OuterRef('pk'), expires_at__gt=now or timezone.now())
+            .order_by().values('variant').annotate(total=models.Sum('quantity')).values('total')
+        )
+        return self.annotate(
+            reserved_stock=Coalesce(Subquery(reserved), 0),
+        ).annotate(available_stock=F('stock') - F('reserved_stock'))
+
+    def with_ledger_stock(self, at=None, movements_until=None):
+        """
+        Annotate 'ledger_stock': stock according to the movement ledger, read
+        as the latest StockSnapshot plus the movements recorded after it.
+        'at' gives point-in-time stock (snapshots and movements up to then);
+        'movements_until' only bounds the movement tail. Also annotates
+        'snapshot_taken_at' and 'last_movement' (None when the tail is empty).
+        """
+        snapshots = StockSnapshot.objects.filter(variant=OuterRef('pk'))
+        tail = StockMovement.objects.filter(variant=OuterRef('pk'), id__gt=OuterRef('snapshot_movement'))
+        if at is not None:
+            snapshots = snapshots.filter(taken_at__lte=at)
+            tail = tail.filter(created_at__lte=at)
+        if movements_until is not None:
+            tail = tail.filter(created_at__lte=movements_until)
+        snapshots = snapshots.order_by('-movement_id')
+        tail = tail.order_by().values('variant')
+        return self.annotate(
+            snapshot_movement=Coalesce(Subquery(snapshots.values('movement_id')[:1]), 0),
+            snapshot_stock=Coalesce(Subquery(snapshots.values('stock')[:1]), 0),
+            snapshot_taken_at=Subquery(snapshots.values('taken_at')[:1]),
+        ).annotate(
+            last_movement=Subquery(tail.annotate(last=models.Max('id')).values('last')),
+            ledger_stock=F('snapshot_stock') + Coalesce(
+                Subquery(tail.annotate(total=models.Sum('delta')).values('total')), 0
+            ),
+        )
 
 
 class ProductVariant(models.Model):
@@ -152,10 +241,13 @@ class ProductVariant(models.Model):
     stock = models.IntegerField(default=0, validators=[MinValueValidator(0)])
 
     image = models.ImageField(upload_to='products/variants/', blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductVariantQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
 
@@ -163,6 +255,94 @@ class ProductVariant(models.Model):
         variant_name = self.name or " / ".join(str(v.value) for v in self.values.all())
         return f"{self.product.name} - {variant_name} ({self.sku})"
 
+    def save(self, *args, movement_reason=None, movement_order=None, movement_note='', **kwargs):
+        """
+        Save and record any stock change in the movement ledger within the
+        same transaction ('adjustment' unless another reason is given).
+
+        The delta is taken against the stock this save overwrites, read
+        under a row lock (SELECT ... FOR UPDATE), so stale instances still
+        keep the ledger equal to the stored stock. Saves that don't write
+        'stock' (update_fields, or 'stock' deferred) record nothing.
+        """
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is not None and 'stock' not in update_fields) or 'stock' in self.get_deferred_fields():
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            persisted = None
+            if not self._state.adding:
+                persisted = (
+                    ProductVariant.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('stock', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            delta = self.stock - (persisted or 0)
+            if delta:
+                reason = movement_reason or StockMovement.ADJUSTMENT
+                StockMovement.objects.create(
+                    variant=self, delta=delta, reason=reason, order=movement_order, note=movement_note,
+                )
+                if self.stock == 0:
+                    metrics.record_stock_outs(1, reason)
+
+    def take_stock(self, quantity, order=None):
+        """
+        Remove 'quantity' units for an order: a conditional
+        UPDATE ... SET stock = stock - n WHERE stock >= n, so concurrent orders
+        can't oversell, plus the 'order' movement in the same transaction.
+        Raises InsufficientStockError when there is not enough stock.
+        """
+        with transaction.atomic():
+            variants = ProductVariant.objects.filter(pk=self.pk)
+            if not variants.filter(stock__gte=quantity).update(
+                stock=F('stock') - quantity, updated_at=timezone.now()
+            ):
+                available = variants.values_list('stock', flat=True).first()
+                raise InsufficientStockError(f"Estoque insuficiente ({available}) para {self.sku}.")
+            StockMovement.objects.create(variant=self, delta=-quantity, reason=StockMovement.ORDER, order=order)
+            # The row is locked by the UPDATE until commit
+            self.stock = variants.values_list('stock', flat=True).get()
+            if self.stock == 0:
+                metrics.record_stock_outs(1, StockMovement.ORDER)
+
+
+class InsufficientStockError(ValueError):
+    """Not enough stock for an order line"""
+
+
+class OrderTransitionError(ValueError):
+    """Status change not allowed from the order's current status"""
+
+
+class OrderConflictError(OrderTransitionError):
+    """The order was changed concurrently; reload it and try again"""
+
+
+class OrderQuerySet(models.QuerySet):
+    """QuerySet helpers for the store order board"""
+
+    LIST_FIELDS = (
+        'id', 'store_id', 'customer_name', 'customer_email', 'status', 'payment_method',
+        'payment_status', 'total_amount', 'paid_at', 'created_at', 'updated_at',
+    )
+
+    def for_list(self):
+        """
+        Compact projection for order lists: only the list columns plus
+        'item_count' and the latest status update ('last_status',
+        'last_status_at') as correlated subqueries, so a page is one query.
+        """
+        items = (
+            OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+            .values('order').annotate(total=models.Count('id')).values('total')
+        )
+        updates = OrderStatusUpdate.objects.filter(order=OuterRef('pk')).order_by('-created_at', '-id')
+        return self.only(*self.LIST_FIELDS).annotate(
+            item_count=Coalesce(Subquery(items), 0),
+            last_status=Subquery(updates.values('status')[:1]),
+            last_status_at=Subquery(updates.values('created_at')[:1]),
+        )
+
 
 class Order(models.Model):
     """Order model with payment tracking and status updates"""
@@ -203,43 +383,172 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Store order board: newest first, optionally filtered by status / payment status
+            models.Index(fields=['store', '-created_at'], name='order_store_created_idx'),
+            models.Index(fields=['store', 'status', '-created_at'], name='order_store_status_idx'),
+            models.Index(fields=['store', 'payment_status', '-created_at'], name='order_store_payment_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.customer_name}"
 
+    # Allowed status changes; delivered and cancelled are final
+    TRANSITIONS = {
+        'pending': {'processing', 'cancelled'},
+        'processing': {'out_for_delivery', 'cancelled'},
+        'out_for_delivery': {'delivered'},
+        'delivered': set(),
+        'cancelled': set(),
+    }
+
     def calculate_total(self):
         """Calculate total from order items"""
         total = sum(item.get_subtotal() for item in self.items.all())
         self.total_amount = total
-        self.save()
+        self.save(update_fields=['total_amount', 'updated_at'])
         return total
 
     def set_status(self, new_status, note='', automatic=True):
-        """Update order status and create status update record"""
+        """
+        Move the order to 'new_status' following TRANSITIONS. The write is a
+        conditional UPDATE on the status this instance was loaded with, so
+        concurrent changes raise OrderConflictError instead of overwriting
+        each other. Same-status calls are no-ops; cancelling restocks.
+        """
+        if new_status not in dict(self.STATUS_CHOICES):
+            raise OrderTransitionError(f"Status inválido: {new_status}")
         old_status = self.status
-        self.status = new_status
-        self.save()
-
-        # Create status update record
-        OrderStatusUpdate.objects.create(
-            order=self,
-            status=new_status,
-            note=note,
-            is_automatic=automatic
-        )
+        if new_status == old_status:
+            return old_status
+        if new_status not in self.TRANSITIONS[old_status]:
+            raise OrderTransitionError(f"Não é possível mudar de '{old_status}' para '{new_status}'")
+
+        with transaction.atomic():
+            if not self._conditional_update({'status': old_status}, status=new_status):
+                raise OrderConflictError("O pedido foi alterado por outra pessoa. Recarregue e tente novamente.")
+            OrderStatusUpdate.objects.create(
+                order=self,
+                status=new_status,
+                note=note,
+                is_automatic=automatic
+            )
+            if new_status == 'cancelled':
+                self.restock()
 
         return old_status
 
+    def _conditional_update(self, expected, **changes):
+        """
+        UPDATE only 'changes' (plus updated_at) WHERE the row still matches
+        'expected'. On success the instance is updated and post_save is sent
+        with update_fields, so the usual receivers (purchase ledger, sales
+        rollups) still run.
+        """
+        changes['updated_at'] = timezone.now()
+        if not type(self).objects.filter(pk=self.pk, **expected).update(**changes):
+            return False
+        for field, value in changes.items():
+            setattr(self, field, value)
+        post_save.send(sender=type(self), instance=self, created=False, raw=False,
+                       using=self._state.db, update_fields=frozenset(changes))
+        return True
+
+    def restock(self):
+        """
+        Return to stock what this order took out (its 'order' movements,
+        written by OrderItem.save, net of earlier returns in the stock
+        ledger): one UPDATE for all variants and one bulk insert of 'return'
+        movements. Returns units restocked.
+        """
+        taken = (
+            StockMovement.objects.filter(order=self, reason__in=[StockMovement.ORDER, StockMovement.RETURN])
+            .order_by().values('variant').annotate(total=models.Sum('delta'))
+        )
+        returns = {row['variant']: -row['total'] for row in taken if row['total'] < 0}
+        if not returns:
+            return 0
+        ProductVariant.objects.filter(pk__in=returns).update(
+            stock=F('stock') + Case(
+                *[When(pk=variant_id, then=Value(quantity)) for variant_id, quantity in returns.items()],
+                output_field=models.IntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        StockMovement.record_many(returns, StockMovement.RETURN, order=self)
+        return sum(returns.values())
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted payment status so signals can detect transitions
+        if 'payment_status' in field_names:
+            instance._loaded_payment_status = instance.payment_status
+        if not instance.get_deferred_fields() & cls.ANALYTICS_FIELDS:
+            instance._loaded_analytics = instance.analytics_contribution()
+        return instance
+
+    # None for unsaved orders; updated by from_db() and the post_save signal
+    _loaded_payment_status = None
+
+    # Persisted analytics_contribution(); updated by from_db() and the post_save signal
+    _loaded_analytics = None
+
+    ANALYTICS_FIELDS = {'store_id', 'created_at', 'status', 'payment_status', 'total_amount'}
+
+    def analytics_contribution(self):
+        """(store, day, status, payment status, total) counted in the daily sales rollups"""
+        if self.store_id is None or self.created_at is None:
+            return None
+        return (self.store_id, timezone.localdate(self.created_at), self.status,
+                self.payment_status, self.total_amount)
+
     def mark_cod_paid(self):
-        """Mark cash on delivery order as paid"""
-        if self.payment_method == 'cod' and self.payment_status == 'pending':
-            self.payment_status = 'paid'
-            self.paid_at = timezone.now()
-            self.save()
-            return True
-        return False
+        """Mark cash on delivery order as paid (only if still pending in the database)"""
+        if self.payment_method != 'cod' or self.payment_status != 'pending':
+            return False
+        return self._conditional_update(
+            {'payment_method': 'cod', 'payment_status': 'pending'},
+            payment_status='paid', paid_at=timezone.now(),
+        )
+
+
+class ArchivedOrder(models.Model):
+    """
+    Delivered/cancelled order moved out of the hot tables by the
+    archive_orders command (see sales/archive.py). Keeps the original id,
+    with its items and status history denormalized as JSON.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='archived_orders', null=True, blank=True)
+    customer_name = models.CharField(max_length=200)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=20, blank=True)
+    shipping_address = models.TextField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHOD_CHOICES)
+    payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS_CHOICES)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    item_count = models.PositiveIntegerField(default=0)
+    items = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    status_updates = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['store', '-created_at'], name='archived_order_store_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.customer_name}"
 
 
 class OrderItem(models.Model):
@@ -259,7 +568,22 @@ class OrderItem(models.Model):
     def get_subtotal(self):
         return self.quantity * self.unit_price
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'product_id', 'quantity', 'unit_price'}:
+            instance._loaded_line = instance.analytics_line()
+        return instance
+
+    # Persisted analytics_line(); updated by from_db() and the OrderItem signals
+    _loaded_line = None
+
+    def analytics_line(self):
+        """(product, quantity, revenue) counted in the product daily rollups"""
+        return (self.product_id, self.quantity, self.quantity * self.unit_price)
+
     def save(self, *args, **kwargs):
+        """New lines take their variant's stock (ProductVariant.take_stock) in the same transaction"""
         if not self.unit_price:
             if getattr(self, 'variant') and self.variant:
                 self.unit_price = self.variant.price
@@ -267,7 +591,11 @@ class OrderItem(models.Model):
                 self.unit_price = self.product.price
             else:
                 self.unit_price = 0
-        super().save(*args, **kwargs)
+        if not self._state.adding or self.variant_id is None:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.variant.take_stock(self.quantity, order=self.order)
+            super().save(*args, **kwargs)
 
 
 class OrderStatusUpdate(models.Model):
@@ -280,11 +608,41 @@ class OrderStatusUpdate(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Latest status of an order (order list projection)
+            models.Index(fields=['order', '-created_at'], name='status_update_order_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.order.id} - {self.status} at {self.created_at}"
 
 
+class ReviewQuerySet(models.QuerySet):
+    """QuerySet helpers for review moderation"""
+
+    REBUILD_BATCH_SIZE = 1000
+
+    def pending(self):
+        """Reviews never approved nor rejected by a moderator"""
+        return self.filter(is_approved=False, moderated_at__isnull=True)
+
+    def moderate(self, approve):
+        """
+        Approve or reject every review in the queryset with a single UPDATE,
+        then rebuild the rating summary once per affected product.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            product_ids = list(
+                self.exclude(is_approved=approve).order_by().values_list('product_id', flat=True).distinct()
+            )
+            updated = self.update(is_approved=approve, moderated_at=now, updated_at=now)
+            for start in range(0, len(product_ids), self.REBUILD_BATCH_SIZE):
+                ProductRatingSummary.rebuild(product_ids[start:start + self.REBUILD_BATCH_SIZE])
+                store_cache.invalidate_products(product_ids[start:start + self.REBUILD_BATCH_SIZE])
+        return updated
+
+
 class Review(models.Model):
     """Product reviews"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -292,16 +650,149 @@ class Review(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(blank=True)
     is_approved = models.BooleanField(default=False)
+    is_verified_purchase = models.BooleanField(default=False)
+    moderated_at = models.DateTimeField(null=True, blank=True,
+                                        help_text="When a moderator approved or rejected the review")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         unique_together = ('product', 'user')  # One review per user per product
+        indexes = [
+            # Keyset pagination over the pending moderation queue
+            models.Index(fields=['id'], name='review_pending_idx',
+                         condition=models.Q(is_approved=False, moderated_at__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.rating}/5)"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._mark_rating_loaded()
+        return instance
+
+    # Persisted (product, rating) counted in the summary; None when not approved
+    _loaded_contribution = None
+
+    def _mark_rating_loaded(self):
+        if self.get_deferred_fields() & {'product_id', 'rating', 'is_approved'}:
+            return
+        self._loaded_contribution = (self.product_id, self.rating) if self.is_approved else None
+
+    def sync_rating_summary(self, deleted=False):
+        """Apply the difference between the persisted and current state to the summary"""
+        old = self._loaded_contribution
+        new = None if deleted or not self.is_approved else (self.product_id, self.rating)
+        if old == new:
+            return
+        if old:
+            ProductRatingSummary.apply_delta(old[0], {old[1]: -1})
+        if new:
+            ProductRatingSummary.apply_delta(new[0], {new[1]: 1})
+        self._loaded_contribution = new
+
+
+class ProductRatingSummary(models.Model):
+    """
+    Per-product counters of approved reviews (one per star plus the rating sum),
+    kept up to date incrementally by the Review signals.
+    """
+    RATINGS = (1, 2, 3, 4, 5)
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='rating_summary')
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Product rating summaries'
+
+    def __str__(self):
+        return f"{self.product_id}: {self.average} ({self.count})"
+
+    @property
+    def distribution(self):
+        return {rating: getattr(self, f'rating_{rating}') for rating in self.RATINGS}
+
+    @property
+    def count(self):
+        return sum(self.distribution.values())
+
+    @property
+    def average(self):
+        count = self.count
+        return round(self.rating_sum / count, 1) if count else None
+
+    @classmethod
+    def apply_delta(cls, product_id, deltas):
+        """
+        Add deltas ({rating: +n/-n}) to the product's counters with a single
+        UPDATE using F() expressions, creating the row on first use.
+        """
+        deltas = {rating: delta for rating, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        rating_sum = sum(rating * delta for rating, delta in deltas.items())
+        updates = {f'rating_{rating}': F(f'rating_{rating}') + delta for rating, delta in deltas.items()}
+        updates['rating_sum'] = F('rating_sum') + rating_sum
+        updates['updated_at'] = timezone.now()
+
+        if cls.objects.filter(product_id=product_id).update(**updates):
+            return
+        if all(delta < 0 for delta in deltas.values()):
+            # Nothing to subtract from (e.g. the product itself is being deleted)
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    product_id=product_id,
+                    rating_sum=max(rating_sum, 0),
+                    **{f'rating_{rating}': max(delta, 0) for rating, delta in deltas.items()}
+                )
+        except IntegrityError:
+            # Created concurrently by another request
+            cls.objects.filter(product_id=product_id).update(**updates)
+
+    @classmethod
+    def rebuild(cls, product_ids):
+        """
+        Recompute the summaries of the given products from scratch with one
+        grouped query over approved reviews and one bulk upsert.
+        """
+        product_ids = list(product_ids)
+        summaries = {pk: cls(product_id=pk) for pk in product_ids}
+        rows = (
+            Review.objects.filter(product_id__in=product_ids, is_approved=True)
+            .order_by()
+            .values('product_id', 'rating')
+            .annotate(total=models.Count('id'))
+        )
+        for row in rows:
+            summary = summaries[row['product_id']]
+            setattr(summary, f'rating_{row["rating"]}', row['total'])
+            summary.rating_sum += row['rating'] * row['total']
+
+        now = timezone.now()
+        for summary in summaries.values():
+            summary.updated_at = now
+        cls.objects.bulk_create(
+            summaries.values(),
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=[f'rating_{rating}' for rating in cls.RATINGS] + ['rating_sum', 'updated_at'],
+        )
+        return len(summaries)
+
 
 class Coupon(models.Model):
     """Discount coupons"""
@@ -372,4 +863,233 @@ class Wishlist(models.Model):
         unique_together = ('user', 'product')  # One product per user in wishlist
 
     def __str__(self):
-        return f"{self.user.username} - {self.product.name}"
\ No newline at end of file
+        return f"{self.user.username} - {self.product.name}"
+
+    @classmethod
+    def toggle(cls, user, product_id):
+        """
+        Add the product to the user's wishlist, or remove it if already there.
+
+        The insert is a single INSERT ... SELECT guarded by ON CONFLICT, so a
+        concurrent toggle never raises IntegrityError. Returns a tuple
+        (action, item_id) where action is 'added', 'removed' or None when
+        the product does not exist.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (user_id, product_id, created_at)
+                SELECT %s, id, %s FROM {Product._meta.db_table} WHERE id = %s
+                ON CONFLICT (user_id, product_id) DO NOTHING
+                RETURNING id
+                """,
+                [user.pk, timezone.now(), product_id]
+            )
+            row = cursor.fetchone()
+        if row:
+            return 'added', row[0]
+
+        deleted, _ = cls.objects.filter(user=user, product_id=product_id).delete()
+        if deleted:
+            return 'removed', None
+        return None, None
+
+
+class PurchasedProduct(models.Model):
+    """
+    Ledger of products bought per customer email, filled when an order is paid.
+    Answers "did this customer buy this product?" with a single unique-index probe.
+    """
+    email = models.EmailField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='purchases')
+    last_order = models.ForeignKey(Order, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    last_purchased_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-last_purchased_at']
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'product'], name='unique_purchase_email_product'),
+        ]
+        indexes = [
+            models.Index(fields=['email', '-last_purchased_at'], name='purchase_email_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} - {self.product_id}"
+
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').strip().lower()
+
+    @classmethod
+    def record_order(cls, order, product_ids=None):
+        """Upsert one ledger row per product in a paid order (or just these products of it)"""
+        email = cls.normalize_email(order.customer_email)
+        if not email:
+            return 0
+        purchased_at = order.paid_at or timezone.now()
+        if product_ids is None:
+            product_ids = order.items.values_list('product_id', flat=True)
+        product_ids = set(product_ids)
+        cls.objects.bulk_create(
+            [
+                cls(email=email, product_id=product_id, last_order=order, last_purchased_at=purchased_at)
+                for product_id in product_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['email', 'product'],
+            update_fields=['last_order', 'last_purchased_at'],
+        )
+        return len(product_ids)
+
+    @classmethod
+    def has_purchased(cls, user, product):
+        """True if the user's email appears in the ledger for this product"""
+        email = cls.normalize_email(user.email)
+        if not email:
+            return False
+        return cls.objects.filter(email=email, product=product).exists()
+
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a shopping cart until 'expires_at'.
+    Available stock = ProductVariant.stock - active reservations.
+    """
+    cart_token = models.CharField(max_length=64)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['cart_token', 'variant'], name='unique_reservation_cart_variant'),
+        ]
+        indexes = [
+            # Sum of active reservations per variant
+            models.Index(fields=['variant', 'expires_at'], name='reservation_variant_exp_idx'),
+            # Sweeper: expired reservations in batches
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cart_token} - {self.variant_id} x{self.quantity}"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only stock ledger: every change to ProductVariant.stock is
+    recorded with its reason, in the same transaction as the change.
+    """
+    ORDER = 'order'
+    ADJUSTMENT = 'adjustment'
+    IMPORT = 'import'
+    RETURN = 'return'
+    REASON_CHOICES = [
+        (ORDER, 'Order'),
+        (ADJUSTMENT, 'Manual adjustment'),
+        (IMPORT, 'Import'),
+        (RETURN, 'Return'),
+    ]
+
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='stock_movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='stock_movements')
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # Tail after a snapshot: WHERE variant_id = ? AND id > ?
+            models.Index(fields=['variant', 'id'], name='movement_variant_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.variant_id} {self.delta:+d} ({self.reason})"
+
+    @classmethod
+    def record_many(cls, changes, reason, order=None, note='', batch_size=1000):
+        """Bulk-insert movements for {variant_id: delta}; zero deltas are skipped"""
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(variant_id=variant_id, delta=delta, reason=reason, order=order, note=note, created_at=now)
+                for variant_id, delta in changes.items() if delta
+            ],
+            batch_size=batch_size,
+        )
+
+
+class StockSnapshot(models.Model):
+    """
+    Ledger balance of a variant as of 'taken_at', covering every movement
+    up to 'movement_id'. Current or point-in-time stock is the latest
+    snapshot plus the (bounded) tail of movements after it.
+    """
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='stock_snapshots')
+    movement_id = models.BigIntegerField()
+    stock = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-taken_at']
+        constraints = [
+            models.UniqueConstraint(fields=['variant', 'movement_id'], name='unique_snapshot_variant_movement'),
+        ]
+        indexes = [
+            models.Index(fields=['variant', 'taken_at'], name='snapshot_variant_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.variant_id} = {self.stock} @ {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class StoreDailySales(models.Model):
+    """
+    Per-store, per-day order totals (by order creation date), kept up to
+    date incrementally by the Order signals; see sales/analytics.py.
+    Cancelled orders only count in 'cancelled_orders'.
+    """
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_orders = models.IntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cancelled_orders = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['store', 'date']
+        verbose_name_plural = 'Store daily sales'
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'date'], name='unique_store_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.store_id} {self.date}: {self.orders} / {self.revenue}"
+
+
+class ProductDailySales(models.Model):
+    """Per-product, per-day units and revenue of non-cancelled orders"""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='product_daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['store', 'date']
+        verbose_name_plural = 'Product daily sales'
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'date', 'product'], name='unique_product_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.date}: {self.quantity} / {self.revenue}"
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import (
     Store, Product, ProductVariant, Category, Attribute, AttributeValue,
-    Order, OrderItem, OrderStatusUpdate, Review, Coupon, Wishlist
+    Order, OrderItem, OrderStatusUpdate, Review, Coupon, Wishlist, ArchivedOrder
 )
 from django.db import transaction
+from . import images
 
 
 # --- BASIC SERIALIZERS ---
@@ -52,6 +53,8 @@ class ProductVariantSerializer(serializers.ModelSerializer):
     Serializer para as Variantes.
     Usado para ler E escrever as variantes dentro do Produto.
     """
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductVariant
         fields = [
@@ -59,10 +62,14 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             'name',  # <--- O campo "Nome da Variante" (ex: "Tamanho M")
             'sku', 
             'price', 
-            'stock'
+            'stock',
+            'image_srcset'
         ]
         read_only_fields = ['id']
 
+    def get_image_srcset(self, obj):
+        return images.build_srcset(obj, self.context.get('request'))
+
 
 # ---
 # SERIALIZER DE PRODUTO PRINCIPAL (TOTALMENTE CORRIGIDO)
@@ -79,6 +86,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
     categories = CategorySerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     # <--- ALTERADO: Adicionado 'variant_attributes'
     variant_attributes = AttributeSerializer(many=True, read_only=True)
@@ -106,7 +114,7 @@ class ProductSerializer(serializers.ModelSerializer):
         # <--- ALTERADO: Adicionado 'variant_attributes', 'price', 'stock', 'sku'
         fields = [
             'id', 'store', 'store_name', 'name', 'description', 'is_active', 'image',
-            'categories', 'variant_attributes', 'variants', 'total_stock',
+            'image_srcset', 'categories', 'variant_attributes', 'variants', 'total_stock',
             'average_rating', 'review_count', 'created_at', 'updated_at',
             'price', 'stock', 'sku'  # Added for simple product creation
         ]
@@ -120,6 +128,10 @@ class ProductSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_srcset(self, obj):
+        """Versões redimensionadas (WebP/JPEG) por largura"""
+        return images.build_srcset(obj, self.context.get('request'))
+
     def create(self, validated_data):
         """
         Create product and optionally a default variant if price/stock provided.
@@ -158,12 +170,13 @@ class ProductLiteSerializer(serializers.ModelSerializer):
     Serializer para o modelo Product, incluindo a criação aninhada da ProductVariant.
     """
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     price = serializers.SerializerMethodField()
     # <--- ATENÇÃO: 'slug' não existe no seu model Product. 
     # Mantenha ou remova conforme seu model.
     class Meta:
         model = Product 
-        fields = ['id', 'name', 'image', 'price'] 
+        fields = ['id', 'name', 'image', 'image_srcset', 'price'] 
 
     def get_image(self, obj):
         """ Pega a URL da imagem principal do produto """
@@ -174,14 +187,14 @@ class ProductLiteSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_srcset(self, obj):
+        """Versões redimensionadas (WebP/JPEG) por largura"""
+        return images.build_srcset(obj, self.context.get('request'))
+
     def get_price(self, obj):
         """Retorna o preço do produto (da primeira variante ou do preço principal)"""
-        # Se produto tem variantes, pega o menor preço
-        if obj.variants.exists():
-            variant = obj.variants.filter(is_active=True).order_by('price').first()
-            return variant.price if variant else None
-        # Se não tem variantes, retorna o preço principal
-        return obj.price
+        # Usa a anotação de with_min_price() quando disponível (sem queries extras)
+        return obj.display_price
         
     def validate(self, data):
         """
@@ -260,7 +273,35 @@ class OrderSerializer(serializers.ModelSerializer):
                  'customer_phone', 'shipping_address', 'status', 'total_amount',
                  'payment_method', 'payment_status', 'paid_at', 'created_at',
                  'updated_at', 'items', 'status_updates']
-        read_only_fields = ['id', 'total_amount', 'paid_at', 'created_at', 'updated_at']
+        # status only changes through the set_status action (validated transitions)
+        read_only_fields = ['id', 'status', 'total_amount', 'paid_at', 'created_at', 'updated_at']
+
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Compact order representation for lists (see OrderQuerySet.for_list)"""
+    item_count = serializers.IntegerField(read_only=True)
+    last_status = serializers.CharField(read_only=True, allow_null=True)
+    last_status_at = serializers.DateTimeField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'store', 'customer_name', 'customer_email', 'status', 'payment_method',
+                  'payment_status', 'total_amount', 'paid_at', 'created_at', 'updated_at',
+                  'item_count', 'last_status', 'last_status_at']
+        read_only_fields = fields
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """Archived order in the same shape as OrderSerializer (items/status history from JSON)"""
+    store_name = serializers.CharField(source='store.name', read_only=True, default=None)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ['id', 'store', 'store_name', 'customer_name', 'customer_email',
+                  'customer_phone', 'shipping_address', 'status', 'total_amount',
+                  'payment_method', 'payment_status', 'paid_at', 'created_at',
+                  'updated_at', 'items', 'status_updates', 'archived_at']
+        read_only_fields = fields
 
 
 # --- REVIEW SERIALIZERS ---
@@ -273,8 +314,8 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'product', 'product_name', 'user', 'user_name', 'rating',
-                 'comment', 'is_approved', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+                 'comment', 'is_approved', 'is_verified_purchase', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'is_verified_purchase', 'created_at', 'updated_at']
 
 
 # --- COUPON SERIALIZERS ---
@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
-from .models import OrderStatusUpdate, OrderItem
+from core import metrics
+
+from . import analytics, catalog_snapshot, images, store_cache
+from .models import (
+    Category, Order, OrderStatusUpdate, OrderItem, PurchasedProduct, Review, Product, ProductVariant, Store,
+)
 
 # Funções auxiliares (Se o Order.calculate_total() salva, esta é a parte perigosa)
 
@@ -15,6 +20,7 @@ def send_order_status_notification(order, status, note):
     """
     # Apenas para fins de demonstração/log
     print(f"[NOTIF] Pedido #{order.id} -> {status}. Nota: {note}")
+    metrics.NOTIFICATIONS.labels('sent').inc()
 
 # --- Signals para OrderStatusUpdate (Notificação) ---
 
@@ -26,6 +32,83 @@ def order_status_update_notify(sender, instance: OrderStatusUpdate, created, **k
     if created:
         send_order_status_notification(instance.order, instance.status, instance.note)
 
+# --- Signals para imagens (Geração de miniaturas) ---
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+def schedule_image_renditions(sender, instance, **kwargs):
+    """
+    Agenda a geração das versões redimensionadas quando a imagem muda.
+    """
+    images.schedule(instance)
+
+# --- Signals para Order (Registro de Compras) ---
+
+@receiver(post_save, sender=Order)
+def record_purchases_on_paid(sender, instance: Order, created, **kwargs):
+    """
+    Registra os produtos do pedido no ledger de compras quando
+    o pagamento passa para 'paid' (mark_cod_paid, admin ou API).
+    """
+    if instance.payment_status == 'paid' and instance._loaded_payment_status != 'paid':
+        PurchasedProduct.record_order(instance)
+    instance._loaded_payment_status = instance.payment_status
+
+@receiver(post_save, sender=OrderItem)
+def record_purchase_on_item_save(sender, instance: OrderItem, created, **kwargs):
+    """
+    Itens adicionados a um pedido já pago também entram no ledger
+    (só o produto do item: o resto do pedido já foi registrado).
+    """
+    if created and instance.order.payment_status == 'paid':
+        PurchasedProduct.record_order(instance.order, product_ids=[instance.product_id])
+
+# --- Signals para Analytics (Rollups diários de vendas) ---
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups_on_order_save(sender, instance: Order, created, **kwargs):
+    """
+    Aplica nos rollups diários a mudança do pedido (criação, pagamento,
+    cancelamento ou novo total).
+    """
+    analytics.sync_order(instance, created=created)
+
+
+@receiver(post_delete, sender=Order)
+def update_sales_rollups_on_order_delete(sender, instance: Order, **kwargs):
+    analytics.sync_order(instance, deleted=True)
+
+
+@receiver(post_save, sender=OrderItem)
+def update_sales_rollups_on_item_save(sender, instance: OrderItem, **kwargs):
+    """
+    Atualiza quantidade/receita do produto no dia do pedido.
+    """
+    analytics.sync_item(instance)
+
+
+@receiver(post_delete, sender=OrderItem)
+def update_sales_rollups_on_item_delete(sender, instance: OrderItem, **kwargs):
+    analytics.sync_item(instance, deleted=True)
+
+# --- Signals para Review (Resumo de Avaliações) ---
+
+@receiver(post_save, sender=Review)
+def update_rating_summary_on_review_save(sender, instance: Review, **kwargs):
+    """
+    Atualiza os contadores de estrelas quando uma avaliação é criada,
+    aprovada/desaprovada ou editada.
+    """
+    instance.sync_rating_summary()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_summary_on_review_delete(sender, instance: Review, **kwargs):
+    """
+    Remove a contribuição de uma avaliação aprovada excluída.
+    """
+    instance.sync_rating_summary(deleted=True)
+
 # --- Signals para OrderItem (Recálculo do Total) ---
 
 @receiver(post_save, sender=OrderItem)
@@ -59,4 +142,72 @@ def recalc_order_total_on_item_delete(sender, instance: OrderItem, **kwargs):
     try:
         instance.order.calculate_total()
     finally:
-        SKIP_RECALCULATION = False
\ No newline at end of file
+        SKIP_RECALCULATION = False
+
+
+# --- Signals para o cache por loja (store_cache) ---
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_store_cache_on_store_change(sender, instance: Store, **kwargs):
+    """
+    Uma loja nova nunca herda entradas de um id reaproveitado.
+    """
+    store_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_store_cache_on_product_change(sender, instance: Product, **kwargs):
+    """
+    Qualquer alteração de produto invalida as listagens/analytics da loja.
+    """
+    store_cache.invalidate(instance.store_id)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_store_cache_on_product_data_change(sender, instance, **kwargs):
+    store_cache.invalidate_products([instance.product_id])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_store_cache_on_order_change(sender, instance: Order, **kwargs):
+    store_cache.invalidate(instance.store_id)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_store_cache_on_item_change(sender, instance: OrderItem, **kwargs):
+    store_cache.invalidate(instance.order.store_id)
+
+
+# --- Signals para o snapshot do catálogo (catalog_snapshot) ---
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def publish_catalog_change_on_product(sender, instance: Product, **kwargs):
+    catalog_snapshot.changed([instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def publish_catalog_change_on_variant(sender, instance: ProductVariant, **kwargs):
+    """
+    Preço e ativação das variantes mudam o preço exibido e os filtros.
+    """
+    catalog_snapshot.changed([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Product.categories.through)
+def publish_catalog_change_on_categories(sender, action=None, **kwargs):
+    """
+    Categorias e vínculos são relidos inteiros a cada atualização do snapshot.
+    """
+    if action is None or action.startswith('post_'):
+        catalog_snapshot.changed([])
@@ -0,0 +1,95 @@
+"""
+Store-scoped cache for the store owner's dashboard reads.
+
+Every store has a version in the cache, and cached entries of that store
+(product list, order list, analytics) are keyed by it:
+
+    store:<id>:v<version>:<name>:<hash of the request parameters>
+
+Any write to the store's products, variants, orders or reviews replaces
+the version (invalidate), so all of its entries are dropped in O(1)
+without scanning keys; the old ones just expire. Keys always carry the
+store id, so one store can never be served another store's data.
+
+The version is bumped right away and again when the transaction commits:
+a request that read the old rows before the commit could otherwise cache
+them under the new version.
+
+Versions are random tokens rather than counters, so a version evicted
+from the cache and created again never matches the one older entries
+were stored under.
+
+Entries are always computed on the primary database (replicas.primary()):
+right after an invalidation the replica may still have the old rows.
+
+With several workers, the cache must be shared (REDIS_URL), otherwise
+each process only sees its own invalidations.
+
+Settings:
+    STORE_CACHE_TIMEOUT  seconds an entry is kept (default 300, 0 = off)
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import metrics, replicas
+
+VERSION_KEY = 'store:{}:version'
+
+
+def _timeout():
+    return getattr(settings, 'STORE_CACHE_TIMEOUT', 300)
+
+
+def version(store_id):
+    key = VERSION_KEY.format(store_id)
+    current = cache.get(key)
+    if current is None:
+        # add(): concurrent first readers agree on one version
+        cache.add(key, uuid.uuid4().hex, None)
+        current = cache.get(key)
+    return current
+
+
+def bump(store_id):
+    cache.set(VERSION_KEY.format(store_id), uuid.uuid4().hex, None)
+
+
+def invalidate(*store_ids):
+    """Drop every cached entry of these stores (now and on commit)"""
+    store_ids = {store_id for store_id in store_ids if store_id is not None}
+    for store_id in store_ids:
+        bump(store_id)
+    if store_ids:
+        transaction.on_commit(lambda: [bump(store_id) for store_id in store_ids])
+
+
+def invalidate_products(product_ids):
+    """invalidate() the stores of these products (ids or a values() queryset)"""
+    from .models import Product
+
+    invalidate(*Product.objects.filter(pk__in=product_ids).values_list('store_id', flat=True).distinct())
+
+
+def request_params(request):
+    """Everything a cached response depends on: absolute links and the query string"""
+    return f'{request.scheme}://{request.get_host()}{request.path}?{sorted(request.GET.lists())}'
+
+
+def get_or_set(store_id, name, params, build):
+    """Cached build() for the store, or build() itself when caching is off"""
+    timeout = _timeout()
+    if not timeout:
+        return build()
+    digest = hashlib.md5(str(params).encode(), usedforsecurity=False).hexdigest()
+    key = f'store:{store_id}:v{version(store_id)}:{name}:{digest}'
+    data = cache.get(key)
+    metrics.record_cache_lookup(f'store_{name}', data is not None)
+    if data is None:
+        with replicas.primary():
+            data = build()
+        cache.set(key, data, timeout)
+    return data
@@ -0,0 +1,318 @@
+"""
+Deterministic synthetic data for benchmarks, load tests and scaling
+reproductions (benchmark and seed_catalog commands).
+
+seed() generates:
+- stores with their owners, and customers
+- a two-level category tree and attributes
+- products with variants linked to attribute values
+- approved reviews, orders with items and status history, and coupons
+
+The same seed and sizes always produce the same data, and everything is
+named with a prefix so several datasets can live in one database.
+
+Rows are streamed to the database in chunks by TableWriter, with primary
+keys assigned here (continuing from the current maximum), so nothing is
+read back and memory stays flat at millions of rows. On PostgreSQL the
+chunks are sent with COPY; elsewhere with executemany. The sequences are
+reset at the end. Model signals never fire for these inserts, so the
+derived tables (rating summaries, sales rollups, purchase ledger, stock
+ledger) are filled in with set-based passes at the end, and the store
+caches and catalog snapshot are invalidated explicitly.
+
+Nothing else should insert into these tables while seeding, since the
+primary keys are assigned up front.
+"""
+import io
+import json
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import analytics, catalog_snapshot, store_cache
+from .models import (
+    Attribute, AttributeValue, Category, Coupon, Order, OrderItem, OrderStatusUpdate, Product,
+    ProductRatingSummary, ProductVariant, PurchasedProduct, Review, StockMovement, Store,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+REBUILD_BATCH_SIZE = 1000
+PASSWORD = 'synthetic'
+HISTORY_DAYS = 180
+
+ATTRIBUTES = {
+    'Cor': ['Preto', 'Branco', 'Azul', 'Vermelho', 'Verde', 'Cinza'],
+    'Tamanho': ['PP', 'P', 'M', 'G', 'GG'],
+    'Material': ['Algodão', 'Poliéster', 'Linho', 'Couro'],
+}
+WORDS = [
+    'Camiseta', 'Calça', 'Jaqueta', 'Tênis', 'Bolsa', 'Vestido', 'Boné', 'Meia', 'Camisa', 'Saia',
+    'Clássica', 'Esportiva', 'Básica', 'Premium', 'Slim', 'Casual', 'Urbana', 'Vintage', 'Leve', 'Térmica',
+]
+# (status, payment status, weight)
+ORDER_MIX = [
+    ('delivered', 'paid', 45), ('out_for_delivery', 'paid', 10), ('processing', 'paid', 10),
+    ('pending', 'pending', 25), ('cancelled', 'pending', 10),
+]
+PAYMENT_METHODS = ['cod', 'card', 'online']
+REVIEW_RATINGS = [5, 5, 5, 4, 4, 4, 3, 2, 1]
+
+PREPARED_FIELDS = (models.DecimalField, models.DateTimeField, models.JSONField)
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(field, value):
+    """Value in PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, cls=field.encoder)
+    elif isinstance(value, bool):
+        return 't' if value else 'f'
+    elif isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class TableWriter:
+    """
+    Buffered inserts into one table. Rows are given as {field name: value};
+    missing fields take their model default (computed once) and the
+    primary key is assigned from next_id() when not given.
+    """
+
+    def __init__(self, model, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.progress = progress
+        self.fields = [f for f in model._meta.concrete_fields]
+        self.defaults = {f.attname: f.get_default() for f in self.fields if not f.primary_key}
+        self.pk = model._meta.pk.attname
+        self.first_id = (model.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+        self._next_id = self.first_id
+        self.rows = []
+        self.count = 0
+
+    def next_id(self):
+        pk, self._next_id = self._next_id, self._next_id + 1
+        return pk
+
+    def add(self, **values):
+        """Queue a row; returns its primary key"""
+        if self.pk not in values:
+            values[self.pk] = self.next_id()
+        self.rows.append([values[f.attname] if f.attname in values else self.defaults[f.attname]
+                          for f in self.fields])
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+        return values[self.pk]
+
+    def flush(self):
+        if not self.rows:
+            return
+        # Resolved once: the connection proxy is a thread-local lookup per access
+        conn = connections[DEFAULT_DB_ALIAS]
+        table = conn.ops.quote_name(self.model._meta.db_table)
+        columns = ', '.join(conn.ops.quote_name(f.column) for f in self.fields)
+        with conn.cursor() as cursor:
+            if conn.vendor == 'postgresql':
+                data = io.StringIO()
+                for row in self.rows:
+                    data.write('\t'.join(_copy_value(f, v) for f, v in zip(self.fields, row)))
+                    data.write('\n')
+                sql = f'COPY {table} ({columns}) FROM STDIN'
+                if hasattr(cursor.cursor, 'copy'):  # psycopg 3
+                    with cursor.cursor.copy(sql) as copy:
+                        copy.write(data.getvalue())
+                else:
+                    data.seek(0)
+                    cursor.cursor.copy_expert(sql, data)
+            else:
+                # Only values the driver can't take as they are go through the field
+                prepared = [i for i, f in enumerate(self.fields) if isinstance(f, PREPARED_FIELDS)]
+                for row in self.rows:
+                    for i in prepared:
+                        row[i] = self.fields[i].get_db_prep_save(row[i], conn)
+                placeholders = ', '.join(['%s'] * len(self.fields))
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', self.rows)
+        self.count += len(self.rows)
+        self.rows = []
+        if self.progress:
+            self.progress(self.model._meta.label, self.count)
+
+
+def _cents(value):
+    return Decimal(value) / 100
+
+
+def _reset_sequences(model_list):
+    conn = connections[DEFAULT_DB_ALIAS]
+    with conn.cursor() as cursor:
+        for sql in conn.ops.sequence_reset_sql(no_style(), model_list):
+            cursor.execute(sql)
+
+
+def seed(prefix='synthetic', stores=2, products_per_store=100, variants_per_product=3, categories=20,
+         customers=50, reviews_per_product=2, orders_per_store=200, items_per_order=3, coupons=5,
+         seed=42, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Create the dataset in one transaction; returns {table: rows created}"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+
+    def writer(model):
+        return TableWriter(model, batch_size, progress)
+
+    with transaction.atomic():
+        users = writer(User)
+        owner_ids = [users.add(username=f'{prefix}-owner-{i}', email=f'{prefix}-owner-{i}@example.com',
+                               password=password, date_joined=now) for i in range(stores)]
+        first_customer = users._next_id
+        for i in range(customers):
+            users.add(username=f'{prefix}-customer-{i}', email=f'{prefix}-customer-{i}@example.com',
+                      password=password, date_joined=now)
+        users.flush()
+
+        store_writer = writer(Store)
+        store_ids = [store_writer.add(owner_id=owner_id, name=f'{prefix} loja {i}',
+                                      email=f'{prefix}-owner-{i}@example.com', created_at=now, updated_at=now)
+                     for i, owner_id in enumerate(owner_ids)]
+        store_writer.flush()
+
+        # Category tree: a quarter are roots, the rest hang under a random root
+        category_writer = writer(Category)
+        category_ids, root_ids = [], []
+        for i in range(categories):
+            parent = rng.choice(root_ids) if i >= max(categories // 4, 1) else None
+            pk = category_writer.add(name=f'{prefix} cat {i}', slug=f'{prefix}-cat-{i}', parent_id=parent,
+                                     created_at=now, updated_at=now)
+            category_ids.append(pk)
+            if parent is None:
+                root_ids.append(pk)
+        category_writer.flush()
+
+        attributes = {}
+        for name, values in ATTRIBUTES.items():
+            attribute, _ = Attribute.objects.get_or_create(name=name)
+            attributes[attribute.pk] = [AttributeValue.objects.get_or_create(attribute=attribute, value=v)[0]
+                                        for v in values]
+        color, size = list(attributes)[:2]
+
+        products, product_categories, product_attributes = (
+            writer(Product), writer(Product.categories.through), writer(Product.variant_attributes.through)
+        )
+        variants, variant_values, movements = (
+            writer(ProductVariant), writer(ProductVariant.values.through), writer(StockMovement)
+        )
+        # Per store: [(variant id, product id, price in cents)] for the orders
+        catalog = {}
+        for store_id in store_ids:
+            catalog[store_id] = []
+            for i in range(products_per_store):
+                sku = f'{prefix}-{store_id}-{i}'
+                product_id = products.add(
+                    store_id=store_id, name=f'{" ".join(rng.sample(WORDS, 2))} {i}',
+                    description=f'Produto sintético {i}', sku=sku, created_at=now, updated_at=now,
+                )
+                for category_id in rng.sample(category_ids, min(2, len(category_ids))):
+                    product_categories.add(product_id=product_id, category_id=category_id)
+                for attribute_id in (color, size):
+                    product_attributes.add(product_id=product_id, attribute_id=attribute_id)
+
+                base_price = rng.randrange(1990, 49990)
+                for j in range(variants_per_product):
+                    values = [attributes[color][j % len(attributes[color])],
+                              attributes[size][(j // len(attributes[color])) % len(attributes[size])]]
+                    price, stock = base_price + j * 100, rng.randrange(0, 200)
+                    variant_id = variants.add(
+                        product_id=product_id, sku=f'{sku}-{j}', name=' / '.join(v.value for v in values),
+                        price=_cents(price), stock=stock, created_at=now, updated_at=now,
+                    )
+                    for value in values:
+                        variant_values.add(productvariant_id=variant_id, attributevalue_id=value.pk)
+                    if stock:
+                        movements.add(variant_id=variant_id, delta=stock, reason=StockMovement.IMPORT,
+                                      note='synthetic', created_at=now)
+                    catalog[store_id].append((variant_id, product_id, price))
+        for w in (products, product_categories, product_attributes, variants, variant_values, movements):
+            w.flush()
+
+        reviews = writer(Review)
+        for product_id in range(products.first_id, products.first_id + products.count):
+            for index in rng.sample(range(customers), min(reviews_per_product, customers)):
+                created_at = now - timedelta(days=rng.randrange(HISTORY_DAYS))
+                reviews.add(product_id=product_id, user_id=first_customer + index,
+                            rating=rng.choice(REVIEW_RATINGS), comment='Avaliação sintética',
+                            is_approved=True, moderated_at=now, created_at=created_at, updated_at=now)
+        reviews.flush()
+
+        orders, items, updates = writer(Order), writer(OrderItem), writer(OrderStatusUpdate)
+        statuses = [(status, payment) for status, payment, weight in ORDER_MIX for _ in range(weight)]
+        for store_id in store_ids:
+            store_catalog = catalog[store_id]
+            for _ in range(orders_per_store if store_catalog and customers else 0):
+                customer = rng.randrange(customers)
+                status, payment_status = rng.choice(statuses)
+                created_at = now - timedelta(days=rng.randrange(HISTORY_DAYS), seconds=rng.randrange(86400))
+                lines = [(line, rng.randint(1, 3))
+                         for line in rng.sample(store_catalog, min(items_per_order, len(store_catalog)))]
+                order_id = orders.add(
+                    store_id=store_id, customer_name=f'{prefix}-customer-{customer}',
+                    customer_email=f'{prefix}-customer-{customer}@example.com',
+                    shipping_address='Rua Sintética, 100', status=status, payment_status=payment_status,
+                    payment_method=rng.choice(PAYMENT_METHODS),
+                    total_amount=_cents(sum(price * quantity for (_, _, price), quantity in lines)),
+                    paid_at=created_at if payment_status == 'paid' else None,
+                    created_at=created_at, updated_at=created_at,
+                )
+                for (variant_id, product_id, price), quantity in lines:
+                    items.add(order_id=order_id, product_id=product_id, variant_id=variant_id,
+                              quantity=quantity, unit_price=_cents(price))
+                updates.add(order_id=order_id, status=status, note='synthetic', created_at=created_at)
+        for w in (orders, items, updates):
+            w.flush()
+        del catalog
+
+        coupon_writer = writer(Coupon)
+        for i in range(coupons):
+            coupon_writer.add(code=f'{prefix}-{i}'.upper(), discount_type='percentage',
+                              discount_value=Decimal(5 + i), min_purchase_amount=Decimal('50.00'),
+                              valid_from=now, created_at=now, updated_at=now)
+        coupon_writer.flush()
+
+        writers = [users, store_writer, category_writer, products, product_categories, product_attributes,
+                   variants, variant_values, movements, reviews, orders, items, updates, coupon_writer]
+        _reset_sequences([w.model for w in writers])
+
+        purchases = writer(PurchasedProduct)
+        paid_lines = (
+            OrderItem.objects.filter(order_id__gte=orders.first_id, order__payment_status='paid')
+            .order_by().values('order__customer_email', 'product_id')
+            .annotate(last_order=Max('order_id'), last_paid_at=Max('order__paid_at'))
+        )
+        for row in paid_lines.iterator(chunk_size=batch_size):
+            purchases.add(email=row['order__customer_email'], product_id=row['product_id'],
+                          last_order_id=row['last_order'], last_purchased_at=row['last_paid_at'])
+        purchases.flush()
+        _reset_sequences([PurchasedProduct])
+
+        for start in range(products.first_id, products.first_id + products.count, REBUILD_BATCH_SIZE):
+            ProductRatingSummary.rebuild(range(start, min(start + REBUILD_BATCH_SIZE,
+                                                          products.first_id + products.count)))
+        # Per store, so the product rollups of one store are in memory at a time
+        for store_id in store_ids:
+            analytics.rebuild([store_id])
+
+        # No signals fired: running processes drop their cached owner lists and
+        # catalog snapshot (now and again on commit)
+        store_cache.invalidate(*store_ids)
+        catalog_snapshot.changed(None)
+
+    return {w.model._meta.db_table: w.count for w in writers + [purchases]}
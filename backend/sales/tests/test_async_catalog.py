@@ -0,0 +1,91 @@
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from sales.models import Category, Product, ProductVariant, Store
+
+
+class AsyncCatalogTest(TestCase):
+    def setUp(self):
+        store = Store.objects.create(owner=User.objects.create_user(username='owner', password='p'), name='Loja')
+        self.category = Category.objects.create(name='Camisetas')
+        self.products = []
+        for i in range(12):
+            product = Product.objects.create(store=store, name=f'P{i}')
+            ProductVariant.objects.create(product=product, sku=f'S{i}-A', price=Decimal(10 + i), stock=1)
+            ProductVariant.objects.create(product=product, sku=f'S{i}-B', price=Decimal(20 + i), stock=1)
+            if i % 2:
+                product.categories.add(self.category)
+            self.products.append(product)
+        Product.objects.create(store=store, name='Inativo', is_active=False)
+
+    def test_list_is_paginated_like_the_api(self):
+        response = self.client.get('/api/catalog/products/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], 12)
+        self.assertEqual(len(body['results']), 10)
+        self.assertIsNone(body['previous'])
+        self.assertTrue(body['next'].endswith('/api/catalog/products/?page=2'))
+
+        body = self.client.get(body['next']).json()
+        self.assertEqual([p['name'] for p in body['results']], ['P1', 'P0'])
+        self.assertEqual(Decimal(body['results'][0]['price']), Decimal('11'))
+        self.assertEqual(self.client.get('/api/catalog/products/?page=3').status_code, 404)
+
+    def test_category_products_and_price_filter(self):
+        url = f'/api/catalog/categories/{self.category.slug}/products/'
+        body = self.client.get(url, {'max_price': '13'}).json()
+        self.assertEqual(sorted(p['name'] for p in body['results']), ['P1', 'P3'])
+        self.assertEqual(self.client.get(url, {'min_price': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/catalog/categories/nada/products/').status_code, 404)
+
+    def test_detail_matches_the_viewset(self):
+        product = self.products[0]
+        response = self.client.get(f'/api/catalog/products/{product.pk}/')
+        self.assertEqual(response.status_code, 200)
+        expected = APIClient().get(f'/api/products/{product.pk}/')
+        self.assertEqual(response.json(), json.loads(expected.content))
+        self.assertEqual(self.client.get('/api/catalog/products/999999/').status_code, 404)
+        self.assertEqual(self.client.post('/api/catalog/products/').status_code, 405)
+
+    async def test_async_request_is_instrumented(self):
+        with self.assertLogs('core.requests', level='INFO') as logs:
+            response = await self.async_client.get('/api/catalog/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queries"', response['Server-Timing'])
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry['view'], 'catalog-product-list')
+        # count, page and the variants/categories prefetches: no per-product queries
+        self.assertLessEqual(entry['queries'], 4)
+
+
+class AsyncStaticFilesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root, DEBUG=False))
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+
+    async def test_hashed_admin_files_are_served(self):
+        url = staticfiles_storage.url('admin/css/base.css')
+        self.assertNotEqual(url, '/static/admin/css/base.css')
+        # A new client loads the middleware with this STATIC_ROOT
+        response = await AsyncClient().get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
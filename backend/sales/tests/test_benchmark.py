@@ -0,0 +1,106 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from sales import benchmark, catalog_snapshot, inventory, store_cache, synthetic
+from sales.models import Order, OrderStatusUpdate, Store, Product, ProductRatingSummary, StoreDailySales
+
+
+def assert_valid_statuses(test, orders):
+    """Every order has a known status/payment pair and can move on along TRANSITIONS"""
+    statuses, payments = dict(Order.STATUS_CHOICES), dict(Order.PAYMENT_STATUS_CHOICES)
+    test.assertEqual(set(OrderStatusUpdate.objects.filter(order__in=orders)
+                         .values_list('status', flat=True)) - set(statuses), set())
+    seen = set()
+    for order in orders:
+        test.assertIn(order.status, statuses)
+        test.assertIn(order.payment_status, payments)
+        seen.add(order.status)
+        allowed = sorted(Order.TRANSITIONS[order.status])
+        if allowed:
+            order.set_status(allowed[0])
+    test.assertIn('out_for_delivery', seen)
+
+
+class SyntheticDataTest(TestCase):
+    def test_seed_is_deterministic_and_consistent(self):
+        counts = synthetic.seed(prefix='a', stores=1, products_per_store=5, orders_per_store=10, seed=7)
+        self.assertEqual(counts['sales_product'], 5)
+        self.assertEqual(counts['sales_productvariant'], 15)
+        self.assertEqual(counts['sales_order'], 10)
+        self.assertEqual(counts['sales_orderitem'], 30)
+        # Derived tables are filled in and the stock ledger matches the variants
+        self.assertEqual(ProductRatingSummary.objects.count(), 5)
+        self.assertTrue(StoreDailySales.objects.exists())
+        self.assertFalse(inventory.stock_drift().exists())
+
+        synthetic.seed(prefix='b', stores=1, products_per_store=5, orders_per_store=10, seed=7)
+        names = [list(Product.objects.filter(sku__startswith=p).order_by('pk').values_list('name', flat=True))
+                 for p in ('a-', 'b-')]
+        self.assertEqual(names[0], names[1])
+        totals = [list(Order.objects.filter(customer_email__startswith=p).order_by('pk')
+                       .values_list('total_amount', 'status')) for p in ('a-', 'b-')]
+        self.assertEqual(totals[0], totals[1])
+
+    def test_seeded_orders_follow_the_status_workflow(self):
+        synthetic.seed(prefix='w', stores=1, products_per_store=3, orders_per_store=60, seed=3)
+        assert_valid_statuses(self, Order.objects.all())
+
+    @override_settings(CATALOG_SNAPSHOT=True)
+    def test_seed_without_customers_and_cached_reads(self):
+        cache.clear()
+        catalog_snapshot.reset()
+        self.addCleanup(catalog_snapshot.reset)
+        self.assertEqual(len(catalog_snapshot.current().products), 0)
+
+        with mock.patch.object(store_cache, 'invalidate', wraps=store_cache.invalidate) as invalidate:
+            counts = synthetic.seed(prefix='n', stores=1, products_per_store=3, orders_per_store=5, customers=0)
+        self.assertEqual(counts['sales_order'], 0)
+        store = Store.objects.get(name__startswith='n')
+        invalidate.assert_any_call(store.pk)
+        # The snapshot built before the seed is not served afterwards
+        self.assertEqual(len(catalog_snapshot.current().products), 3)
+
+
+class SeedCatalogCommandTest(TestCase):
+    def test_seeded_orders_follow_the_status_workflow(self):
+        call_command('seed_catalog', '--prefix', 'cmd', '--stores', '2', '--products', '3', '--customers', '5',
+                     '--reviews', '1', '--categories', '2', '--coupons', '1', '--orders', '80', stdout=StringIO())
+        orders = Order.objects.filter(customer_email__startswith='cmd-')
+        self.assertEqual(orders.count(), 80)
+        assert_valid_statuses(self, orders)
+
+
+class BenchmarkTest(TestCase):
+    def test_all_scenarios_run_without_errors(self):
+        synthetic.seed(prefix='bench', stores=1, products_per_store=5, orders_per_store=5)
+        results = benchmark.run('bench', iterations=2, warmup=1)
+        self.assertEqual(set(results), set(benchmark.SCENARIOS))
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['queries']['max'], 0, name)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['max'])
+
+    def test_percentile(self):
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 99), 4)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+
+class TableWriterTest(TestCase):
+    def test_copy_format(self):
+        from django.db import models
+        self.assertEqual(synthetic._copy_value(models.TextField(), 'a\tb\\c\nd'), 'a\\tb\\\\c\\nd')
+        self.assertEqual(synthetic._copy_value(models.BooleanField(), True), 't')
+        self.assertEqual(synthetic._copy_value(models.IntegerField(null=True), None), '\\N')
+        self.assertEqual(synthetic._copy_value(models.JSONField(), {'a': 1}), '{"a": 1}')
+
+    def test_sequences_continue_after_explicit_ids(self):
+        counts = synthetic.seed(prefix='s', stores=1, products_per_store=2, orders_per_store=3)
+        last = Order.objects.order_by('-pk').first().pk
+        order = Order.objects.create(customer_name='x', customer_email='x@example.com', shipping_address='Rua')
+        self.assertGreater(order.pk, last)
+        self.assertEqual(counts['sales_order'], 3)
@@ -0,0 +1,94 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Category, Product, ProductVariant, Store
+
+CSV = """product_sku,product_name,description,is_active,categories,variant_sku,variant_name,price,stock,attributes
+CAM,Camisa,Algodão,true,Roupas|Verão,CAM-P,P,49.90,10,Tamanho:P|Cor:Azul
+CAM,Camisa,Algodão,true,Roupas,CAM-M,M,49.90,5,Tamanho:M|Cor:Azul
+CAL,Calça,,yes,Roupas,CAL-40,40,abc,1,
+CAL,Calça,,yes,Roupas,,40,99.00,1,
+"""
+
+
+class CatalogImportTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def post(self, content, name='catalogo.csv', **extra):
+        upload = SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode('utf-8'))
+        return self.client.post('/api/products/import/', {'file': upload, **extra}, format='multipart')
+
+    def test_csv_import_with_row_errors(self):
+        response = self.post(CSV)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'], 4)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual([e['row'] for e in response.data['errors']], [4, 5])
+
+        product = Product.objects.get(sku='CAM')
+        self.assertEqual(product.store, self.store)
+        self.assertEqual(product.variants.count(), 2)
+        self.assertEqual(set(product.categories.values_list('name', flat=True)), {'Roupas', 'Verão'})
+        self.assertEqual(
+            set(ProductVariant.objects.get(sku='CAM-P').values.values_list('value', flat=True)), {'P', 'Azul'}
+        )
+
+    def test_reimport_updates_by_sku(self):
+        self.post(CSV)
+        rows = [{'product_sku': 'CAM', 'product_name': 'Camisa Nova', 'variant_sku': 'CAM-P',
+                 'price': '39.90', 'stock': 3, 'attributes': {'Tamanho': 'P'}}]
+        content = '\n'.join(json.dumps(row) for row in rows)
+        response = self.post(content, name='catalogo.jsonl')
+        self.assertEqual(response.data['imported'], 1)
+        variant = ProductVariant.objects.get(sku='CAM-P')
+        self.assertEqual((variant.price, variant.stock), (Decimal('39.90'), 3))
+        self.assertEqual(variant.product.name, 'Camisa Nova')
+        self.assertEqual(Product.objects.filter(sku='CAM').count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.post(CSV, dry_run='true')
+        self.assertEqual(response.data['imported'], 2)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_skus_of_other_stores_are_rejected(self):
+        other = Store.objects.create(owner=User.objects.create_user(username='x', password='p'), name='Outra')
+        Product.objects.create(store=other, sku='CAM', name='Deles')
+        response = self.post(CSV)
+        self.assertEqual(response.data['imported'], 0)
+        self.assertEqual(Product.objects.get(sku='CAM').name, 'Deles')
+
+    def test_unreadable_files_are_reported(self):
+        for content, name in [
+            (CSV.encode('latin-1'), 'catalogo.csv'),
+            ('{"product_sku": "CAL", "product_name": "Calça"}\n'.encode('latin-1'), 'catalogo.jsonl'),
+        ]:
+            response = self.post(content, name=name)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['imported'], 0)
+            self.assertIn('UTF-8', response.data['errors'][-1]['errors'][0])
+
+        header = CSV.splitlines()[0]
+        response = self.post(f'{header}\nCAL,"{"x" * 200000}",,,,CAL-40,40,99.00,1,\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('CSV malformado', response.data['errors'][0]['errors'][0])
+
+    def test_categories_are_matched_by_slug(self):
+        existing = Category.objects.create(name='calcados')
+        header = CSV.splitlines()[0]
+        response = self.post(f'{header}\nTEN,Tênis,,,Calçados|Calçados Novos,TEN-40,40,99.00,1,\n'
+                             f'BOT,Bota,,,!!!,BOT-40,40,99.00,1,\n')
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(response.data['errors'], [{'row': 3, 'errors': ["categoria inválida: '!!!'"]}])
+        categories = Product.objects.get(sku='TEN').categories.all()
+        self.assertEqual({c.name for c in categories}, {'calcados', 'Calçados Novos'})
+        self.assertEqual(categories.get(name='calcados'), existing)
@@ -0,0 +1,114 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from sales import catalog_snapshot, inventory
+from sales.models import Category, Product, ProductVariant, Store
+
+
+@override_settings(CATALOG_SNAPSHOT=True)
+class CatalogSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_snapshot.reset()
+        self.addCleanup(catalog_snapshot.reset)
+        self.store = Store.objects.create(owner=User.objects.create_user(username='owner', password='p'),
+                                          name='Loja')
+        self.category = Category.objects.create(name='Camisetas')
+        self.products = []
+        for i in range(12):
+            product = Product.objects.create(store=self.store, name=f'P{i}')
+            ProductVariant.objects.create(product=product, sku=f'S{i}-A', price=Decimal(10 + i), stock=1)
+            ProductVariant.objects.create(product=product, sku=f'S{i}-B', price=Decimal('20.50') + i, stock=1,
+                                          is_active=i % 3 != 0)
+            if i % 2:
+                product.categories.add(self.category)
+            self.products.append(product)
+        Product.objects.create(store=self.store, name='Sem variantes', price=Decimal('7.90'))
+        Product.objects.create(store=self.store, name='Inativo', is_active=False)
+        Category.objects.create(name='Vazia')
+
+    def get(self, url):
+        response = self.client.get(url)
+        body = json.loads(response.content)
+        # SQLite returns the min_variant_price subquery untyped ('21' for 21.00)
+        for product in body.get('results', []):
+            if product['price'] is not None:
+                product['price'] = Decimal(product['price'])
+        return response.status_code, body
+
+    def test_same_responses_as_the_orm(self):
+        slug = self.category.slug
+        urls = [
+            '/api/catalog/products/', '/api/catalog/products/?page=2', '/api/catalog/products/?page=3',
+            '/api/catalog/products/?min_price=30', '/api/catalog/products/?max_price=12&min_price=22',
+            '/api/catalog/products/?min_price=abc', '/api/catalog/products/?max_price=NaN',
+            f'/api/catalog/categories/{slug}/products/', f'/api/catalog/categories/{slug}/products/?max_price=13',
+            '/api/catalog/categories/vazia/products/', '/api/catalog/categories/nada/products/',
+        ]
+        from_snapshot = [self.get(url) for url in urls]
+        with override_settings(CATALOG_SNAPSHOT=False):
+            from_orm = [self.get(url) for url in urls]
+        self.assertEqual(from_orm, from_snapshot)
+
+    def test_reads_do_not_query_once_built(self):
+        self.get('/api/catalog/products/')
+        with self.assertNumQueries(0):
+            status, body = self.get(f'/api/catalog/categories/{self.category.slug}/products/')
+        self.assertEqual((status, body['count']), (200, 6))
+
+    def test_changes_are_applied_incrementally(self):
+        self.get('/api/catalog/products/')
+        before = catalog_snapshot.current()
+
+        variant = self.products[0].variants.get(sku='S0-A')
+        variant.price = Decimal('5.00')
+        variant.save()
+        Product.objects.filter(pk=self.products[1].pk).update(is_active=False)
+        catalog_snapshot.changed([self.products[1].pk])
+        self.products[2].categories.add(self.category)
+
+        # Changed products, grouped prices, categories and memberships
+        with self.assertNumQueries(4):
+            body = self.get(f'/api/catalog/categories/{self.category.slug}/products/?max_price=10')[1]
+        self.assertEqual(body['results'], [])
+        body = self.get('/api/catalog/products/?max_price=5')[1]
+        self.assertEqual([(p['name'], p['price']) for p in body['results']], [('P0', Decimal('5.00'))])
+        self.assertEqual(self.get('/api/catalog/products/')[1]['count'], 12)
+
+        after = catalog_snapshot.current()
+        self.assertIs(after.by_id[self.products[5].pk], before.by_id[self.products[5].pk])
+        self.assertNotIn(self.products[1].pk, after.by_id)
+
+    def test_gaps_in_the_log_rebuild_everything(self):
+        before = catalog_snapshot.current()
+        inventory.bulk_update_variants(self.store, [{'sku': 'S4-A', 'price': '3.00'}])
+        cache.delete(catalog_snapshot.CHANGES_KEY.format(cache.get(catalog_snapshot.VERSION_KEY)))
+
+        after = catalog_snapshot.current()
+        self.assertIsNot(after.by_id[self.products[5].pk], before.by_id[self.products[5].pk])
+        self.assertEqual(after.by_id[self.products[4].pk].price, 300)
+
+    @override_settings(CATALOG_SNAPSHOT_MAX_AGE=10)
+    def test_incremental_builds_do_not_postpone_the_full_rebuild(self):
+        clock = mock.patch.object(catalog_snapshot.time, 'monotonic', return_value=1000.0)
+        with clock as monotonic:
+            catalog_snapshot.current()
+            for step in range(1, 4):
+                monotonic.return_value += 3
+                catalog_snapshot.changed([self.products[step].pk])
+                self.assertEqual(catalog_snapshot.current().full_built_at, 1000.0)
+            # Not logged: only the full rebuild picks it up
+            Product.objects.filter(pk=self.products[0].pk).update(name='Renomeado')
+            monotonic.return_value += 3
+            snapshot = catalog_snapshot.current()
+        self.assertEqual(snapshot.full_built_at, 1012.0)
+        self.assertEqual(snapshot.by_id[self.products[0].pk].name, 'Renomeado')
+
+    def test_records_are_compact(self):
+        record = catalog_snapshot.current().products[0]
+        self.assertFalse(hasattr(record, '__dict__'))
@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from sales.models import Product, ProductVariant, Store
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (50, 50), 'blue').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_RENDITIONS_MODE='off', USE_S3=False)
+class DirectUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        store = Store.objects.create(owner=self.owner, name='Loja')
+        self.product = Product.objects.create(store=store, name='Camisa')
+        self.variant = ProductVariant.objects.create(product=self.product, sku='C-1', price=Decimal('5.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def upload(self, content=None):
+        content = content or image_bytes()
+        ticket = self.client.post(
+            '/api/uploads/', {'content_type': 'image/png', 'size': len(content)}, format='json'
+        ).data
+        response = APIClient().post(ticket['url'], {
+            **ticket['fields'],
+            'file': SimpleUploadedFile('x.png', content, content_type='image/png'),
+        })
+        self.assertEqual(response.status_code, 204)
+        return ticket
+
+    def test_upload_and_attach_to_product(self):
+        ticket = self.upload()
+        response = self.client.post(
+            f'/api/products/{self.product.pk}/attach_image/', {'upload': ticket['upload']}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image.name, ticket['key'])
+
+    def test_attach_to_variant(self):
+        ticket = self.upload()
+        response = self.client.post(
+            f'/api/products/{self.product.pk}/variants/{self.variant.pk}/attach_image/',
+            {'upload': ticket['upload']}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.image.name, ticket['key'])
+
+    def test_ticket_rejects_wrong_type_and_size(self):
+        response = self.client.post('/api/uploads/', {'content_type': 'text/html', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, 400)
+        with self.settings(IMAGE_UPLOAD_MAX_BYTES=10):
+            response = self.client.post('/api/uploads/', {'content_type': 'image/png', 'size': 11}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_finalize_requires_uploaded_object_and_owner(self):
+        ticket = self.client.post('/api/uploads/', {'content_type': 'image/png', 'size': 10}, format='json').data
+        response = self.client.post(
+            f'/api/products/{self.product.pk}/attach_image/', {'upload': ticket['upload']}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user(username='other', password='p')
+        Store.objects.create(owner=other, name='Outra')
+        ticket = self.upload()
+        client = APIClient()
+        client.force_authenticate(other)
+        response = client.post(
+            f'/api/products/{self.product.pk}/attach_image/', {'upload': ticket['upload']}, format='json'
+        )
+        self.assertIn(response.status_code, (403, 404))
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Attribute, AttributeValue, Category, Order, OrderItem, Product, ProductVariant, Store
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        other = Store.objects.create(owner=User.objects.create_user(username='x', password='p'), name='Outra')
+
+        product = Product.objects.create(store=self.store, name='Camisa', sku='CAM')
+        product.categories.add(Category.objects.create(name='Roupas'))
+        variant = ProductVariant.objects.create(product=product, sku='CAM-P', price=Decimal('10.00'), stock=2)
+        variant.values.add(AttributeValue.objects.create(attribute=Attribute.objects.create(name='Tamanho'), value='P'))
+        bare = Product.objects.create(store=self.store, name='Caneca', sku='CAN', price=Decimal('5.00'), stock=4)
+        bare.categories.add(Category.objects.get(name='Roupas'))
+        foreign = Product.objects.create(store=other, name='Deles')
+        ProductVariant.objects.create(product=foreign, sku='X-1', price=Decimal('1.00'))
+
+        order = Order.objects.create(store=self.store, customer_name='Ana', customer_email='a@x.com', shipping_address='R')
+        OrderItem.objects.create(order=order, product=product, variant=variant, quantity=2)
+        Order.objects.create(store=other, customer_name='B', customer_email='b@x.com', shipping_address='R')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_product_csv_export_is_scoped_and_importable(self):
+        response = self.client.get('/api/products/export/')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['variant_sku'], 'CAM-P')
+        self.assertEqual(rows[0]['categories'], 'Roupas')
+        self.assertEqual(rows[0]['attributes'], 'Tamanho:P')
+        # Products without variants get a row of their own
+        self.assertEqual(
+            [rows[1][column] for column in ('product_sku', 'variant_sku', 'variant_name', 'price', 'stock')],
+            ['CAN', '', '', '5.00', '4'],
+        )
+
+    def test_product_export_round_trip(self):
+        content = self.read(self.client.get('/api/products/export/'))
+        Product.objects.filter(sku='CAN').delete()
+        upload = SimpleUploadedFile('catalogo.csv', content.encode('utf-8'))
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual((response.data['imported'], response.data['errors']), (2, []))
+
+        bare = Product.objects.get(sku='CAN')
+        self.assertEqual((bare.store, bare.price, bare.stock), (self.store, Decimal('5.00'), 4))
+        self.assertFalse(bare.variants.exists())
+        self.assertEqual(list(bare.categories.values_list('name', flat=True)), ['Roupas'])
+        self.assertEqual(Product.objects.get(sku='CAM').variants.get().sku, 'CAM-P')
+
+    def test_products_without_sku_round_trip(self):
+        mug = Product.objects.create(store=self.store, name='Xícara', price=Decimal('8.00'), stock=3)
+        shirt = Product.objects.create(store=self.store, name='Regata')
+        ProductVariant.objects.create(product=shirt, sku='REG-M', price=Decimal('15.00'), stock=1)
+        content = self.read(self.client.get('/api/products/export/'))
+
+        def reimport():
+            upload = SimpleUploadedFile('catalogo.csv', content.encode('utf-8'))
+            response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+            self.assertEqual((response.data['imported'], response.data['errors']), (4, []))
+
+        # Matched by name: updated in place, not duplicated
+        Product.objects.filter(pk=mug.pk).update(stock=0)
+        reimport()
+        self.assertEqual(Product.objects.filter(store=self.store, sku__isnull=True).count(), 2)
+        mug.refresh_from_db()
+        self.assertEqual((mug.price, mug.stock), (Decimal('8.00'), 3))
+        self.assertEqual(ProductVariant.objects.get(sku='REG-M').product, shirt)
+
+        # Created again without a SKU when missing
+        Product.objects.filter(pk=mug.pk).delete()
+        reimport()
+        mug = Product.objects.get(store=self.store, name='Xícara')
+        self.assertEqual((mug.sku, mug.price, mug.stock), (None, Decimal('8.00'), 3))
+
+    def test_order_jsonl_export(self):
+        response = self.client.get('/api/orders/export/?file_format=jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['item_count'], 1)
+        self.assertEqual(rows[0]['total_amount'], '20.00')
+
+    def test_invalid_format(self):
+        self.assertEqual(self.client.get('/api/orders/export/?file_format=xml').status_code, 400)
@@ -0,0 +1,49 @@
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core import health
+
+
+class HealthCheckTest(TestCase):
+    def setUp(self):
+        health.reset()
+        self.addCleanup(health.reset)
+
+    def test_live_does_no_io(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/live')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'alive'})
+
+    def test_ready_reports_each_dependency(self):
+        response = self.client.get('/health/ready')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertEqual(set(body['checks']), {'database', 'cache', 'storage'})
+        self.assertTrue(all(check['ok'] and 'latency_ms' in check for check in body['checks'].values()))
+        # The old endpoint answers the same way and no longer exposes settings
+        self.assertNotIn('allowed_hosts', self.client.get('/health/').json())
+
+    def test_results_are_cached(self):
+        probe = mock.Mock()
+        with mock.patch.dict(health.PROBES, {'database': probe, 'cache': probe, 'storage': probe}, clear=True):
+            self.client.get('/health/ready')
+            self.client.get('/health/ready')
+        self.assertEqual(probe.call_count, 3)
+
+    def test_failure_returns_503_without_details(self):
+        probe = mock.Mock(side_effect=ConnectionError('db.internal:5432 refused'))
+        with mock.patch.dict(health.PROBES, {'database': probe}, clear=True):
+            response = self.client.get('/health/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['database'], {'ok': False, 'error': 'ConnectionError'})
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_slow_probe_times_out(self):
+        with mock.patch.dict(health.PROBES, {'storage': lambda: time.sleep(0.3)}, clear=True):
+            response = self.client.get('/health/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['storage']['error'], 'timeout')
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from sales import images
+from sales.models import Product, ProductVariant, Store
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(width=1200, height=800):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_RENDITIONS_MODE='sync', IMAGE_RENDITION_WIDTHS=(160, 640, 2048))
+class ImageRenditionsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=owner, name='Loja')
+
+    def test_upload_generates_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(store=self.store, name='Foto', image=make_image())
+        product.refresh_from_db()
+        # 2048 is larger than the original and is skipped
+        self.assertEqual(sorted(product.image_renditions['widths']), ['160', '640'])
+
+        path = product.image_renditions['widths']['160']['webp']
+        with product.image.storage.open(path) as fh:
+            self.assertEqual(Image.open(fh).width, 160)
+
+        response = APIClient().get(f'/api/products/{product.pk}/')
+        srcset = response.data['image_srcset']
+        self.assertTrue(srcset['webp']['640'].endswith('.webp'))
+        self.assertTrue(srcset['jpeg']['160'].endswith('.jpg'))
+
+    def test_srcset_empty_until_processed(self):
+        with override_settings(IMAGE_RENDITIONS_MODE='off'):
+            product = Product.objects.create(store=self.store, name='Foto', image=make_image())
+        response = APIClient().get(f'/api/products/{product.pk}/')
+        self.assertEqual(response.data['image_srcset'], {})
+
+        call_command('process_image_renditions', stdout=StringIO())
+        product.refresh_from_db()
+        self.assertIn('160', product.image_renditions['widths'])
+
+    def test_command_picks_up_jobs_lost_by_the_pool(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            done = Product.objects.create(store=self.store, name='Pronta', image=make_image())
+        # The process restarted before the pool ran these jobs
+        with override_settings(IMAGE_RENDITIONS_MODE='thread'), mock.patch.object(images, '_submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                product = Product.objects.create(store=self.store, name='Foto', image=make_image())
+                variant = ProductVariant.objects.create(product=product, sku='F-1', price=10, image=make_image())
+        self.assertEqual(submit.call_count, 2)
+
+        with mock.patch.object(images, 'process_instance', wraps=images.process_instance) as process:
+            call_command('process_image_renditions', stdout=StringIO())
+        self.assertEqual({call.args[:2] for call in process.call_args_list},
+                         {(Product, product.pk), (ProductVariant, variant.pk)})
+        for instance in (product, variant, done):
+            instance.refresh_from_db()
+            self.assertEqual(instance.image_renditions['source'], instance.image.name)
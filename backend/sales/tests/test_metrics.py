@@ -0,0 +1,79 @@
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY, generate_latest
+from rest_framework.test import APIClient
+
+from core import metrics
+from sales import inventory
+from sales.models import Product, ProductVariant, Store
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class BusinessMetricsTest(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(owner=User.objects.create_user(username='owner', password='p'), name='Loja')
+        product = Product.objects.create(store=self.store, name='Camiseta')
+        self.variant = ProductVariant.objects.create(product=product, sku='CAM-P', price=Decimal('10.00'), stock=2)
+        self.client = APIClient()
+
+    def test_checkout_out_of_stock(self):
+        before = sample('checkout_total', result='out_of_stock')
+        response = self.client.post('/api/cart/reservations/check/', {
+            'cart_token': 'cart', 'items': [{'variant': self.variant.id, 'quantity': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(sample('checkout_total', result='out_of_stock'), before + 1)
+
+    def test_stock_out_counted_on_commit(self):
+        before = sample('stock_out_events_total', reason='adjustment')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.stock = 0
+            self.variant.save()
+        self.assertEqual(sample('stock_out_events_total', reason='adjustment'), before + 1)
+
+        # Already at zero: saving again is not a new stock-out
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.price = Decimal('12.00')
+            self.variant.save()
+        self.assertEqual(sample('stock_out_events_total', reason='adjustment'), before + 1)
+
+    def test_stock_out_from_bulk_update(self):
+        before = sample('stock_out_events_total', reason='adjustment')
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.bulk_update_variants(self.store, [{'sku': 'CAM-P', 'stock_delta': -2}])
+        self.assertEqual(sample('stock_out_events_total', reason='adjustment'), before + 1)
+
+    def test_multiprocess_scrape(self):
+        with tempfile.TemporaryDirectory() as path, mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': path}):
+            registry = metrics.scrape_registry()
+            self.assertIsNot(registry, REGISTRY)
+            generate_latest(registry)
+
+    def test_pool_stats_after_each_request(self):
+        pool = mock.Mock()
+        pool.get_stats.return_value = {'pool_min': 1, 'pool_max': 8, 'pool_size': 3, 'pool_available': 1,
+                                       'requests_waiting': 2}
+        with mock.patch.object(connections['default'], 'pool', pool, create=True):
+            self.client.get('/api/categories/')
+        self.assertEqual(
+            [sample(name, database='default') for name in (
+                'db_pool_connections', 'db_pool_available_connections', 'db_pool_waiting_requests',
+                'db_pool_max_connections',
+            )],
+            [3, 1, 2, 8],
+        )
+
+    @override_settings(METRICS_TOKEN='segredo')
+    def test_scrape_requires_the_token(self):
+        for header in ('', 'Bearer errado', 'Bearer segrédo'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION=header).status_code, 403, header)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sales import analytics, archive
+from sales.models import (
+    ArchivedOrder, Order, OrderItem, OrderStatusUpdate, Product, ProductVariant, PurchasedProduct, Store,
+    StoreDailySales,
+)
+
+
+class OrderArchiveTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        product = Product.objects.create(store=self.store, name='Camisa')
+        variant = ProductVariant.objects.create(product=product, sku='CAM', price=Decimal('10.00'), stock=5)
+
+        self.orders = []
+        for status in ('delivered', 'cancelled', 'processing'):
+            order = Order.objects.create(store=self.store, customer_name=status, customer_email='c@example.com',
+                                         shipping_address='Rua 1', payment_method='cod')
+            OrderItem.objects.create(order=order, product=product, variant=variant, quantity=2)
+            order.mark_cod_paid()
+            order.set_status('processing')
+            if status == 'delivered':
+                order.set_status('out_for_delivery')
+            if status != 'processing':
+                order.set_status(status)
+            self.orders.append(order)
+        self.delivered, self.cancelled, self.open = self.orders
+        self.cutoff = timezone.now() + timedelta(seconds=1)
+
+    def test_archives_final_orders_only(self):
+        rollup = StoreDailySales.objects.values('orders', 'revenue', 'cancelled_orders').get()
+        self.assertEqual(archive.archive_orders(self.cutoff, batch_size=1), 2)
+
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [self.open.id])
+        self.assertFalse(OrderItem.objects.exclude(order=self.open).exists())
+        self.assertFalse(OrderStatusUpdate.objects.exclude(order=self.open).exists())
+        archived = ArchivedOrder.objects.get(pk=self.delivered.pk)
+        self.assertEqual((archived.item_count, archived.items[0]['product_name']), (1, 'Camisa'))
+        self.assertEqual(archived.status_updates[0]['status'], 'delivered')
+        self.assertTrue(PurchasedProduct.objects.filter(email='c@example.com').exists())
+        # History still counts in the rollups, also after a rebuild
+        self.assertEqual(StoreDailySales.objects.values('orders', 'revenue', 'cancelled_orders').get(), rollup)
+        analytics.rebuild()
+        self.assertEqual(StoreDailySales.objects.values('orders', 'revenue', 'cancelled_orders').get(), rollup)
+
+    def test_retrieve_and_export_read_through(self):
+        call_command('archive_orders', months=1, stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 0)
+        archive.archive_orders(self.cutoff)
+
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get(f'/api/orders/{self.delivered.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'][0]['quantity'], 2)
+        self.assertEqual(client.get('/api/orders/abc/').status_code, 404)
+
+        other = User.objects.create_user(username='other', password='p')
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f'/api/orders/{self.delivered.pk}/').status_code, 404)
+
+        client.force_authenticate(self.owner)
+        response = client.get('/api/orders/export/', {'file_format': 'csv'})
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(body.strip().splitlines()), 4)
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from sales.models import Order, OrderItem, Product, ProductVariant, Store
+
+
+class OrderListTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        product = Product.objects.create(store=self.store, name='Camisa')
+        variant = ProductVariant.objects.create(product=product, sku='CAM', price=Decimal('10.00'), stock=20)
+        for i in range(5):
+            order = Order.objects.create(store=self.store, customer_name=f'C{i}', customer_email='c@example.com',
+                                         shipping_address='Rua 1', payment_method='cod')
+            for _ in range(i + 1):
+                OrderItem.objects.create(order=order, product=product, variant=variant, quantity=1)
+        self.last = order
+        self.last.set_status('processing', note='separando')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_list_is_compact_and_single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        # store lookup + COUNT + the page itself
+        self.assertLessEqual(len(queries), 3)
+        first = response.data['results'][0]
+        self.assertNotIn('items', first)
+        self.assertEqual((first['id'], first['item_count'], first['last_status']), (self.last.id, 5, 'processing'))
+
+    def test_filters(self):
+        response = self.client.get('/api/orders/', {'status': 'processing,delivered'})
+        self.assertEqual([o['id'] for o in response.data['results']], [self.last.id])
+        self.assertEqual(self.client.get('/api/orders/', {'payment_status': 'paid'}).data['count'], 0)
+        self.assertEqual(self.client.get('/api/orders/', {'created_from': '2000-01-01'}).data['count'], 5)
+        self.assertEqual(self.client.get('/api/orders/', {'created_to': '2000-01-01'}).data['count'], 0)
+        self.assertEqual(self.client.get('/api/orders/', {'created_to': 'x'}).status_code, 400)
+
+    def test_retrieve_keeps_nested_detail(self):
+        response = self.client.get(f'/api/orders/{self.last.id}/')
+        self.assertEqual(len(response.data['items']), 5)
+        self.assertEqual(response.data['items'][0]['product_name'], 'Camisa')
+        self.assertEqual(len(response.data['status_updates']), 1)
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import (
+    InsufficientStockError, Order, OrderConflictError, OrderItem, OrderStatusUpdate, OrderTransitionError, Product, ProductVariant,
+    StockMovement, Store, StoreDailySales,
+)
+
+
+class OrderStatusTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        product = Product.objects.create(store=self.store, name='Camisa')
+        self.variant = ProductVariant.objects.create(product=product, sku='CAM', price=Decimal('10.00'), stock=5)
+        self.order = Order.objects.create(store=self.store, customer_name='C', customer_email='c@example.com',
+                                          shipping_address='Rua 1', payment_method='cod')
+        OrderItem.objects.create(order=self.order, product=product, variant=self.variant, quantity=2)
+
+    def test_transitions(self):
+        self.order.set_status('processing')
+        self.order.set_status('processing')
+        self.assertEqual(OrderStatusUpdate.objects.count(), 1)
+        with self.assertRaises(OrderTransitionError):
+            self.order.set_status('delivered')
+        with self.assertRaises(OrderTransitionError):
+            self.order.set_status('bogus')
+        self.order.set_status('out_for_delivery')
+        with self.assertRaises(OrderTransitionError):
+            self.order.set_status('cancelled')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'out_for_delivery')
+
+    def test_stale_instance_conflicts(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.set_status('processing')
+        with self.assertRaises(OrderConflictError):
+            stale.set_status('cancelled')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'processing')
+
+    def test_order_lines_take_stock(self):
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 3)
+        self.assertEqual(StockMovement.objects.filter(order=self.order, reason=StockMovement.ORDER).get().delta, -2)
+        with self.assertRaisesMessage(InsufficientStockError, 'Estoque insuficiente (3)'):
+            OrderItem.objects.create(order=self.order, product=self.variant.product, variant=self.variant, quantity=4)
+        self.assertEqual(self.order.items.count(), 1)
+
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post(f'/api/orders/{self.order.pk}/items/', {
+            'order': self.order.pk, 'product': self.variant.product_id, 'variant': self.variant.pk, 'quantity': 4,
+            'unit_price': '10.00',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Estoque insuficiente', str(response.data))
+
+    def test_cancel_restocks_what_the_order_took(self):
+        self.order.set_status('cancelled')
+
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 5)
+        self.assertEqual(StockMovement.objects.filter(order=self.order, reason=StockMovement.RETURN).get().delta, 2)
+        self.assertEqual(StoreDailySales.objects.get(store=self.store).cancelled_orders, 1)
+
+    def test_mark_cod_paid_is_conditional(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        self.assertTrue(self.order.mark_cod_paid())
+        self.assertFalse(stale.mark_cod_paid())
+        self.assertEqual(StoreDailySales.objects.get(store=self.store).paid_orders, 1)
+
+    def test_set_status_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/orders/{self.order.pk}/set_status/'
+        self.assertEqual(client.post(url, {'status': 'delivered'}).status_code, 400)
+        self.assertEqual(client.post(url, {'status': 'processing'}).data['status'], 'processing')
+        # status is not writable through PATCH
+        client.patch(f'/api/orders/{self.order.pk}/', {'status': 'pending'})
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'processing')
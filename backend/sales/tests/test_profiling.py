@@ -0,0 +1,73 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import profiling
+from sales.models import Product, ProductVariant, Store
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        store = Store.objects.create(owner=User.objects.create_user(username='owner', password='p'), name='Loja')
+        product = Product.objects.create(store=store, name='Camiseta')
+        ProductVariant.objects.create(product=product, sku='CAM-P', price=Decimal('10.00'), stock=1)
+        self.staff = User.objects.create_user(username='staff', password='p', is_staff=True)
+        self.client = APIClient()
+        profiling.buffer.clear()
+        self.addCleanup(profiling.buffer.clear)
+
+    def test_header_profiles_staff_requests_only(self):
+        self.client.get('/api/products/', HTTP_X_PROFILE='1')
+        self.assertEqual(profiling.buffer.slowest(), [])
+
+        self.client.force_authenticate(self.staff)
+        self.client.get('/api/products/', HTTP_X_PROFILE='1')
+        self.client.get('/api/products/')
+        profiles = profiling.buffer.slowest()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['view'], 'product-list')
+        self.assertEqual(profiles[0]['trigger'], 'header')
+        self.assertGreater(profiles[0]['phases_ms']['orm'], 0)
+        self.assertTrue(profiles[0]['functions'])
+
+    def test_header_does_not_profile_other_users(self):
+        owner = User.objects.get(username='owner')
+        with mock.patch('cProfile.Profile.enable') as enable:
+            self.client.get('/api/products/', HTTP_X_PROFILE='1')
+            self.client.get('/api/products/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION='Bearer invalido')
+            self.client.force_authenticate(owner)
+            self.client.get('/api/products/', HTTP_X_PROFILE='1')
+        enable.assert_not_called()
+
+    def test_header_accepts_jwt_staff(self):
+        token = AccessToken.for_user(self.staff)
+        self.client.get('/api/products/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual([p['trigger'] for p in profiling.buffer.slowest()], ['header'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling_only_matching_views(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/categories/')
+        self.assertEqual([p['view'] for p in profiling.buffer.slowest()], ['product-list'])
+
+    def test_buffer_keeps_slowest(self):
+        buffer = profiling.ProfileBuffer(2)
+        for duration in (5, 1, 9, 3):
+            buffer.add({'duration_ms': duration})
+        self.assertEqual([p['duration_ms'] for p in buffer.slowest()], [9, 5])
+
+    def test_endpoint_is_admin_only(self):
+        self.client.force_authenticate(User.objects.get(username='owner'))
+        self.assertEqual(self.client.get('/debug/profiles').status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        self.client.get('/api/products/', HTTP_X_PROFILE='1')
+        response = self.client.get('/debug/profiles')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['profiles']), 1)
+        self.assertEqual(self.client.delete('/debug/profiles').status_code, 204)
+        self.assertEqual(profiling.buffer.slowest(), [])
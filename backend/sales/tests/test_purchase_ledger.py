@@ -0,0 +1,69 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Order, OrderItem, Product, ProductVariant, PurchasedProduct, Review, Store
+
+
+class PurchaseLedgerTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=owner, name='Loja')
+        self.product = Product.objects.create(store=self.store, name='Camisa')
+        self.variant = ProductVariant.objects.create(product=self.product, sku='CAM-1', price=Decimal('10.00'), stock=5)
+        self.customer = User.objects.create_user(username='cliente', email='Cliente@Example.com', password='p')
+        self.order = Order.objects.create(
+            store=self.store, customer_name='Cliente', customer_email='cliente@example.com',
+            shipping_address='Rua 1', payment_method='cod'
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, variant=self.variant, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_mark_cod_paid_fills_ledger(self):
+        self.assertFalse(PurchasedProduct.has_purchased(self.customer, self.product))
+        self.order.mark_cod_paid()
+        self.assertTrue(PurchasedProduct.has_purchased(self.customer, self.product))
+
+    def test_payment_status_change_on_loaded_order(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.payment_status = 'paid'
+        order.save()
+        self.assertEqual(PurchasedProduct.objects.filter(email='cliente@example.com').count(), 1)
+
+    def test_verified_purchase_on_review(self):
+        self.order.mark_cod_paid()
+        response = self.client.post(
+            f'/api/products/{self.product.pk}/reviews/',
+            {'product': self.product.pk, 'rating': 5, 'comment': 'Ótimo'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Review.objects.get(user=self.customer).is_verified_purchase)
+
+    def test_buy_again(self):
+        self.order.mark_cod_paid()
+        response = self.client.get('/api/products/buy_again/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.product.pk])
+
+    def test_rebuild_command(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status='paid')
+        call_command('rebuild_purchase_ledger', stdout=StringIO())
+        self.assertTrue(PurchasedProduct.has_purchased(self.customer, self.product))
+
+    def test_items_added_to_a_paid_order_upsert_only_their_product(self):
+        self.order.mark_cod_paid()
+        other = Product.objects.create(store=self.store, name='Boné')
+        variant = ProductVariant.objects.create(product=other, sku='BON-1', price=Decimal('5.00'), stock=5)
+        with mock.patch.object(PurchasedProduct, 'record_order', wraps=PurchasedProduct.record_order) as record:
+            OrderItem.objects.create(order=self.order, product=other, variant=variant, quantity=1)
+        record.assert_called_once_with(self.order, product_ids=[other.pk])
+        self.assertEqual(
+            set(PurchasedProduct.objects.values_list('product_id', flat=True)), {self.product.pk, other.pk}
+        )
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Product, ProductRatingSummary, Review, Store
+
+
+class RatingSummaryTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='p')
+        store = Store.objects.create(owner=owner, name='Loja')
+        self.product = Product.objects.create(store=store, name='Camisa')
+        self.other = Product.objects.create(store=store, name='Calça')
+        self.users = [User.objects.create_user(username=f'u{i}', password='p') for i in range(3)]
+
+    def summary(self, product=None):
+        return ProductRatingSummary.objects.get(product=product or self.product)
+
+    def test_only_approved_reviews_are_counted(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=5, is_approved=True)
+        Review.objects.create(product=self.product, user=self.users[1], rating=1)
+        self.assertEqual(self.summary().distribution, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+        self.assertEqual(self.product.average_rating, 5.0)
+
+    def test_approve_edit_and_delete(self):
+        review = Review.objects.create(product=self.product, user=self.users[0], rating=4)
+        review.is_approved = True
+        review.save()
+        self.assertEqual(self.summary().rating_4, 1)
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 2
+        review.save()
+        summary = self.summary()
+        self.assertEqual((summary.rating_4, summary.rating_2, summary.rating_sum), (0, 1, 2))
+
+        review.product = self.other
+        review.save()
+        self.assertEqual(self.summary().count, 0)
+        self.assertEqual(self.summary(self.other).rating_2, 1)
+
+        Review.objects.get(pk=review.pk).delete()
+        self.assertEqual(self.summary(self.other).count, 0)
+
+    def test_summary_endpoint(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=5, is_approved=True)
+        Review.objects.create(product=self.product, user=self.users[1], rating=4, is_approved=True)
+        response = APIClient().get(f'/api/products/{self.product.pk}/reviews/summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['review_count'], 2)
+        self.assertEqual(response.data['average_rating'], 4.5)
+        self.assertEqual(response.data['distribution'][5], 1)
+
+    def test_summary_of_invalid_product_is_not_found(self):
+        client = APIClient()
+        for url in ('/api/products/abc/reviews/summary/', '/api/products/abc/reviews/',
+                    '/api/products/999999/reviews/summary/'):
+            self.assertEqual(client.get(url).status_code, 404, url)
+
+    def test_rebuild_command_fixes_drift(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=3, is_approved=True)
+        ProductRatingSummary.objects.filter(product=self.product).update(rating_3=10, rating_sum=30)
+        call_command('rebuild_rating_summaries', '--batch-size=1', stdout=StringIO())
+        self.assertEqual(self.summary().rating_3, 1)
+        self.assertEqual(self.summary(self.other).count, 0)
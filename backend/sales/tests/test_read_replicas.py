@@ -0,0 +1,136 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from core import replicas
+from sales import analytics, store_cache
+from core.replicas import ReplicaMiddleware, ReplicaRouter
+from sales.models import Product, ProductDailySales, ProductVariant, Store, StoreDailySales
+
+
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user = User.objects.create_user(username='cliente', password='p')
+
+    def route(self, method, path, user=None, status=200, write=False):
+        """Aliases chosen for a read of a sales model, then of an auth model"""
+        seen = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Product)
+            seen.append(self.router.db_for_read(Product))
+            seen.append(self.router.db_for_read(User))
+            return HttpResponse(status=status)
+
+        request = RequestFactory().generic(method, path)
+        request.resolver_match = resolve(path)
+        request.user = user or AnonymousUser()
+        ReplicaMiddleware(view)(request)
+        return seen
+
+    def test_safe_reads_of_listed_views_use_the_replica(self):
+        self.assertEqual(self.route('GET', '/api/products/'), ['replica', None])
+        self.assertEqual(self.route('GET', '/api/catalog/products/', self.user), ['replica', None])
+        self.assertEqual(self.route('GET', '/api/orders/', self.user), [None, None])
+        self.assertEqual(self.route('POST', '/api/products/', self.user, status=400), [None, None])
+        # Outside a request everything stays on the primary
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_reads_after_a_write_use_the_primary(self):
+        self.assertEqual(self.route('GET', '/api/products/', self.user, write=True), [None, None])
+        self.assertTrue(replicas.is_pinned(self.user.pk))
+
+    def test_user_is_pinned_after_a_successful_write(self):
+        self.route('POST', '/api/orders/', self.user, status=400)
+        self.assertEqual(self.route('GET', '/api/products/', self.user), ['replica', None])
+
+        self.route('POST', '/api/orders/', self.user, status=201)
+        self.assertEqual(self.route('GET', '/api/products/', self.user), [None, None])
+        # Other users are not affected
+        self.assertEqual(self.route('GET', '/api/products/'), ['replica', None])
+
+        cache.delete(replicas.PIN_KEY.format(self.user.pk))
+        self.assertEqual(self.route('GET', '/api/products/', self.user), ['replica', None])
+
+    def test_migrations_only_run_on_the_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'sales'))
+        self.assertFalse(self.router.allow_migrate('replica', 'sales'))
+
+
+# The replica alias points at the primary: the tests check the routing decisions
+@override_settings(
+    DATABASE_ROUTERS=['core.replicas.ReplicaRouter'],
+    REPLICA_DATABASE='default',
+    MIDDLEWARE=settings.MIDDLEWARE[:-1] + ['core.replicas.ReplicaMiddleware'] + settings.MIDDLEWARE[-1:],
+)
+class ReplicaRequestsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='p')
+        store = Store.objects.create(owner=self.owner, name='Loja')
+        self.product = Product.objects.create(store=store, name='Camiseta')
+        ProductVariant.objects.create(product=self.product, sku='CAM-P', price=Decimal('10.00'), stock=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get(self, path, models=None):
+        """Response and the aliases the router chose for sales models (or these)"""
+        routed = []
+        original = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            if (model in models) if models else model._meta.app_label == 'sales':
+                routed.append(alias)
+            return alias
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            response = self.client.get(path)
+        return response, set(routed)
+
+    def test_owner_reads_their_own_write(self):
+        response, routed = self.get(f'/api/products/{self.product.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(routed, {'default'})
+
+        response = self.client.patch(f'/api/products/{self.product.pk}/', {'name': 'Camiseta lisa'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response, routed = self.get(f'/api/products/{self.product.pk}/')
+        self.assertEqual(response.data['name'], 'Camiseta lisa')
+        self.assertEqual(routed, {None})
+
+        # Other users still read from the replica
+        self.client = APIClient()
+        response, routed = self.get('/api/catalog/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(routed, {'default'})
+
+    def test_store_cache_is_filled_from_the_primary(self):
+        self.assertEqual(self.get('/api/products/')[0].status_code, 200)
+        # A write the owner didn't make (no pin) invalidates their cached list
+        # before the replica has it: anything read there would be cached stale
+        Product.objects.filter(pk=self.product.pk).update(name='Camiseta lisa')
+        store_cache.invalidate(self.product.store_id)
+        self.assertFalse(replicas.is_pinned(self.owner.pk))
+
+        response, routed = self.get('/api/products/')
+        self.assertEqual(response.data['results'][0]['name'], 'Camiseta lisa')
+        self.assertNotIn('default', routed)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/products/').data['results'][0]['name'], 'Camiseta lisa')
+
+        analytics.rebuild(store_ids=[self.product.store_id])
+        response, routed = self.get('/api/stores/my_store/analytics/', models=[StoreDailySales, ProductDailySales])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(routed, {None})
@@ -0,0 +1,45 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from sales.models import Product, ProductVariant, Store
+
+
+class RequestInstrumentationTest(TestCase):
+    def setUp(self):
+        store = Store.objects.create(owner=User.objects.create_user(username='owner', password='p'), name='Loja')
+        for i in range(3):
+            product = Product.objects.create(store=store, name=f'P{i}')
+            ProductVariant.objects.create(product=product, sku=f'S{i}', price=Decimal('10.00'), stock=1)
+        self.client = APIClient()
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('core.requests', level='INFO') as logs:
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertIn('queries"', timing)
+        self.assertIn('render;dur=', timing)
+
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry['view'], 'product-list')
+        self.assertGreater(entry['queries'], 0)
+        self.assertEqual(entry['response_bytes'], len(response.content))
+
+    @override_settings(DUPLICATE_QUERY_THRESHOLD=1, METRICS_TOKEN='secret')
+    def test_duplicates_and_metrics_endpoint(self):
+        # Each product's variants are loaded separately on the list (one statement repeated)
+        with self.assertLogs('core.requests', level='INFO') as logs:
+            self.client.get('/api/products/')
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(entry['duplicate_queries'], 0)
+        self.assertEqual(logs.records[-1].levelname, 'WARNING')
+
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        body = response.content.decode()
+        self.assertIn('http_request_queries_bucket{le="1.0",view="product-list"}', body)
+        self.assertIn('http_requests_total{method="GET",status="200",view="product-list"}', body)
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Product, ProductRatingSummary, Review, Store
+
+
+class ReviewModerationTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='p')
+        store = Store.objects.create(owner=owner, name='Loja')
+        self.products = [Product.objects.create(store=store, name=f'P{i}') for i in range(2)]
+        self.users = [User.objects.create_user(username=f'u{i}', password='p') for i in range(5)]
+        self.reviews = [
+            Review.objects.create(product=self.products[i % 2], user=user, rating=i + 1)
+            for i, user in enumerate(self.users)
+        ]
+        self.staff = User.objects.create_user(username='staff', password='p', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_bulk_approve_rebuilds_summaries(self):
+        ids = [r.pk for r in self.reviews]
+        response = self.client.post('/api/reviews/moderation/approve/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 5)
+        # products[0] received ratings 1, 3 and 5
+        summary = ProductRatingSummary.objects.get(product=self.products[0])
+        self.assertEqual((summary.count, summary.rating_sum), (3, 9))
+        self.assertFalse(Review.objects.pending().exists())
+
+    def test_bulk_reject_removes_from_summary(self):
+        Review.objects.all().moderate(approve=True)
+        Review.objects.filter(product=self.products[1]).moderate(approve=False)
+        self.assertEqual(ProductRatingSummary.objects.get(product=self.products[1]).count, 0)
+        self.assertEqual(ProductRatingSummary.objects.get(product=self.products[0]).count, 3)
+
+    def test_pending_queue_keyset_pagination(self):
+        Review.objects.filter(pk=self.reviews[0].pk).moderate(approve=False)
+        response = self.client.get('/api/reviews/moderation/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.data['results']], [r.pk for r in self.reviews[1:3]])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['id'] for r in response.data['results']], [r.pk for r in self.reviews[3:]])
+
+    def test_requires_staff(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.post('/api/reviews/moderation/approve/', {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from io import StringIO
+from rest_framework.test import APIClient
+
+from sales.models import Order, OrderItem, Product, ProductDailySales, ProductVariant, Store, StoreDailySales
+
+
+class SalesAnalyticsTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        self.shirt = Product.objects.create(store=self.store, name='Camisa')
+        self.cap = Product.objects.create(store=self.store, name='Boné')
+        self.shirt_variant = ProductVariant.objects.create(product=self.shirt, sku='CAM', price=Decimal('10.00'),
+                                                           stock=100)
+        self.cap_variant = ProductVariant.objects.create(product=self.cap, sku='BON', price=Decimal('25.00'), stock=100)
+        self.today = timezone.localdate()
+
+    def order(self, *lines):
+        order = Order.objects.create(store=self.store, customer_name='C', customer_email='c@example.com',
+                                     shipping_address='Rua 1')
+        for variant, quantity in lines:
+            OrderItem.objects.create(order=order, product=variant.product, variant=variant, quantity=quantity)
+        return order
+
+    def rollups(self):
+        day = StoreDailySales.objects.values('orders', 'revenue', 'paid_orders', 'paid_revenue',
+                                             'cancelled_orders').get(store=self.store, date=self.today)
+        products = dict(ProductDailySales.objects.exclude(quantity=0).values_list('product__name', 'quantity'))
+        return day, products
+
+    def test_incremental_rollups(self):
+        first = self.order((self.shirt_variant, 2), (self.cap_variant, 1))
+        self.order((self.shirt_variant, 1)).mark_cod_paid()
+
+        day, products = self.rollups()
+        self.assertEqual((day['orders'], day['revenue'], day['paid_orders'], day['paid_revenue']),
+                         (2, Decimal('55.00'), 1, Decimal('10.00')))
+        self.assertEqual(products, {'Camisa': 3, 'Boné': 1})
+
+        item = first.items.get(product=self.cap)
+        item.quantity = 3
+        item.save()
+        Order.objects.get(pk=first.pk).set_status('cancelled')
+
+        day, products = self.rollups()
+        self.assertEqual((day['orders'], day['revenue'], day['cancelled_orders']), (1, Decimal('10.00'), 1))
+        self.assertEqual(products, {'Camisa': 1})
+
+    def test_rebuild_matches_incremental(self):
+        self.order((self.shirt_variant, 2)).mark_cod_paid()
+        self.order((self.cap_variant, 1)).set_status('cancelled')
+        expected = self.rollups()
+        StoreDailySales.objects.update(orders=99)
+        ProductDailySales.objects.all().delete()
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), expected)
+
+    def test_analytics_endpoint(self):
+        self.order((self.shirt_variant, 2), (self.cap_variant, 1))
+        self.order((self.shirt_variant, 1))
+        client = APIClient()
+        client.force_authenticate(self.owner)
+
+        response = client.get('/api/stores/my_store/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['days']), 30)
+        self.assertEqual(response.data['totals']['orders'], 2)
+        self.assertEqual(response.data['totals']['average_order_value'], Decimal('27.50'))
+        self.assertEqual([p['name'] for p in response.data['top_products']], ['Camisa', 'Boné'])
+
+        self.assertEqual(client.get('/api/stores/my_store/analytics/', {'from': '2024-02-30'}).status_code, 400)
+        self.assertEqual(client.get('/api/stores/my_store/analytics/',
+                                    {'from': '2020-01-01', 'to': '2024-01-01'}).status_code, 400)
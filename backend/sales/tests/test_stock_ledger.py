@@ -0,0 +1,90 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sales import inventory
+from sales.catalog_import import CatalogImporter, read_rows
+from sales.models import Product, ProductVariant, StockMovement, StockSnapshot, Store
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        self.product = Product.objects.create(store=self.store, name='Camisa')
+        self.variant = ProductVariant.objects.create(product=self.product, sku='V1', price=Decimal('10.00'), stock=5)
+
+    def ledger(self, at=None):
+        return inventory.stock_at([self.variant.pk], at=at)[self.variant.pk]
+
+    def test_saves_record_movements(self):
+        variant = ProductVariant.objects.get(pk=self.variant.pk)
+        variant.stock = 8
+        variant.save()
+        variant.price = Decimal('11.00')
+        variant.save()
+        variant.stock = 6
+        variant.save(movement_reason=StockMovement.RETURN, movement_note='devolução')
+
+        deltas = list(StockMovement.objects.order_by('id').values_list('delta', 'reason'))
+        self.assertEqual(deltas, [(5, 'adjustment'), (3, 'adjustment'), (-2, 'return')])
+        self.assertEqual(self.ledger(), 6)
+        self.assertFalse(inventory.stock_drift().exists())
+
+    def test_deferred_and_stale_saves_keep_the_ledger_exact(self):
+        deferred = ProductVariant.objects.defer('stock').get(pk=self.variant.pk)
+        deferred.price = Decimal('12.00')
+        deferred.save()
+        first, stale = ProductVariant.objects.get(pk=self.variant.pk), ProductVariant.objects.get(pk=self.variant.pk)
+        first.stock = 8
+        first.save()
+        stale.stock = 4
+        stale.save()
+
+        deltas = list(StockMovement.objects.order_by('id').values_list('delta', flat=True))
+        self.assertEqual(deltas, [5, 3, -4])
+        self.assertEqual(self.ledger(), 4)
+        self.assertFalse(inventory.stock_drift().exists())
+
+    def test_bulk_update_and_import_record_movements(self):
+        inventory.bulk_update_variants(self.store, [{'sku': 'V1', 'stock_delta': -3}])
+        data = b'product_sku,product_name,variant_sku,price,stock\nP1,Camisa,V1,10.00,7\nP1,Camisa,V2,10.00,4\n'
+        CatalogImporter(self.store).run(read_rows(BytesIO(data), 'csv'))
+
+        reasons = list(StockMovement.objects.order_by('id').values_list('variant__sku', 'delta', 'reason'))
+        self.assertEqual(reasons[1:], [('V1', -3, 'adjustment'), ('V1', 5, 'import'), ('V2', 4, 'import')])
+        self.assertFalse(inventory.stock_drift().exists())
+
+    def test_snapshots_bound_the_tail_and_support_point_in_time(self):
+        past = timezone.now() - timedelta(hours=1)
+        StockMovement.objects.update(created_at=past - timedelta(hours=1))
+        self.assertEqual(inventory.take_stock_snapshots(), 1)
+        snapshot = StockSnapshot.objects.get()
+        self.assertEqual(snapshot.stock, 5)
+
+        self.variant.stock = 2
+        self.variant.save()
+        # Nothing settled since the last snapshot
+        self.assertEqual(inventory.take_stock_snapshots(), 0)
+        self.assertEqual(self.ledger(), 2)
+        self.assertEqual(self.ledger(at=past), 5)
+        self.assertEqual(self.ledger(at=past - timedelta(days=1)), 0)
+
+    def test_drift_is_reported(self):
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=9)
+        self.assertEqual(list(inventory.stock_drift().values_list('sku', 'ledger_stock')), [('V1', 5)])
+
+    def test_stock_history_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/products/{self.product.pk}/variants/{self.variant.pk}/stock_history/'
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ledger_stock'], 5)
+        self.assertEqual(len(response.data['movements']), 1)
+        self.assertEqual(client.get(url, {'at': 'nope'}).status_code, 400)
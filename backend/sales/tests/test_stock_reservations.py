@@ -0,0 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sales import inventory
+from sales.models import Product, ProductVariant, StockReservation, Store
+
+
+class StockReservationTest(TestCase):
+    def setUp(self):
+        store = Store.objects.create(owner=User.objects.create_user(username='owner', password='p'), name='Loja')
+        product = Product.objects.create(store=store, name='Camisa')
+        self.variant = ProductVariant.objects.create(product=product, sku='V1', price=Decimal('10.00'), stock=5)
+        self.client = APIClient()
+
+    def sync(self, quantity, token=None):
+        return self.client.post('/api/cart/reservations/sync/', {
+            'cart_token': token, 'items': [{'variant': self.variant.id, 'quantity': quantity}],
+        }, format='json')
+
+    def test_reservations_limit_other_carts(self):
+        first = self.sync(4)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.data['complete'])
+        token = first.data['cart_token']
+
+        second = self.sync(3)
+        self.assertFalse(second.data['complete'])
+        self.assertEqual(second.data['items'][0]['reserved'], 1)
+
+        # Re-syncing the first cart keeps its own hold and updates the quantity
+        self.assertTrue(self.sync(2, token).data['complete'])
+        self.assertEqual(StockReservation.objects.get(cart_token=token).quantity, 2)
+        annotated = ProductVariant.objects.with_available_stock().get(pk=self.variant.pk)
+        self.assertEqual((annotated.reserved_stock, annotated.available_stock), (3, 2))
+
+    def test_check_returns_conflict_on_shortage(self):
+        self.sync(5)
+        response = self.client.post('/api/cart/reservations/check/', {
+            'cart_token': 'other', 'items': [{'variant': self.variant.id, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'][0]['available'], 0)
+
+    def test_removed_lines_and_release(self):
+        token = self.sync(2).data['cart_token']
+        self.client.post('/api/cart/reservations/sync/', {'cart_token': token, 'items': []}, format='json')
+        self.assertFalse(StockReservation.objects.exists())
+        self.sync(1, token)
+        response = self.client.post('/api/cart/reservations/release/', {'cart_token': token}, format='json')
+        self.assertEqual(response.data['released'], 1)
+
+    def test_expired_reservations_are_ignored_and_swept(self):
+        token = self.sync(5).data['cart_token']
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(self.sync(5).data['complete'])
+        self.assertEqual(inventory.release_expired_reservations(batch_size=1), 1)
+        self.assertFalse(StockReservation.objects.filter(cart_token=token).exists())
+
+    def test_invalid_items(self):
+        response = self.client.post('/api/cart/reservations/sync/', {'items': [{'variant': 'x'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from sales import analytics, inventory, store_cache
+from sales.models import Order, OrderItem, Product, ProductVariant, Store
+
+
+class StoreCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        self.product = Product.objects.create(store=self.store, name='Camiseta')
+        self.variant = ProductVariant.objects.create(product=self.product, sku='CAM-P', price=Decimal('10.00'),
+                                                     stock=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        other = User.objects.create_user(username='outro', password='p')
+        self.other_store = Store.objects.create(owner=other, name='Outra')
+        Product.objects.create(store=self.other_store, name='Caneca')
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(other)
+
+    def names(self, client=None):
+        response = (client or self.client).get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        return [p['name'] for p in response.data['results']]
+
+    def test_owner_list_is_cached_per_store(self):
+        self.assertEqual(self.names(), ['Camiseta'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), ['Camiseta'])
+        self.assertEqual(self.names(self.other_client), ['Caneca'])
+        # Anonymous users are not served from the store cache
+        self.assertEqual(sorted(self.names(APIClient())), ['Camiseta', 'Caneca'])
+
+    def test_writes_invalidate_the_store(self):
+        self.names()
+        version = store_cache.version(self.store.pk)
+        response = self.client.patch(f'/api/products/{self.product.pk}/', {'name': 'Camiseta lisa'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(store_cache.version(self.store.pk), version)
+        self.assertEqual(self.names(), ['Camiseta lisa'])
+
+        # Bulk paths without signals invalidate too
+        inventory.bulk_update_variants(self.store, [{'sku': 'CAM-P', 'price': '12.50'}])
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['results'][0]['variants'][0]['price'], '12.50')
+
+    def test_other_stores_keep_their_entries(self):
+        self.names(self.other_client)
+        other_version = store_cache.version(self.other_store.pk)
+        Product.objects.create(store=self.store, name='Boné')
+        self.assertEqual(store_cache.version(self.other_store.pk), other_version)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(self.other_client), ['Caneca'])
+
+    def test_orders_and_analytics(self):
+        self.assertEqual(self.client.get('/api/orders/').data['count'], 0)
+        today = self.client.get('/api/stores/my_store/analytics/').data['totals']['orders']
+
+        order = Order.objects.create(store=self.store, customer_name='C', customer_email='c@example.com',
+                                     shipping_address='Rua 1', payment_method='cod')
+        OrderItem.objects.create(order=order, product=self.product, variant=self.variant, quantity=1)
+        self.assertEqual(self.client.get('/api/orders/').data['count'], 1)
+        self.assertEqual(self.client.get('/api/stores/my_store/analytics/').data['totals']['orders'], today + 1)
+
+        versions = [store_cache.version(self.store.pk)]
+        with self.captureOnCommitCallbacks(execute=True):
+            analytics.rebuild(store_ids=[self.store.pk])
+            versions.append(store_cache.version(self.store.pk))
+        versions.append(store_cache.version(self.store.pk))
+        # Bumped inside the transaction and again on commit
+        self.assertEqual(len(set(versions)), 3)
+
+    def test_lost_version_never_reuses_an_old_one(self):
+        self.names()
+        cache.delete(store_cache.VERSION_KEY.format(self.store.pk))
+        Product.objects.filter(pk=self.product.pk).update(name='Sem sinal')
+        self.assertEqual(self.names(), ['Sem sinal'])
+
+    @override_settings(STORE_CACHE_TIMEOUT=0)
+    def test_can_be_disabled(self):
+        self.names()
+        Product.objects.filter(pk=self.product.pk).update(name='Sem sinal')
+        self.assertEqual(self.names(), ['Sem sinal'])
@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Product, ProductVariant, Store
+
+
+class VariantBulkUpdateTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        store = Store.objects.create(owner=self.owner, name='Loja')
+        product = Product.objects.create(store=store, name='Camisa')
+        for i in range(3):
+            ProductVariant.objects.create(product=product, sku=f'S{i}', price=Decimal('10.00'), stock=5)
+        other = Store.objects.create(owner=User.objects.create_user(username='x', password='p'), name='Outra')
+        ProductVariant.objects.create(product=Product.objects.create(store=other, name='X'), sku='FOREIGN',
+                                      price=Decimal('1.00'), stock=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def post(self, items):
+        return self.client.post('/api/variants/bulk_update/', {'items': items}, format='json')
+
+    def test_absolute_delta_and_price(self):
+        response = self.post([
+            {'sku': 'S0', 'stock': 20},
+            {'sku': 'S1', 'stock_delta': -2, 'price': '12.50'},
+            {'sku': 'FOREIGN', 'stock': 0},
+            {'sku': 'NOPE', 'stock': 1},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['unmatched'], ['FOREIGN', 'NOPE'])
+        stock = dict(ProductVariant.objects.values_list('sku', 'stock'))
+        self.assertEqual((stock['S0'], stock['S1'], stock['S2'], stock['FOREIGN']), (20, 3, 5, 1))
+        self.assertEqual(ProductVariant.objects.get(sku='S1').price, Decimal('12.50'))
+
+    def test_item_errors_do_not_block_others(self):
+        response = self.post([
+            {'sku': 'S0', 'stock_delta': -10},
+            {'sku': 'S1', 'stock': 'x'},
+            {'sku': 'S2', 'stock': 1},
+        ])
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(len(response.data['errors']), 2)
+        self.assertEqual(ProductVariant.objects.get(sku='S0').stock, 5)
+
+    def test_rejects_non_list(self):
+        self.assertEqual(self.post('nope').status_code, 400)
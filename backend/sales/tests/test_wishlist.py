@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from sales.models import Product, ProductVariant, Store, Wishlist
+
+
+class WishlistTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='p')
+        self.store = Store.objects.create(owner=self.owner, name='Loja')
+        self.user = User.objects.create_user(username='cliente', password='p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.products = []
+        for i in range(3):
+            product = Product.objects.create(store=self.store, name=f'P{i}')
+            ProductVariant.objects.create(product=product, sku=f'SKU{i}-A', price=Decimal('20.00'), stock=1)
+            ProductVariant.objects.create(product=product, sku=f'SKU{i}-B', price=Decimal('15.00'), stock=1)
+            self.products.append(product)
+        self.simple = Product.objects.create(store=self.store, name='Simples', price=Decimal('9.90'))
+
+    def test_toggle_adds_then_removes(self):
+        product = self.products[0]
+        response = self.client.post('/api/wishlist/toggle/', {'product': product.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['action'], 'added')
+        self.assertEqual(response.data['item']['product_details']['price'], Decimal('15.00'))
+
+        response = self.client.post('/api/wishlist/toggle/', {'product_id': product.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['action'], 'removed')
+        self.assertFalse(Wishlist.objects.filter(user=self.user).exists())
+
+    def test_toggle_unknown_product(self):
+        response = self.client.post('/api/wishlist/toggle/', {'product': 999999}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_toggle_remove_is_two_queries(self):
+        Wishlist.objects.create(user=self.user, product=self.products[0])
+        with self.assertNumQueries(2):
+            result, _ = Wishlist.toggle(self.user, self.products[0].pk)
+        self.assertEqual(result, 'removed')
+
+    def test_list_query_count_is_constant(self):
+        Wishlist.objects.create(user=self.user, product=self.products[0])
+        with self.assertNumQueries(3):
+            self.client.get('/api/wishlist/')
+
+        for product in self.products[1:] + [self.simple]:
+            Wishlist.objects.create(user=self.user, product=product)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/wishlist/')
+        prices = {item['product']: item['product_details']['price'] for item in response.data['results']}
+        self.assertEqual(prices[self.simple.pk], Decimal('9.90'))
+        self.assertEqual(prices[self.products[1].pk], Decimal('15.00'))
+
+    def test_sync_merges_guest_wishlist(self):
+        Wishlist.objects.create(user=self.user, product=self.products[0])
+        payload = {'products': [self.products[0].pk, self.products[1].pk, 999999]}
+        response = self.client.post('/api/wishlist/sync/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], [self.products[1].pk])
+        self.assertEqual(response.data['not_found'], [999999])
+        self.assertEqual(Wishlist.objects.filter(user=self.user).count(), 2)
+
+    def test_sync_rejects_non_list(self):
+        response = self.client.post('/api/wishlist/sync/', {'products': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,52 @@
+from rest_framework import status, permissions
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .uploads import UploadError, create_ticket, store_local_upload
+
+
+class UploadTicketView(APIView):
+    """
+    API endpoint that issues a presigned upload for a product/variant image.
+    Body: {"content_type": "image/jpeg", "size": 123456}
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        if not hasattr(request.user, 'store'):
+            return Response(
+                {'detail': 'Você precisa criar uma loja antes de enviar imagens.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            ticket = create_ticket(
+                request.user,
+                request.data.get('content_type'),
+                request.data.get('size'),
+                request=request,
+            )
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ticket, status=status.HTTP_201_CREATED)
+
+
+class LocalUploadView(APIView):
+    """
+    Local stand-in for the S3 presigned POST (used when USE_S3 is off).
+    Authenticated by the signed 'token' field instead of the JWT.
+    """
+    permission_classes = (permissions.AllowAny,)
+    authentication_classes = ()
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request):
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({'detail': 'file é obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            key = store_local_upload(request.data.get('token', ''), uploaded_file)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # S3 answers a successful POST with 204 as well
+        return Response(status=status.HTTP_204_NO_CONTENT, headers={'Location': key})
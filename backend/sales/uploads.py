@@ -0,0 +1,136 @@
+"""
+Direct-to-storage image uploads.
+
+1. The client asks for a ticket (POST /api/uploads/) and gets a presigned
+   multipart POST: {"method": "POST", "url": ..., "fields": {...}, "upload": <token>}.
+2. It posts 'fields' plus the 'file' straight to 'url' (S3, or the local
+   stand-in view when USE_S3 is off), so the bytes never pass through the
+   product endpoints.
+3. It finalizes with the token (attach_image on a product or variant), which
+   points the ImageField at the uploaded object without copying it.
+
+The token is a signed payload (django.core.signing) binding the object key
+to the user, the content type and the maximum size.
+"""
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+SIGNING_SALT = 'sales.uploads'
+
+ALLOWED_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+
+
+class UploadError(Exception):
+    """Invalid ticket request, token or uploaded object"""
+
+
+def max_upload_size():
+    return getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def ticket_ttl():
+    return getattr(settings, 'IMAGE_UPLOAD_TICKET_TTL', 15 * 60)
+
+
+def create_ticket(user, content_type, size, request=None, prefix='products/uploads'):
+    """Validate the upload request and return the presigned POST contract"""
+    extension = ALLOWED_CONTENT_TYPES.get(content_type)
+    if extension is None:
+        raise UploadError(f'Tipo de arquivo não permitido: {content_type}')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('size deve ser o tamanho do arquivo em bytes')
+    if size <= 0 or size > max_upload_size():
+        raise UploadError(f'O arquivo deve ter até {max_upload_size()} bytes')
+
+    key = posixpath.join(prefix, str(user.pk), f'{uuid.uuid4().hex}.{extension}')
+    token = signing.dumps(
+        {'key': key, 'user': user.pk, 'content_type': content_type, 'max_size': max_upload_size()},
+        salt=SIGNING_SALT,
+    )
+
+    if getattr(settings, 'USE_S3', False):
+        target = _s3_presigned_post(key, content_type)
+    else:
+        target = _local_presigned_post(token, request)
+
+    return {**target, 'key': key, 'upload': token, 'expires_in': ticket_ttl()}
+
+
+def _s3_presigned_post(key, content_type):
+    import boto3
+
+    client = boto3.client(
+        's3',
+        region_name=settings.AWS_S3_REGION_NAME,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+    )
+    post = client.generate_presigned_post(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, max_upload_size()],
+        ],
+        ExpiresIn=ticket_ttl(),
+    )
+    return {'method': 'POST', 'url': post['url'], 'fields': post['fields']}
+
+
+def _local_presigned_post(token, request=None):
+    url = reverse('local-upload')
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return {'method': 'POST', 'url': url, 'fields': {'token': token}}
+
+
+def load_token(token, user=None, max_age=None):
+    """Return the ticket payload, checking signature, age and (optionally) owner"""
+    try:
+        payload = signing.loads(token, salt=SIGNING_SALT, max_age=max_age)
+    except signing.BadSignature:
+        raise UploadError('Token de upload inválido ou expirado')
+    if user is not None and payload['user'] != user.pk:
+        raise UploadError('Token de upload pertence a outro usuário')
+    return payload
+
+
+def store_local_upload(token, uploaded_file):
+    """Local stand-in for the S3 POST endpoint: enforce the ticket and save the file"""
+    payload = load_token(token, max_age=ticket_ttl())
+    if uploaded_file.content_type != payload['content_type']:
+        raise UploadError('Content-Type diferente do informado no ticket')
+    if uploaded_file.size > payload['max_size']:
+        raise UploadError('Arquivo maior que o permitido')
+    if default_storage.exists(payload['key']):
+        raise UploadError('Este ticket já foi utilizado')
+    saved = default_storage.save(payload['key'], uploaded_file)
+    if saved != payload['key']:
+        default_storage.delete(saved)
+        raise UploadError('Não foi possível gravar o arquivo')
+    return saved
+
+
+def finalize(token, user):
+    """Check the uploaded object exists and return its storage key"""
+    payload = load_token(token, user=user, max_age=getattr(settings, 'IMAGE_UPLOAD_FINALIZE_MAX_AGE', 24 * 60 * 60))
+    key = payload['key']
+    if not default_storage.exists(key):
+        raise UploadError('Arquivo ainda não foi enviado')
+    if default_storage.size(key) > payload['max_size']:
+        default_storage.delete(key)
+        raise UploadError('Arquivo maior que o permitido')
+    return key
@@ -5,8 +5,11 @@ from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
     ProductViewSet, OrderViewSet, OrderItemViewSet, StoreViewSet, ProductVariantViewSet,
-    CategoryViewSet, ReviewViewSet, CouponViewSet, WishlistViewSet
+    CategoryViewSet, ReviewViewSet, CouponViewSet, WishlistViewSet,
+    ReviewModerationViewSet, VariantBulkViewSet, CartReservationViewSet
 )
+from .upload_views import UploadTicketView, LocalUploadView
+from . import async_views
 from .auth_views import (
     RegisterView,
     LoginView,
@@ -23,6 +26,9 @@ router.register('orders', OrderViewSet, basename='order')
 router.register('categories', CategoryViewSet, basename='category')
 router.register('coupons', CouponViewSet, basename='coupon')
 router.register('wishlist', WishlistViewSet, basename='wishlist')
+router.register('variants', VariantBulkViewSet, basename='variant')
+router.register('cart/reservations', CartReservationViewSet, basename='cart-reservation')
+router.register('reviews/moderation', ReviewModerationViewSet, basename='review-moderation')
 
 # CORREÇÃO: Removidas as rotas globais para 'order-items', 'variants', e 'reviews'
 
@@ -52,4 +58,14 @@ urlpatterns = [
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/profile/', UserProfileView.as_view(), name='user_profile'),
     path('auth/change-password/', ChangePasswordView.as_view(), name='change_password'),
+
+    # Direct-to-storage uploads
+    path('uploads/', UploadTicketView.as_view(), name='upload-ticket'),
+    path('uploads/local/', LocalUploadView.as_view(), name='local-upload'),
+
+    # Leituras públicas do catálogo (views async, ver async_views.py)
+    path('catalog/products/', async_views.product_list, name='catalog-product-list'),
+    path('catalog/products/<int:pk>/', async_views.product_detail, name='catalog-product-detail'),
+    path('catalog/categories/<slug:slug>/products/', async_views.category_products,
+         name='catalog-category-products'),
 ]
\ No newline at end of file
@@ -1,30 +1,95 @@
 
+from datetime import datetime, time, timedelta
 from decimal import Decimal
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.exceptions import ValidationError
 from django.db import IntegrityError
-from django.db.models import Q
+from django.http import Http404
+from django.db.models import Prefetch, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from core import metrics
 
 from .models import (
     Store, Product, ProductVariant, Order, OrderItem,
-    Category, Review, Coupon, Wishlist 
+    Category, Review, Coupon, Wishlist, PurchasedProduct, ProductRatingSummary,
+    StockReservation, OrderConflictError, ArchivedOrder, InsufficientStockError
     # CORREÇÃO 1: Removido 'ProductCategory', que não existe mais.
 )
+from . import analytics, catalog_import, exports, inventory, store_cache
+from .uploads import UploadError, finalize as finalize_upload
 from .serializers import (
     StoreSerializer,
     ProductSerializer,
     ProductVariantSerializer,
     OrderSerializer,
+    OrderListSerializer,
+    ArchivedOrderSerializer,
     OrderItemSerializer,
     CategorySerializer,
     ReviewSerializer,
     CouponSerializer,
     WishlistSerializer,
+    ProductLiteSerializer,
 )
 
+def user_owns_product(user, product):
+    """Staff pode tudo; donos de loja apenas os próprios produtos."""
+    if user.is_staff:
+        return True
+    return product.store_id is not None and product.store.owner_id == user.id
+
+
+def owner_store_id(user):
+    """Id da loja de um dono (não staff); None para staff, clientes e anônimos."""
+    if user.is_staff or not user.is_authenticated:
+        return None
+    try:
+        return user.store.pk
+    except Store.DoesNotExist:
+        return None
+
+
+class StoreCachedListMixin:
+    """
+    Listagem de donos de loja servida do cache da loja (store_cache),
+    invalidado a cada alteração nos produtos/pedidos da loja.
+    """
+    store_cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        parent = super().list
+        store_id = owner_store_id(request.user)
+        if store_id is None:
+            return parent(request, *args, **kwargs)
+        return Response(store_cache.get_or_set(
+            store_id, self.store_cache_name, store_cache.request_params(request),
+            lambda: parent(request, *args, **kwargs).data,
+        ))
+
+
+def export_response(request, rows_for_store, columns, name):
+    """
+    Resposta de exportação (CSV/JSONL) restrita à loja do usuário;
+    staff sem loja exporta tudo.
+    """
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in exports.CONTENT_TYPES:
+        return Response({'error': 'file_format deve ser csv ou jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        store = request.user.store
+    except Store.DoesNotExist:
+        if not request.user.is_staff:
+            return Response({'detail': 'Você não possui uma loja.'}, status=status.HTTP_403_FORBIDDEN)
+        store = None
+    return exports.streaming_response(rows_for_store(store), columns, file_format, name)
+
+
 class StoreViewSet(viewsets.ModelViewSet):
     """
     ViewSet para a Loja do Vendedor.
@@ -46,6 +111,38 @@ class StoreViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['get'], url_path='my_store/analytics')
+    def analytics(self, request):
+        """
+        Faturamento, pedidos, ticket médio e produtos mais vendidos por dia
+        (?from=2024-01-01&to=2024-01-31; padrão: últimos 30 dias).
+        Lê apenas os rollups diários.
+        """
+        try:
+            store = Store.objects.get(owner=request.user)
+        except Store.DoesNotExist:
+            return Response(
+                {"detail": "Você ainda não possui uma loja cadastrada."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        params = request.query_params
+        try:
+            end = parse_date(params['to']) if params.get('to') else timezone.localdate()
+            start = parse_date(params['from']) if params.get('from') else None
+        except ValueError:
+            end = None
+        if end is None or (params.get('from') and start is None):
+            return Response({'error': 'from/to devem estar no formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        start = start or end - timedelta(days=29)
+        if start > end or (end - start).days >= analytics.MAX_RANGE_DAYS:
+            return Response(
+                {'error': f'Intervalo inválido (máximo de {analytics.MAX_RANGE_DAYS} dias).'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(store_cache.get_or_set(
+            store.pk, 'analytics', (start, end), lambda: analytics.summary(store, start, end)
+        ))
+
     def create(self, request, *args, **kwargs):
         """Impede que um usuário crie mais de uma loja."""
         if Store.objects.filter(owner=request.user).exists():
@@ -65,12 +162,15 @@ class StoreViewSet(viewsets.ModelViewSet):
         return Store.objects.filter(owner=self.request.user)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(StoreCachedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para Produtos (o container principal).
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    store_cache_name = 'products'
+    # Numérico também nas rotas aninhadas (/products/{product_pk}/...): 'abc' dá 404, não 500
+    lookup_value_regex = r'\d+'
     permission_classes = [IsAuthenticated] # Ajustado em get_permissions
 
     def get_permissions(self):
@@ -97,33 +197,84 @@ class ProductViewSet(viewsets.ModelViewSet):
         Donos de loja veem todos os seus produtos (ativos ou não).
         """
         user = self.request.user
-        print('user:', user)
+        queryset = Product.objects.select_related('rating_summary')
         if user.is_staff:
-            print('TO AQUI 1')
-            return Product.objects.all()
+            return queryset
 
         # Se o usuário não está autenticado ou é um cliente (não dono de loja)
         if not user.is_authenticated or not hasattr(user, 'store'):
-             print('TO AQUI 2')
-             return Product.objects.filter(is_active=True)
-        print('TO AQUI 3')
+             return queryset.filter(is_active=True)
         # Dono de loja vê seus próprios produtos
-        return Product.objects.filter(store=user.store)
+        return queryset.filter(store=user.store)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def buy_again(self, request):
+        """Produtos ativos já comprados pelo usuário, dos mais recentes aos mais antigos."""
+        email = PurchasedProduct.normalize_email(request.user.email)
+        purchases = PurchasedProduct.objects.filter(email=email)
+        products = Product.objects.with_min_price().filter(
+            pk__in=purchases.values('product_id'),
+            is_active=True,
+        ).annotate(
+            last_purchased_at=Subquery(
+                purchases.filter(product=OuterRef('pk')).values('last_purchased_at')[:1]
+            )
+        ).order_by('-last_purchased_at')
+
+        page = self.paginate_queryset(products)
+        serializer = ProductLiteSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_catalog(self, request):
+        """
+        Importa produtos/variantes em lote a partir de um arquivo CSV ou JSONL
+        (campo 'file'). Use 'dry_run=true' para apenas validar.
+        Retorna um relatório com os erros por linha.
+        """
+        try:
+            store = request.user.store
+        except Store.DoesNotExist:
+            raise ValidationError({"detail": "Você precisa criar uma loja antes de importar produtos."})
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file é obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or catalog_import.detect_format(upload.name)
+        if file_format not in ('csv', 'jsonl'):
+            return Response({'error': 'format deve ser csv ou jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = catalog_import.CatalogImporter(
+            store, dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        )
+        report = importer.run(catalog_import.read_rows(upload, file_format))
+        return Response(report)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporta o catálogo da loja (uma linha por variante) em CSV ou JSONL (?file_format=)."""
+        return export_response(request, exports.product_rows, exports.PRODUCT_COLUMNS, 'produtos')
+
+    @action(detail=True, methods=['post'])
+    def attach_image(self, request, pk=None):
+        """Associa ao produto uma imagem já enviada via ticket de upload (/api/uploads/)."""
+        product = self.get_object()
+        if not user_owns_product(request.user, product):
+            return Response({'detail': 'Produto não pertence à sua loja.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            product.image.name = finalize_upload(request.data.get('upload', ''), request.user)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        product.save(update_fields=['image', 'updated_at'])
+        return Response(self.get_serializer(product).data)
+
     def perform_create(self, serializer):
         """Associa o produto à loja do usuário logado."""
         user = self.request.user
-        print(f"DEBUG: User creating product: {user.username}")
-        print(f"DEBUG: User has 'store' attribute: {hasattr(user, 'store')}")
-
         try:
             store = Store.objects.get(owner=user)
-            print(f"DEBUG: Store found: {store.name} (ID: {store.id})")
         except Store.DoesNotExist:
-            print(f"DEBUG: No store found for user {user.username}")
             raise ValidationError({"detail": "Você precisa criar uma loja antes de adicionar produtos."})
-
-        print(f"DEBUG: Saving product with store: {store}")
         serializer.save(store=store)
 
 
@@ -170,6 +321,46 @@ class ProductVariantViewSet(viewsets.ModelViewSet):
             
         return qs.order_by('price')
 
+    @action(detail=True, methods=['post'])
+    def attach_image(self, request, pk=None, product_pk=None):
+        """Associa à variante uma imagem já enviada via ticket de upload (/api/uploads/)."""
+        variant = self.get_object()
+        if not user_owns_product(request.user, variant.product):
+            return Response({'detail': 'Produto não pertence à sua loja.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            variant.image.name = finalize_upload(request.data.get('upload', ''), request.user)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        variant.save(update_fields=['image', 'updated_at'])
+        return Response(self.get_serializer(variant).data)
+
+    @action(detail=True, methods=['get'])
+    def stock_history(self, request, pk=None, product_pk=None):
+        """
+        Estoque segundo o ledger de movimentações (opcionalmente em um instante: ?at=2024-01-31T23:59:59Z)
+        e as movimentações mais recentes.
+        """
+        variant = self.get_object()
+        if not user_owns_product(request.user, variant.product):
+            return Response({'detail': 'Produto não pertence à sua loja.'}, status=status.HTTP_403_FORBIDDEN)
+        at = None
+        if request.query_params.get('at'):
+            at = parse_datetime(request.query_params['at'])
+            if at is None:
+                return Response({'error': 'at deve ser uma data/hora ISO 8601.'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        movements = variant.stock_movements.all()
+        if at is not None:
+            movements = movements.filter(created_at__lte=at)
+        return Response({
+            'variant': variant.id,
+            'stock': variant.stock,
+            'at': at,
+            'ledger_stock': inventory.stock_at([variant.id], at=at).get(variant.id, 0),
+            'movements': list(movements.values('id', 'delta', 'reason', 'order', 'note', 'created_at')[:50]),
+        })
+
     def perform_create(self, serializer):
         """Associa a variante ao produto pai da URL."""
         try:
@@ -185,25 +376,156 @@ class ProductVariantViewSet(viewsets.ModelViewSet):
         serializer.save(product=product)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class VariantBulkViewSet(viewsets.GenericViewSet):
+    """
+    Operações em lote sobre as variantes da loja (ex: sincronização de estoque).
+    """
+    queryset = ProductVariant.objects.all()
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        Atualiza estoque/preço por SKU em uma única transação.
+        Body: {"items": [{"sku": "A-1", "stock": 10}, {"sku": "B-2", "stock_delta": -2, "price": "9.90"}]}
+        """
+        try:
+            store = request.user.store
+        except Store.DoesNotExist:
+            return Response({'detail': 'Você não possui uma loja.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            result = inventory.bulk_update_variants(store, request.data.get('items'))
+        except inventory.BulkUpdateError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+
+class CartReservationViewSet(viewsets.GenericViewSet):
+    """
+    Reservas de estoque do carrinho (com expiração).
+    O carrinho é identificado por 'cart_token' (gerado no primeiro sync).
+    """
+    queryset = StockReservation.objects.all()
+    permission_classes = [AllowAny]
+
+    def _cart_token(self, request, required=True):
+        token = str(request.data.get('cart_token') or '').strip()
+        if len(token) > 64:
+            raise ValidationError({'cart_token': 'Máximo de 64 caracteres.'})
+        if required and not token:
+            raise ValidationError({'cart_token': 'Este campo é obrigatório.'})
+        return token
+
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Define as reservas do carrinho: {"cart_token": "...", "items": [{"variant": 1, "quantity": 2}]}.
+        Itens sem estoque suficiente são reservados até o disponível.
+        """
+        token = self._cart_token(request, required=False) or inventory.new_cart_token()
+        try:
+            result = inventory.sync_cart_reservations(token, request.data.get('items'))
+        except inventory.ReservationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=False, methods=['post'])
+    def check(self, request):
+        """Verifica (sem reservar) se o carrinho pode ser finalizado; 409 se faltar estoque."""
+        token = self._cart_token(request)
+        try:
+            result = inventory.check_cart(token, request.data.get('items'))
+        except inventory.ReservationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not result['ok']:
+            metrics.CHECKOUTS.labels('out_of_stock').inc()
+            return Response(result, status=status.HTTP_409_CONFLICT)
+        return Response(result)
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """Libera todas as reservas do carrinho (ex: carrinho esvaziado ou pedido concluído)."""
+        released = inventory.release_cart(self._cart_token(request))
+        return Response({'released': released})
+
+
+class OrderViewSet(StoreCachedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para Pedidos (apenas para donos de loja).
     """
-    queryset = Order.objects.all().select_related('store').prefetch_related('items__variant__product', 'status_updates')
+    queryset = Order.objects.all().select_related('store').prefetch_related(
+        'items__product', 'items__variant', 'status_updates'
+    )
     serializer_class = OrderSerializer
+    store_cache_name = 'orders'
     permission_classes = [IsAuthenticated] # Assumindo que clientes não veem /orders/
 
+    def get_serializer_class(self):
+        """Listagem usa a projeção compacta; detalhe traz itens e histórico."""
+        if self.action == 'list':
+            return OrderListSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         """Dono da loja vê apenas seus pedidos; Staff vê tudo."""
         user = self.request.user
-        if user.is_staff:
-            return super().get_queryset()
-        
+        qs = Order.objects.for_list() if self.action == 'list' else super().get_queryset()
+        if not user.is_staff:
+            try:
+                qs = qs.filter(store=user.store)
+            except Store.DoesNotExist:
+                return Order.objects.none()
+        if self.action == 'list':
+            qs = self.filter_list(qs)
+        return qs
+
+    def retrieve(self, request, *args, **kwargs):
+        """Pedidos arquivados (archive_orders) continuam acessíveis pelo mesmo id."""
         try:
-            store = user.store
-            return super().get_queryset().filter(store=store)
-        except Store.DoesNotExist:
-            return Order.objects.none()
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not str(kwargs.get('pk', '')).isdigit():
+                raise
+            archived = ArchivedOrder.objects.select_related('store').filter(pk=kwargs['pk'])
+            if not request.user.is_staff:
+                archived = archived.filter(store__owner=request.user)
+            order = archived.first()
+            if order is None:
+                raise
+            return Response(ArchivedOrderSerializer(order).data)
+
+    def filter_list(self, qs):
+        """
+        Filtros da listagem: ?status=pending,processing&payment_status=paid
+        &payment_method=cod&created_from=2024-01-01&created_to=2024-01-31
+        """
+        p = self.request.query_params
+        for param in ('status', 'payment_status', 'payment_method'):
+            if p.get(param):
+                qs = qs.filter(**{f'{param}__in': [v.strip() for v in p[param].split(',') if v.strip()]})
+        # Limites de dia viram intervalos de created_at, que usam os índices (store, ..., created_at)
+        for param, lookup, offset in (('created_from', 'gte', 0), ('created_to', 'lt', 1)):
+            if not p.get(param):
+                continue
+            try:
+                day = parse_date(p[param])
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValidationError({param: 'Use o formato AAAA-MM-DD.'})
+            moment = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min))
+            qs = qs.filter(**{f'created_at__{lookup}': moment})
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        """Conta tentativas de checkout (sucesso / dados inválidos) para o /metrics."""
+        try:
+            response = super().create(request, *args, **kwargs)
+        except ValidationError:
+            metrics.CHECKOUTS.labels('invalid').inc()
+            raise
+        metrics.CHECKOUTS.labels('success').inc()
+        return response
 
     def perform_create(self, serializer):
         """
@@ -222,6 +544,11 @@ class OrderViewSet(viewsets.ModelViewSet):
             serializer.save() 
             # Nota: O OrderSerializer.create() precisa ser robusto
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporta os pedidos da loja em CSV ou JSONL (?file_format=)."""
+        return export_response(request, exports.order_rows, exports.ORDER_COLUMNS, 'pedidos')
+
     @action(detail=True, methods=['post'])
     def set_status(self, request, pk=None):
         """Muda o status de um pedido."""
@@ -231,6 +558,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         try:
             order.set_status(new_status, note=note, automatic=False)
             return Response({'status': order.status, 'status_display': order.get_status_display()})
+        except OrderConflictError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
         except ValueError as e:
             return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -284,8 +613,11 @@ class OrderItemViewSet(viewsets.ModelViewSet):
             raise ValidationError("Pedido não encontrado ou não pertence à sua loja.")
         except Store.DoesNotExist:
             raise ValidationError("Você não possui uma loja.")
-        
-        serializer.save(order=order)
+
+        try:
+            serializer.save(order=order)
+        except InsufficientStockError as e:
+            raise ValidationError({'quantity': str(e)})
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -312,7 +644,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         products = Product.objects.filter(
             categories=category,
             is_active=True
-        ).select_related('store').prefetch_related('variants')
+        ).select_related('store', 'rating_summary').prefetch_related('variants')
 
         # Filtros de Preço
         min_price = request.query_params.get('min_price')
@@ -343,10 +675,25 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """Qualquer um pode ver, apenas autenticados podem criar."""
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'summary']:
             return [AllowAny()]
         return [IsAuthenticated()] # Adicionar permissão de "dono" para update/delete
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request, product_pk=None):
+        """Distribuição de estrelas e média das avaliações aprovadas do produto."""
+        if not Product.objects.filter(pk=product_pk).exists():
+            return Response({'detail': 'Produto não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        summary = ProductRatingSummary.objects.filter(product_id=product_pk).first()
+        if summary is None:
+            summary = ProductRatingSummary(product_id=product_pk)
+        return Response({
+            'product': int(product_pk),
+            'average_rating': summary.average,
+            'review_count': summary.count,
+            'distribution': summary.distribution,
+        })
+
     def get_queryset(self):
         """
         CORREÇÃO 2: Filtra reviews baseado na URL aninhada (product_pk).
@@ -365,12 +712,8 @@ class ReviewViewSet(viewsets.ModelViewSet):
         except Product.DoesNotExist:
              raise ValidationError("Produto não encontrado.")
 
-        # CORREÇÃO 5: 'OrderItem' não tem 'product', tem 'variant__product'
-        has_purchased = OrderItem.objects.filter(
-            Q(order__customer_email=user.email) | Q(order__customer_name=user.username), # Suposição de lógica de cliente
-            variant__product=product,
-            order__payment_status='paid'
-        ).exists()
+        # Consulta o ledger de compras (índice único email + produto)
+        has_purchased = PurchasedProduct.has_purchased(user, product)
 
         try:
             serializer.save(user=user, product=product, is_verified_purchase=has_purchased)
@@ -378,6 +721,53 @@ class ReviewViewSet(viewsets.ModelViewSet):
             raise ValidationError({"detail": "Você já avaliou este produto."})
 
 
+class ReviewModerationPagination(CursorPagination):
+    """Paginação por keyset (id) para a fila de moderação."""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class ReviewModerationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Fila de moderação de reviews (apenas staff).
+    GET lista as pendentes; POST approve/reject modera em lote.
+    """
+    queryset = Review.objects.pending().select_related('user', 'product')
+    serializer_class = ReviewSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = ReviewModerationPagination
+
+    # Limite de ids aceitos por chamada de moderação
+    MODERATION_MAX_IDS = 10000
+
+    @action(detail=False, methods=['post'])
+    def approve(self, request):
+        return self._moderate(request, approve=True)
+
+    @action(detail=False, methods=['post'])
+    def reject(self, request):
+        return self._moderate(request, approve=False)
+
+    def _moderate(self, request, approve):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response({'error': 'ids deve ser uma lista de ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.MODERATION_MAX_IDS:
+            return Response(
+                {'error': f'Máximo de {self.MODERATION_MAX_IDS} reviews por chamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'ids deve conter apenas números'}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = Review.objects.filter(pk__in=ids).moderate(approve=approve)
+        return Response({'updated': updated, 'is_approved': approve})
+
+
 class CouponViewSet(viewsets.ModelViewSet):
     """
     ViewSet para Cupons (apenas para donos de loja/admin).
@@ -410,9 +800,8 @@ class CouponViewSet(viewsets.ModelViewSet):
         except Coupon.DoesNotExist:
             return Response({'error': 'Cupom não encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-        is_valid, message = coupon.is_valid()
-        if not is_valid:
-            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        if not coupon.is_valid():
+            return Response({'error': 'Cupom inválido ou expirado'}, status=status.HTTP_400_BAD_REQUEST)
 
         order_total = Decimal(str(total))
         if order_total < coupon.min_purchase_amount:
@@ -438,9 +827,14 @@ class WishlistViewSet(viewsets.ModelViewSet):
     serializer_class = WishlistSerializer
     permission_classes = [IsAuthenticated]
 
+    # Limite de itens aceitos por chamada de sync
+    SYNC_MAX_ITEMS = 500
+
     def get_queryset(self):
-        """Usuários veem apenas sua própria lista."""
-        return Wishlist.objects.filter(user=self.request.user).select_related('product')
+        """Usuários veem apenas sua própria lista (preços carregados em uma única query)."""
+        return Wishlist.objects.filter(user=self.request.user).select_related('user').prefetch_related(
+            Prefetch('product', queryset=Product.objects.with_min_price())
+        )
 
     def perform_create(self, serializer):
         """Define o usuário automaticamente."""
@@ -452,27 +846,66 @@ class WishlistViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def toggle(self, request):
         """Adiciona ou remove um produto da lista de desejos."""
-        product_id = request.data.get('product') # Serializer espera 'product'
+        # O serializer espera 'product'; o frontend envia 'product_id'
+        product_id = request.data.get('product') or request.data.get('product_id')
 
         if not product_id:
             return Response({'error': 'product é obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
-
         try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
-            return Response({'error': 'Produto não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'product inválido'}, status=status.HTTP_400_BAD_REQUEST)
 
-        wishlist_item, created = Wishlist.objects.get_or_create(
-            user=request.user,
-            product=product
-        )
+        result, item_id = Wishlist.toggle(request.user, product_id)
 
-        if not created:
-            wishlist_item.delete()
+        if result is None:
+            return Response({'error': 'Produto não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        if result == 'removed':
             return Response({'action': 'removed', 'message': 'Produto removido dos favoritos'})
 
+        wishlist_item = self.get_queryset().get(pk=item_id)
         return Response({
             'action': 'added',
             'message': 'Produto adicionado aos favoritos',
-            'item': WishlistSerializer(wishlist_item).data
-        }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+            'item': self.get_serializer(wishlist_item).data
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Mescla a lista de desejos de visitante (ex: salva no navegador) com a do usuário.
+        Espera {"products": [ids]} e retorna os ids adicionados e a lista final.
+        """
+        product_ids = request.data.get('products')
+        if not isinstance(product_ids, list):
+            return Response({'error': 'products deve ser uma lista de ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(product_ids) > self.SYNC_MAX_ITEMS:
+            return Response(
+                {'error': f'Máximo de {self.SYNC_MAX_ITEMS} produtos por sincronização'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            requested = {int(pk) for pk in product_ids}
+        except (TypeError, ValueError):
+            return Response({'error': 'products deve conter apenas ids numéricos'}, status=status.HTTP_400_BAD_REQUEST)
+
+        existing = set(
+            Product.objects.filter(pk__in=requested).values_list('pk', flat=True)
+        )
+        current = set(
+            Wishlist.objects.filter(user=request.user).values_list('product_id', flat=True)
+        )
+        to_add = existing - current
+
+        # ignore_conflicts cobre sincronizações concorrentes do mesmo usuário
+        Wishlist.objects.bulk_create(
+            [Wishlist(user=request.user, product_id=pk) for pk in sorted(to_add)],
+            ignore_conflicts=True
+        )
+
+        return Response({
+            'added': sorted(to_add),
+            'not_found': sorted(requested - existing),
+            'products': sorted(current | to_add),
+        })
@@ -0,0 +1,97 @@
+"""
+Concurrent HTTP load generator (standard library only).
+
+Keeps --concurrency connections busy until --requests responses arrived
+and reports throughput and latency percentiles. --slow-client makes every
+connection trickle its request headers, to see how many slow clients the
+server can hold before fast requests queue behind them.
+
+Compare the serving modes with the upstream-delay endpoint
+(BENCHMARK_ENDPOINTS=True):
+
+    gunicorn                    # sync workers
+    SERVER_MODE=asgi gunicorn   # uvicorn workers
+    python scripts/concurrency_benchmark.py \\
+        --url 'http://127.0.0.1:8000/debug/upstream-delay?ms=100' --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+async def fetch(host, port, target, slow_client):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        request = f'GET {target} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n'.encode()
+        if slow_client:
+            for start in range(0, len(request), 8):
+                writer.write(request[start:start + 8])
+                await writer.drain()
+                await asyncio.sleep(slow_client / 1000)
+        else:
+            writer.write(request)
+            await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run(url, concurrency, total, slow_client):
+    parts = urlsplit(url)
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    latencies, statuses = [], {}
+    remaining = iter(range(total))
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = await fetch(parts.hostname, parts.port or 80, target, slow_client)
+            except OSError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        'requests_per_second': round(total / elapsed, 1),
+        'statuses': {str(status): count for status, count in statuses.items()},
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 1),
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'max': round(max(latencies), 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--slow-client', type=int, default=0, metavar='MS',
+                        help='pause between 8-byte chunks of the request (0 = send at once)')
+    args = parser.parse_args()
+    result = asyncio.run(run(args.url, args.concurrency, args.requests, args.slow_client))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
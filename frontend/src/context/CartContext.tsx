@@ -1,6 +1,16 @@
-import React, { createContext, useContext, useReducer, ReactNode } from "react";
+import React, {
+  createContext,
+  useContext,
+  useEffect,
+  useReducer,
+  useState,
+  ReactNode,
+} from "react";
 // Certifique-se que estes tipos refletem a estrutura do backend
 import { Product, ProductVariant } from "../types/product";
+import reservationService, {
+  ReservationSyncResponse,
+} from "../services/reservationService";
 
 // --- INTERFACE (sem mudanças) ---
 interface CartItem {
@@ -46,6 +56,7 @@ const CartContext = createContext<
       state: CartState;
       dispatch: React.Dispatch<CartAction>;
       getTotal: () => number;
+      reservation: ReservationSyncResponse | null;
     }
   | undefined
 >(undefined);
@@ -53,6 +64,9 @@ const CartContext = createContext<
 // --- STORAGE (sem mudanças) ---
 const CART_STORAGE_KEY = "shopping_cart_v2";
 
+// Espera o usuário parar de alterar o carrinho antes de sincronizar as reservas
+const RESERVATION_SYNC_DELAY_MS = 500;
+
 // Retorna any[] para limpeza no reducer
 const loadCartFromStorage = (): any[] => {
   try {
@@ -287,6 +301,34 @@ export const CartProvider: React.FC<{ children: ReactNode }> = ({
     items: loadCartFromStorage(),
   });
 
+  const [reservation, setReservation] =
+    useState<ReservationSyncResponse | null>(null);
+
+  // Reserva o estoque no servidor sempre que o carrinho muda
+  useEffect(() => {
+    const lines = state.items
+      .filter((item) => item.variantId !== null && item.quantity > 0)
+      .map((item) => ({
+        variant: item.variantId as number,
+        quantity: item.quantity,
+      }));
+
+    const timer = setTimeout(() => {
+      if (lines.length === 0) {
+        setReservation(null);
+        reservationService.release().catch(() => undefined);
+        return;
+      }
+      reservationService
+        .sync(lines)
+        .then(setReservation)
+        .catch((error) =>
+          console.warn("Não foi possível reservar o estoque:", error)
+        );
+    }, RESERVATION_SYNC_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [state.items]);
+
   const getTotal = (): number => {
     return state.items.reduce((total, item) => {
       // CORREÇÃO: Garante que product e variants existem antes do find
@@ -301,7 +343,7 @@ export const CartProvider: React.FC<{ children: ReactNode }> = ({
   };
 
   return (
-    <CartContext.Provider value={{ state, dispatch, getTotal }}>
+    <CartContext.Provider value={{ state, dispatch, getTotal, reservation }}>
       {children}
     </CartContext.Provider>
   );
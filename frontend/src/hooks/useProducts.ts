@@ -1,5 +1,6 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import api from '../services/api';
+import uploadService from '../services/uploadService';
 import { Product } from '../types/product';
 
 interface ProductsResponse {
@@ -23,39 +24,21 @@ export const useProducts = () => {
 };
 
 /**
- * Hook to create a new product with image
+ * Hook to create a new product with image.
+ * The product is created as JSON and the image goes straight to storage
+ * through an upload ticket, so it never streams through the API workers.
  */
 export const useCreateProductWithImage = () => {
   const queryClient = useQueryClient();
 
   return useMutation({
     mutationFn: async ({ data, image }: { data: any; image?: File }) => {
-      const formData = new FormData();
+      const response = await api.post('/products/', data);
 
-      // Append product data (excluding variants for FormData)
-      const { variants, ...productData } = data;
-      Object.keys(productData).forEach((key) => {
-        if (productData[key] !== undefined && productData[key] !== null) {
-          formData.append(key, productData[key]);
-        }
-      });
-
-      // Append variants as JSON if present
-      if (variants && Array.isArray(variants) && variants.length > 0) {
-        formData.append('variants', JSON.stringify(variants));
-      }
-
-      // Append image if provided
       if (image) {
-        formData.append('image', image);
+        return uploadService.uploadProductImage(response.data.id, image);
       }
 
-      const response = await api.post('/products/', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
-
       return response.data;
     },
     onSuccess: () => {
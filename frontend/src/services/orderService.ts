@@ -1,13 +1,25 @@
 import api from './api';
 
+export interface OrderListFilters {
+  status?: string; // comma separated, e.g. "pending,processing"
+  payment_status?: string;
+  payment_method?: string;
+  created_from?: string; // YYYY-MM-DD
+  created_to?: string;
+  page?: number;
+}
+
 class OrderService {
   async createOrder(data: any) {
     const response = await api.post('/orders/', data);
     return response.data;
   }
 
-  async getOrders() {
-    const response = await api.get('/orders/');
+  /**
+   * Compact order list (item_count / last_status instead of nested items)
+   */
+  async getOrders(filters: OrderListFilters = {}) {
+    const response = await api.get('/orders/', { params: filters });
     return response.data;
   }
 
@@ -16,8 +28,8 @@ class OrderService {
     return response.data;
   }
 
-  async updateOrderStatus(id: number, status: string) {
-    const response = await api.post(`/orders/${id}/update_status/`, { status });
+  async updateOrderStatus(id: number, status: string, note = '') {
+    const response = await api.post(`/orders/${id}/set_status/`, { status, note });
     return response.data;
   }
 }
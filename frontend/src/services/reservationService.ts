@@ -0,0 +1,68 @@
+import api from "./api";
+
+export interface ReservationLine {
+  variant: number;
+  quantity: number;
+}
+
+export interface ReservationItem {
+  variant: number;
+  requested: number;
+  reserved: number;
+  available: number;
+}
+
+export interface ReservationSyncResponse {
+  cart_token: string;
+  expires_at: string | null;
+  items: ReservationItem[];
+  complete: boolean;
+}
+
+export interface ReservationCheckResponse {
+  ok: boolean;
+  shortages: ReservationItem[];
+}
+
+const CART_TOKEN_KEY = "cart_reservation_token";
+
+class ReservationService {
+  getCartToken(): string | null {
+    return localStorage.getItem(CART_TOKEN_KEY);
+  }
+
+  /**
+   * Hold stock for the cart lines (replaces the cart's previous reservations)
+   */
+  async sync(items: ReservationLine[]): Promise<ReservationSyncResponse> {
+    const response = await api.post<ReservationSyncResponse>(
+      "/cart/reservations/sync/",
+      { cart_token: this.getCartToken(), items }
+    );
+    localStorage.setItem(CART_TOKEN_KEY, response.data.cart_token);
+    return response.data;
+  }
+
+  /**
+   * Check the cart can be checked out; shortages come back with HTTP 409
+   */
+  async check(items: ReservationLine[]): Promise<ReservationCheckResponse> {
+    const response = await api.post<ReservationCheckResponse>(
+      "/cart/reservations/check/",
+      { cart_token: this.getCartToken(), items },
+      { validateStatus: (status) => status === 200 || status === 409 }
+    );
+    return response.data;
+  }
+
+  /**
+   * Release every reservation held by the cart
+   */
+  async release(): Promise<void> {
+    const token = this.getCartToken();
+    if (!token) return;
+    await api.post("/cart/reservations/release/", { cart_token: token });
+  }
+}
+
+export default new ReservationService();
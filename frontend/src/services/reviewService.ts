@@ -1,5 +1,5 @@
 import api from './api';
-import { Review, ReviewCreateInput } from '../types/review';
+import { Review, ReviewCreateInput, ReviewSummary } from '../types/review';
 
 export interface ReviewListResponse {
   count: number;
@@ -18,6 +18,14 @@ class ReviewService {
     return response.data;
   }
 
+  /**
+   * Get star distribution and average rating for a product
+   */
+  async getSummary(productId: number): Promise<ReviewSummary> {
+    const response = await api.get<ReviewSummary>(`/products/${productId}/reviews/summary/`);
+    return response.data;
+  }
+
   /**
    * Get single review
    */
@@ -31,6 +31,34 @@ export interface StoreUpdateData {
   is_active?: boolean;
 }
 
+export interface SalesTotals {
+  orders: number;
+  revenue: string;
+  paid_orders: number;
+  paid_revenue: string;
+  cancelled_orders: number;
+  average_order_value: string;
+}
+
+export interface DailySales extends SalesTotals {
+  date: string;
+}
+
+export interface TopProduct {
+  product: number;
+  name: string;
+  quantity: number;
+  revenue: string;
+}
+
+export interface StoreAnalytics {
+  from: string;
+  to: string;
+  totals: SalesTotals;
+  days: DailySales[];
+  top_products: TopProduct[];
+}
+
 const storeService = {
   /**
    * Get current user's store
@@ -63,6 +91,16 @@ const storeService = {
     await api.delete(`/stores/${id}/`);
   },
 
+  /**
+   * Daily sales analytics of the current user's store (dates as YYYY-MM-DD)
+   */
+  async getAnalytics(from?: string, to?: string): Promise<StoreAnalytics> {
+    const response = await api.get<StoreAnalytics>('/stores/my_store/analytics/', {
+      params: { from, to },
+    });
+    return response.data;
+  },
+
   /**
    * Check if user has a store
    */
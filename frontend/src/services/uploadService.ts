@@ -0,0 +1,54 @@
+import axios from 'axios';
+import api from './api';
+
+export interface UploadTicket {
+  method: 'POST';
+  url: string;
+  fields: Record<string, string>;
+  key: string;
+  upload: string;
+  expires_in: number;
+}
+
+class UploadService {
+  /**
+   * Request a presigned upload (S3 or the local stand-in) for an image
+   */
+  async createTicket(file: File): Promise<UploadTicket> {
+    const response = await api.post<UploadTicket>('/uploads/', {
+      content_type: file.type,
+      size: file.size,
+    });
+    return response.data;
+  }
+
+  /**
+   * Send the file straight to storage using the ticket's presigned POST.
+   * Uses plain axios: the storage endpoint must not receive our JWT.
+   */
+  async uploadFile(ticket: UploadTicket, file: File): Promise<void> {
+    const formData = new FormData();
+    Object.entries(ticket.fields).forEach(([key, value]) => {
+      formData.append(key, value);
+    });
+    // S3 requires the file to be the last field
+    formData.append('file', file);
+    await axios.post(ticket.url, formData);
+  }
+
+  /**
+   * Upload an image and attach it to a product (or one of its variants)
+   */
+  async uploadProductImage(productId: number, file: File, variantId?: number) {
+    const ticket = await this.createTicket(file);
+    await this.uploadFile(ticket, file);
+
+    const url = variantId
+      ? `/products/${productId}/variants/${variantId}/attach_image/`
+      : `/products/${productId}/attach_image/`;
+    const response = await api.post(url, { upload: ticket.upload });
+    return response.data;
+  }
+}
+
+export default new UploadService();
@@ -1,5 +1,9 @@
 import api from "./api";
-import { Wishlist, WishlistToggleResponse } from "../types/wishlist";
+import {
+  Wishlist,
+  WishlistSyncResponse,
+  WishlistToggleResponse,
+} from "../types/wishlist";
 
 export interface WishlistListResponse {
   count: number;
@@ -45,6 +49,16 @@ class WishlistService {
     return response.data;
   }
 
+  /**
+   * Merge a guest wishlist (product ids kept before login) into the user's wishlist
+   */
+  async syncWishlist(productIds: number[]): Promise<WishlistSyncResponse> {
+    const response = await api.post<WishlistSyncResponse>("/wishlist/sync/", {
+      products: productIds,
+    });
+    return response.data;
+  }
+
   /**
    * Check if product is in wishlist
    */
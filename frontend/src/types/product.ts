@@ -14,6 +14,12 @@ export interface Category {
   updated_at?: string;
 }
 
+// Resized renditions by format and width, e.g. { webp: { "320": "https://..." } }
+export interface ImageSrcSet {
+  webp?: Record<string, string>;
+  jpeg?: Record<string, string>;
+}
+
 export interface ProductVariant {
   id: number;
   product: number;
@@ -23,6 +29,7 @@ export interface ProductVariant {
   stock?: number;
   is_active?: boolean;
   image?: string | null;
+  image_srcset?: ImageSrcSet;
   // Optional display attributes
   size?: string;
   color?: string;
@@ -38,6 +45,7 @@ export interface Product {
   name?: string;
   description?: string;
   image?: string | null;
+  image_srcset?: ImageSrcSet;
   price?: number;
   sku?: string;
   stock?: number;
@@ -27,3 +27,12 @@ export interface ReviewStats {
     [key: number]: number;
   };
 }
+
+export interface ReviewSummary {
+  product: number;
+  average_rating: number | null;
+  review_count: number;
+  distribution: {
+    [key: number]: number;
+  };
+}
@@ -15,5 +15,11 @@ export interface WishlistToggleRequest {
 export interface WishlistToggleResponse {
   action: 'added' | 'removed';
   message: string;
-  wishlist?: Wishlist;
+  item?: Wishlist;
+}
+
+export interface WishlistSyncResponse {
+  added: number[];
+  not_found: number[];
+  products: number[];
 }